@@ -0,0 +1,158 @@
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import write_dataset
+
+# 합성 데이터로 주요 경로(CSV 읽기, 일정 생성, 당번 횟수 집계, 간트 차트 구성, 표 그리기)의 시간을 잰다.
+# 크기마다 새 프로세스에서 실행하고 (import/캐시 상태가 섞이지 않도록) 결과를 JSON 하나로 모은다.
+#   python benchmarks/app_benchmark.py --staff 10 1000 100000 --years 1 10 --output results.json
+
+
+def timed(timings, name, function, *args):
+    # 실패한 단계는 시간 대신 오류를 기록하고 다음 단계로 넘어간다
+    started = time.perf_counter()
+    try:
+        result = function(*args)
+    except Exception as e:
+        timings[name] = {'error': f'{type(e).__name__}: {e}'}
+        return None
+    timings[name] = round(time.perf_counter() - started, 4)
+    return result
+
+
+def load_all(repository):
+    return repository.load_staff(), repository.load_vacations(), repository.load_holidays()
+
+
+def run_case(data_dir, year, years):
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    # get_repository()는 현재 폴더의 CSV를 쓴다
+    os.chdir(data_dir)
+    timings = {}
+
+    started = time.perf_counter()
+    from PyQt5.QtWidgets import QApplication
+    from PyQt5.QtCore import Qt
+    from storage import CsvRepository
+    from generation_worker import GenerationWorker
+    from workday_calendar import get_workday_calendar
+    from duty_scheduler import DutyScheduler
+    from gantt_chart import build_gantt_figure, GanttCanvas
+    from staff_manager import StaffManager
+    timings['import'] = round(time.perf_counter() - started, 4)
+    app = QApplication.instance() or QApplication([])
+
+    repository = CsvRepository(data_dir)
+    for path in glob.glob(os.path.join(data_dir, '*.npz')):
+        os.remove(path)
+    timed(timings, 'csv_load_cold', load_all, repository)
+    staff_df, vacation_df, holidays_df = timed(timings, 'csv_load_warm', load_all, repository)
+
+    scheduler = timed(timings, 'duty_scheduler_init', DutyScheduler)
+    start = datetime.date(year, 1, 1).toordinal()
+    end = datetime.date(year + years - 1, 12, 31).toordinal()
+
+    # 일정 생성 창이 QThreadPool에서 돌리는 작업을 그대로 (같은 스레드에서) 실행
+    result = {}
+    worker = GenerationWorker(scheduler.load_generation_staff(), vacation_df, get_workday_calendar().holidays, start, end)
+    worker.signals.finished.connect(result.update)
+    worker.signals.failed.connect(lambda message: result.update(error=message))
+    timed(timings, 'generate_duty_schedule', worker.run)
+    if 'duty_df' not in result:
+        timings['generate_duty_schedule'] = {'error': result.get('error', 'cancelled')}
+        return {'timings': timings}
+    duty_df = result['duty_df']
+
+    scheduler.duty_df = duty_df
+    timed(timings, 'duty_table_set_dataframe', scheduler.model.set_dataframe, duty_df)
+    timed(timings, 'statistics_reset', scheduler.reset_statistics)
+    timed(timings, 'update_duty_counts', scheduler.update_duty_counts)
+    # 셀 하나 편집 → 통계 증분 반영
+    index = scheduler.model.index(0, 1)
+    timed(timings, 'duty_cell_edit', scheduler.model.setData, index, duty_df.iat[len(duty_df) // 2, 2], Qt.EditRole)
+    scheduler.resize(1200, 800)
+    timed(timings, 'duty_table_render', scheduler.duty_tree.grab)
+
+    holidays = get_workday_calendar().holidays
+    timed(timings, 'create_gantt_chart', build_gantt_figure, duty_df, holidays)
+    canvas = GanttCanvas()
+    timed(timings, 'gantt_canvas_set_schedule', canvas.set_schedule, duty_df, holidays)
+    canvas.resize(1200, 800)
+    timed(timings, 'gantt_canvas_render', canvas.grab)
+
+    manager = timed(timings, 'staff_manager_init', StaffManager)
+    if manager is not None:
+        timed(timings, 'update_staff_table', manager.update_staff_table)
+        manager.resize(800, 600)
+        timed(timings, 'staff_table_render', manager.staff_table.grab)
+    app.processEvents()
+    return {'duty_days': len(duty_df), 'timings': timings}
+
+
+def run_suite(staff_sizes, year_spans, year, seed, keep_data=False):
+    cases = []
+    for num_staff in staff_sizes:
+        for years in year_spans:
+            data_dir = tempfile.mkdtemp(prefix=f'duty_bench_{num_staff}_{years}_')
+            try:
+                started = time.perf_counter()
+                write_dataset(data_dir, num_staff, year, years, seed)
+                generated = round(time.perf_counter() - started, 4)
+                env = dict(os.environ, QT_QPA_PLATFORM='offscreen')
+                process = subprocess.run([sys.executable, os.path.abspath(__file__), '--case', data_dir, '--year', str(year), '--years', str(years)],
+                                         env=env, capture_output=True, text=True)
+                if process.returncode == 0:
+                    case = json.loads(process.stdout.strip().splitlines()[-1])
+                else:
+                    case = {'error': process.stderr.strip().splitlines()[-1] if process.stderr.strip() else f'exit {process.returncode}'}
+            finally:
+                if not keep_data:
+                    shutil.rmtree(data_dir, ignore_errors=True)
+            case.update(staff=num_staff, years=years, dataset_seconds=generated)
+            print(json.dumps(case, ensure_ascii=False), file=sys.stderr)
+            cases.append(case)
+    return cases
+
+
+def environment():
+    import numpy as np
+    import pandas as pd
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'created': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': commit,
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'numpy': np.__version__, 'pandas': pd.__version__}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="합성 데이터로 주요 경로의 실행 시간을 재서 JSON으로 저장")
+    parser.add_argument('--staff', type=int, nargs='+', default=[10, 1000, 10000])
+    parser.add_argument('--years', type=int, nargs='+', default=[1])
+    parser.add_argument('--year', type=int, default=2024)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--keep-data', action='store_true', help="합성 CSV 폴더를 지우지 않는다")
+    parser.add_argument('--case', metavar='DATA_DIR', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args.year, args.years[0]), ensure_ascii=False))
+    else:
+        results = {'environment': environment(), 'cases': run_suite(args.staff, args.years, args.year, args.seed, args.keep_data)}
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
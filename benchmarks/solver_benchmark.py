@@ -0,0 +1,46 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from schedule_engine import ScheduleEngine
+from schedule_solver import FairScheduleSolver
+from vacation_matrix import VacationMatrix
+from workday_calendar import WorkdayCalendar
+from fairness import fairness_metrics
+from synthetic import synthetic_staff, synthetic_vacations
+
+
+def run(num_staff, year, time_budget, seed):
+    staff_df = synthetic_staff(num_staff, seed)
+    vacation_df = synthetic_vacations(staff_df, year, seed=seed)
+    workday_calendar = WorkdayCalendar()
+    workday_calendar.set_holidays([])
+    ordinals = workday_calendar.workday_ordinals(datetime.date(year, 1, 1), datetime.date(year, 12, 31))
+    names = staff_df.loc[staff_df['On Duty'], 'Name']
+
+    results = {}
+    for label, solver in (('random', None), ('solver', FairScheduleSolver(time_budget=time_budget, seed=seed))):
+        engine = ScheduleEngine.from_staff_df(staff_df, seed=seed)
+        vacations = VacationMatrix.from_dataframe(vacation_df, engine.names, ordinals[0], ordinals[-1])
+        started = time.perf_counter()
+        rows = engine.generate(ordinals, vacations, solver)
+        elapsed = time.perf_counter() - started
+        results[label] = dict(seconds=round(elapsed, 3), **fairness_metrics(pd.DataFrame(rows), names))
+    return {'staff': num_staff, 'days': len(ordinals), 'time_budget': time_budget, 'results': results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="무작위 추첨과 공정성 최적화 배정기의 속도/공정성 비교")
+    parser.add_argument('--staff', type=int, default=1000)
+    parser.add_argument('--year', type=int, default=2024)
+    parser.add_argument('--time-budget', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(run(args.staff, args.year, args.time_budget, args.seed), ensure_ascii=False, indent=2))
@@ -0,0 +1,69 @@
+import argparse
+import datetime
+import os
+import numpy as np
+import pandas as pd
+
+# 벤치마크용 합성 데이터 (staff.csv / vacations.csv / holidays.csv). 같은 seed면 같은 파일이 나온다
+
+# 양력 고정 공휴일 (월, 일, 이름)
+FIXED_HOLIDAYS = [(1, 1, '신정'), (3, 1, '삼일절'), (5, 5, '어린이날'), (6, 6, '현충일'),
+                  (8, 15, '광복절'), (10, 3, '개천절'), (10, 9, '한글날'), (12, 25, '성탄절')]
+
+
+def synthetic_staff(num_staff, seed=0, on_duty_ratio=0.9):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Name': [f'직원{i:06d}' for i in range(num_staff)],
+        'Gender': rng.choice(['남자', '여자'], size=num_staff),
+        'On Duty': rng.random(num_staff) < on_duty_ratio,
+        'Last Duty Day': pd.NaT,
+    })
+
+
+def synthetic_vacations(staff_df, start_year, years=1, per_staff_year=2, max_days=10, seed=0):
+    # 직원 한 명당 1년에 평균 per_staff_year번, 1~max_days일짜리 휴가
+    rng = np.random.default_rng(seed + 1)
+    first = datetime.date(start_year, 1, 1).toordinal()
+    span = datetime.date(start_year + years, 1, 1).toordinal() - first
+    count = len(staff_df) * per_staff_year * years
+    starts = first + rng.integers(0, span, size=count)
+    ends = starts + rng.integers(0, max_days, size=count)
+    return pd.DataFrame({
+        'Name': rng.choice(staff_df['Name'].to_numpy(), size=count),
+        'Start Date': [datetime.date.fromordinal(int(o)) for o in starts],
+        'End Date': [datetime.date.fromordinal(int(o)) for o in ends],
+    }).sort_values('Start Date', ignore_index=True)
+
+
+def synthetic_holidays(start_year, years=1, extra_per_year=6, seed=0):
+    # 고정 공휴일에 해마다 임의의 날짜(명절/대체공휴일 대신)를 더한다
+    rng = np.random.default_rng(seed + 2)
+    rows = []
+    for year in range(start_year, start_year + years):
+        rows.extend((datetime.date(year, month, day), name) for month, day, name in FIXED_HOLIDAYS)
+        first = datetime.date(year, 1, 1).toordinal()
+        for ordinal in first + rng.choice(365, size=extra_per_year, replace=False):
+            rows.append((datetime.date.fromordinal(int(ordinal)), '임시 공휴일'))
+    holidays_df = pd.DataFrame(rows, columns=['Date', 'Holiday Name'])
+    return holidays_df.drop_duplicates('Date').sort_values('Date', ignore_index=True)
+
+
+def write_dataset(data_dir, num_staff, start_year, years=1, seed=0):
+    os.makedirs(data_dir, exist_ok=True)
+    staff_df = synthetic_staff(num_staff, seed)
+    staff_df.to_csv(os.path.join(data_dir, 'staff.csv'), index=False)
+    synthetic_vacations(staff_df, start_year, years, seed=seed).to_csv(os.path.join(data_dir, 'vacations.csv'), index=False)
+    synthetic_holidays(start_year, years, seed=seed).to_csv(os.path.join(data_dir, 'holidays.csv'), index=False)
+    return data_dir
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="합성 staff/vacations/holidays CSV 생성")
+    parser.add_argument('data_dir')
+    parser.add_argument('--staff', type=int, default=1000)
+    parser.add_argument('--year', type=int, default=2024)
+    parser.add_argument('--years', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    write_dataset(args.data_dir, args.staff, args.year, args.years, args.seed)
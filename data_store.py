@@ -0,0 +1,103 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+from storage import get_repository, overlapping_vacations
+from workday_calendar import get_workday_calendar
+from instrumentation import span
+
+
+# 직원/휴가/공휴일/당직 데이터를 프로세스 안에서 한 번만 읽어 들고 있는 공용 저장소.
+# 값이 바뀌면 *_changed 시그널로 새 DataFrame을 알려 주므로 화면은 디스크를 다시 읽지 않는다.
+class DataStore(QObject):
+    staff_changed = pyqtSignal(object)
+    vacations_changed = pyqtSignal(object)
+    holidays_changed = pyqtSignal(object)
+    duties_changed = pyqtSignal(object)
+
+    def __init__(self, repository=None, parent=None):
+        super(DataStore, self).__init__(parent)
+        self.repository = repository or get_repository()
+        self._staff = None
+        self._vacations = None
+        self._holidays = None
+        self._duties = None
+
+    def staff(self):
+        if self._staff is None:
+            with span('load staff', 'io'):
+                self._staff = self.repository.load_staff()
+        return self._staff
+
+    def vacations(self):
+        if self._vacations is None:
+            with span('load vacations', 'io'):
+                self._vacations = self.repository.load_vacations()
+        return self._vacations
+
+    def holidays(self):
+        if self._holidays is None:
+            with span('load holidays', 'io'):
+                self._holidays = self.repository.load_holidays()
+            get_workday_calendar().set_holidays(self._holidays['Date'].dropna())
+        return self._holidays
+
+    def duties(self):
+        if self._duties is None:
+            with span('load duties', 'io'):
+                self._duties = self.repository.load_duties()
+        return self._duties
+
+    def vacations_between(self, start, end):
+        if self._vacations is None:
+            return self.repository.vacations_between(start, end)
+        return overlapping_vacations(self._vacations, start, end).reset_index(drop=True)
+
+    # 저장에 실패하면(ValueError 등) 들고 있는 값도 바꾸지 않는다
+    def set_staff(self, staff_df, save=False):
+        if save:
+            with span('save staff', 'io'):
+                self.repository.save_staff(staff_df)
+        self._staff = staff_df
+        self.staff_changed.emit(staff_df)
+
+    def set_vacations(self, vacation_df, save=False):
+        if save:
+            with span('save vacations', 'io'):
+                self.repository.save_vacations(vacation_df)
+        self._vacations = vacation_df
+        self.vacations_changed.emit(vacation_df)
+
+    def set_holidays(self, holidays_df, save=False):
+        if save:
+            with span('save holidays', 'io'):
+                self.repository.save_holidays(holidays_df)
+        self._holidays = holidays_df
+        get_workday_calendar().set_holidays(holidays_df['Date'].dropna())
+        self.holidays_changed.emit(holidays_df)
+
+    def set_duties(self, duty_df, save=False):
+        if save:
+            with span('save duties', 'io'):
+                self.repository.save_duties(duty_df)
+        self._duties = duty_df
+        self.duties_changed.emit(duty_df)
+
+    def reload_staff(self):
+        self.set_staff(self.repository.load_staff())
+
+    def reload_vacations(self):
+        self.set_vacations(self.repository.load_vacations())
+
+    def reload_holidays(self):
+        self.set_holidays(self.repository.load_holidays())
+
+    def reload_duties(self):
+        self.set_duties(self.repository.load_duties())
+
+
+_data_store = None
+
+
+def get_data_store():
+    global _data_store
+    if _data_store is None:
+        _data_store = DataStore()
+    return _data_store
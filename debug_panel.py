@@ -0,0 +1,75 @@
+import sys
+from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton, QHeaderView, QLabel, QFileDialog
+from PyQt5.QtCore import Qt
+import instrumentation
+
+SUMMARY_COLUMNS = [('name', '구간'), ('category', '분류'), ('count', '횟수'), ('total_ms', '합계 (ms)'), ('mean_ms', '평균 (ms)'), ('max_ms', '최대 (ms)')]
+
+
+# DUTY_TRACE=1 로 실행했을 때 측정 구간별 합계를 보여 주고 Chrome trace로 저장하는 창
+class DebugPanel(QDialog):
+    def __init__(self, parent=None):
+        super(DebugPanel, self).__init__(parent)
+        self.setWindowTitle("성능 측정")
+        self.setGeometry(100, 100, 800, 500)
+
+        layout = QVBoxLayout()
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+
+        self.summary_table = QTableWidget()
+        self.summary_table.setColumnCount(len(SUMMARY_COLUMNS))
+        self.summary_table.setHorizontalHeaderLabels([label for _, label in SUMMARY_COLUMNS])
+        self.summary_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.summary_table.horizontalHeader().setStretchLastSection(True)
+        self.summary_table.verticalHeader().setVisible(False)
+        layout.addWidget(self.summary_table)
+
+        button_layout = QHBoxLayout()
+        refresh_button = QPushButton("새로 고침")
+        export_button = QPushButton("Chrome trace 저장")
+        clear_button = QPushButton("기록 지우기")
+        button_layout.addWidget(refresh_button)
+        button_layout.addWidget(export_button)
+        button_layout.addWidget(clear_button)
+        layout.addLayout(button_layout)
+
+        self.setLayout(layout)
+
+        refresh_button.clicked.connect(self.update_summary)
+        export_button.clicked.connect(self.export_trace)
+        clear_button.clicked.connect(self.clear_trace)
+
+        self.update_summary()
+
+    def update_summary(self):
+        if not instrumentation.ENABLED:
+            self.status_label.setText("측정이 꺼져 있습니다. DUTY_TRACE=1 로 실행하세요.")
+        rows = instrumentation.summary()
+        self.summary_table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            for j, (key, _) in enumerate(SUMMARY_COLUMNS):
+                value = row[key]
+                item = QTableWidgetItem(f"{value:.2f}" if isinstance(value, float) else str(value))
+                if j >= 2:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.summary_table.setItem(i, j, item)
+        if instrumentation.ENABLED:
+            self.status_label.setText(f"측정 구간 {len(rows)}종, 기록 {sum(row['count'] for row in rows)}건")
+
+    def export_trace(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Chrome trace 저장", instrumentation.TRACE_FILE, "JSON Files (*.json)")
+        if path:
+            instrumentation.export_chrome_trace(path)
+            self.status_label.setText(f"{path}에 저장했습니다.")
+
+    def clear_trace(self):
+        instrumentation.clear()
+        self.update_summary()
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    window = DebugPanel()
+    window.show()
+    sys.exit(app.exec_())
@@ -0,0 +1,288 @@
+import argparse
+import datetime
+import json
+import os
+import sys
+import pandas as pd
+from storage import CsvRepository, SQLiteRepository, DATABASE_FILE, DUTY_COLUMNS, TEAM_COLUMN
+from schedule_engine import ScheduleEngine, NO_DUTY_DAY
+from schedule_repair import ScheduleRepairer
+from schedule_solver import FairScheduleSolver, DEFAULT_TIME_BUDGET
+from scenario_runner import run_scenarios
+from vacation_matrix import VacationMatrix
+from workday_calendar import WorkdayCalendar
+from fairness import fairness_metrics
+from exporters import EXPORT_FORMATS, export_schedule
+from team_scheduler import generate_teams, team_schedules, cross_team_conflicts, format_conflicts
+from rule_engine import load_rules, RULES_FILE
+from korean_holidays import holidays_between, merge_holidays
+from duty_history import DutyHistory, HISTORY_DIR, FAIRNESS_WINDOW_DAYS
+
+# 화면 없이 (cron 등에서) 일정을 생성/수정/검사/내보내는 명령줄 도구. QApplication은 만들지 않는다.
+#   python -m duty_cli generate --start 2024-07-01 --end 2024-12-31 --data-dir team_a --data-dir team_b
+#   python -m duty_cli generate --start 2024-07-01 --end 2024-12-31 --by-team   (한 폴더 안에서 Team 열로 나눠 병렬 생성)
+
+EXIT_OK = 0
+EXIT_INVALID = 1  # 검사에서 규칙 위반이 남은 경우
+EXIT_ERROR = 3    # 입력 파일 오류, 배정 불가 등 (2는 argparse 사용법 오류)
+
+
+def open_repository(data_dir, storage):
+    if storage == 'sqlite':
+        database = os.path.join(data_dir, DATABASE_FILE)
+        is_new = not os.path.exists(database)
+        repository = SQLiteRepository(database)
+        if is_new:
+            repository.import_csv(data_dir)
+        return repository
+    return CsvRepository(data_dir)
+
+
+def generation_staff(repository):
+    staff_df = repository.load_staff().copy()
+    staff_df['Last Duty Day'] = pd.to_datetime(staff_df['Last Duty Day']).fillna(pd.Timestamp(NO_DUTY_DAY))
+    if 'Duty Count' not in staff_df.columns:
+        staff_df['Duty Count'] = 0
+    return staff_df
+
+
+def history_for(args):
+    return DutyHistory(os.path.join(args.current_dir, HISTORY_DIR))
+
+
+def save_duties(args, repository, duty_df):
+    # duties 파일은 덮어쓰고, 바뀐 날짜는 기록 저장소에 덧붙인다
+    repository.save_duties(duty_df)
+    return history_for(args).archive(duty_df)
+
+
+def load_duty_table(repository):
+    duty_df = repository.load_duties()
+    for column in DUTY_COLUMNS:
+        if column not in duty_df.columns:
+            duty_df[column] = ""
+    return duty_df
+
+
+def duties_in_range(duty_df, start=None, end=None):
+    if start is None and end is None:
+        return duty_df
+    dates = pd.to_datetime(duty_df['Date'].astype(str).str.slice(0, 10), errors='coerce')
+    keep = pd.Series(True, index=duty_df.index)
+    if start is not None:
+        keep &= dates >= pd.Timestamp(start)
+    if end is not None:
+        keep &= dates <= pd.Timestamp(end)
+    return duty_df[keep]
+
+
+def rules_for(args):
+    # 상대 경로는 팀 폴더 기준. 파일이 없으면 추가 규칙 없음
+    return load_rules(os.path.join(args.current_dir, args.rules))
+
+
+def generate(args, repository):
+    if args.end < args.start:
+        raise ValueError("종료 날짜가 시작 날짜보다 빠릅니다.")
+    workday_calendar = WorkdayCalendar(repository)
+    duty_history = history_for(args)
+    staff_df = duty_history.seed_staff(generation_staff(repository), args.start, args.history_days)
+    vacation_df = repository.vacations_between(args.start, args.end)
+    start, end = args.start.toordinal(), args.end.toordinal()
+    rules = duty_history.seed_rules(rules_for(args), args.start)
+
+    if args.by_team:
+        solver = FairScheduleSolver(time_budget=args.time_budget, seed=args.seed) if args.mode == 'fair' else None
+        result = generate_teams(staff_df, vacation_df, workday_calendar.holidays, start, end, solver, seed=args.seed,
+                                max_workers=args.workers, exclusive_staff=not args.allow_shared_staff, rules=rules)
+        duty_df = result['duty_df']
+        if not args.dry_run:
+            save_duties(args, repository, duty_df)
+        names = staff_df.loc[staff_df['On Duty'].fillna(False).astype(bool), 'Name'].unique()
+        conflicts = format_conflicts(result['conflicts'])
+        return (EXIT_INVALID if conflicts else EXIT_OK), {
+            'generated': len(duty_df), 'teams': result['teams'], 'reassigned': len(result['reassigned']),
+            'conflicts': conflicts, **fairness_metrics(duty_df, names)}
+    if args.scenarios > 1:
+        result = run_scenarios(staff_df, vacation_df, workday_calendar.holidays, start, end,
+                               range(args.seed, args.seed + args.scenarios), max_workers=args.workers, rules=rules)
+        duty_df = result['duty_df']
+    else:
+        solver = FairScheduleSolver(time_budget=args.time_budget, seed=args.seed) if args.mode == 'fair' else None
+        engine = ScheduleEngine.from_staff_df(staff_df, seed=args.seed, rules=rules)
+        vacations = VacationMatrix.from_dataframe(vacation_df, engine.names, start, end)
+        rows = [row for _, _, month_rows in engine.generate_months(workday_calendar, start, end, vacations, solver)
+                for row in month_rows]
+        duty_df = pd.DataFrame(rows, columns=DUTY_COLUMNS)
+
+    if not args.dry_run:
+        save_duties(args, repository, duty_df)
+    names = staff_df.loc[staff_df['On Duty'].fillna(False).astype(bool), 'Name']
+    return EXIT_OK, {'generated': len(duty_df), **fairness_metrics(duty_df, names)}
+
+
+def repair(args, repository):
+    duty_df = load_duty_table(repository)
+    if duty_df.empty:
+        return EXIT_OK, {'reassigned': 0, 'removed': 0, 'added': 0}
+    workday_calendar = WorkdayCalendar(repository)
+    staff_df, vacation_df = generation_staff(repository), repository.load_vacations()
+    rules = rules_for(args)
+    summary = {'reassigned': 0, 'removed': 0, 'added': 0, 'invalid': 0}
+    frames = []
+    # 팀마다 따로 고친다 (팀이 없으면 전체가 한 팀)
+    for team, team_duty_df, team_staff, team_vacations in team_schedules(duty_df, staff_df, vacation_df):
+        repairer = ScheduleRepairer(team_duty_df, team_staff, team_vacations, workday_calendar, seed=args.seed, rules=rules)
+        # 생성 당시 입력을 알 수 없으므로 일정에 나오는 모든 직원과 공휴일을 다시 검사
+        report = repairer.repair(changed_names=list(repairer.duties), changed_holidays=workday_calendar.holidays)
+        if TEAM_COLUMN in duty_df.columns:
+            # 공휴일이 풀려 새로 생긴 행에도 팀을 채운다
+            repairer.duty_df[TEAM_COLUMN] = team
+        frames.append(repairer.duty_df)
+        for key, value in report.items():
+            summary[key] += len(value)
+        summary['invalid'] += len(repairer.validate())
+    if not args.dry_run:
+        save_duties(args, repository, pd.concat(frames, ignore_index=True))
+    return (EXIT_INVALID if summary['invalid'] else EXIT_OK), summary
+
+
+def validate(args, repository):
+    duty_df = duties_in_range(load_duty_table(repository), args.start, args.end)
+    if duty_df.empty:
+        return EXIT_OK, {'checked': 0, 'invalid': []}
+    workday_calendar = WorkdayCalendar(repository)
+    staff_df, vacation_df = generation_staff(repository), repository.load_vacations()
+    rules = rules_for(args)
+    invalid, broken = [], []
+    for team, team_duty_df, team_staff, team_vacations in team_schedules(duty_df, staff_df, vacation_df):
+        repairer = ScheduleRepairer(team_duty_df, team_staff, team_vacations, workday_calendar)
+        invalid += [dict({'team': team} if team else {}, date=datetime.date.fromordinal(ordinal).isoformat(), slot=column or '근무일 아님')
+                    for ordinal, column in repairer.validate()]
+        if rules:
+            broken += [dict({'team': team} if team else {}, date=date, name=name, rule=rule)
+                       for date, name, rule in rules.compile(team_staff).violations(team_duty_df)]
+    conflicts = format_conflicts(cross_team_conflicts(duty_df))
+    return (EXIT_INVALID if invalid or conflicts or broken else EXIT_OK), {
+        'checked': len(duty_df), 'invalid': invalid, 'conflicts': conflicts, 'rule_violations': broken}
+
+
+def export(args, repository):
+    duty_df = duties_in_range(load_duty_table(repository), args.start, args.end)
+    # 상대 경로는 팀 폴더 기준이다 (team_a/duties_export.csv 처럼 팀마다 따로 쓴다)
+    output = os.path.join(args.current_dir, args.output)
+    written = export_schedule(duty_df, output, args.format)
+    files = len(written) if isinstance(written, list) else 1
+    return EXIT_OK, {'exported': len(duty_df), 'output': output, 'files': files}
+
+
+def holidays(args, repository):
+    # 내장 표로 만든 공휴일을 holidays 파일에 한 번에 더한다 (이미 있는 날짜는 그대로)
+    if args.to_year < args.from_year:
+        raise ValueError("마지막 연도가 시작 연도보다 빠릅니다.")
+    merged, added = merge_holidays(repository.load_holidays(), holidays_between(args.from_year, args.to_year))
+    if not args.dry_run:
+        repository.save_holidays(merged)
+    return EXIT_OK, {'added': added, 'holidays': len(merged)}
+
+
+def history(args, repository):
+    # 기록 저장소 조회: 날짜의 당번, 직원의 당직일, 기간별 당번 횟수
+    duty_history = history_for(args)
+    if args.rebuild:
+        duty_history.rebuild_index()
+    summary = {}
+    if args.date is not None:
+        summary['on_duty'] = [dict({'team': team} if team else {}, name=name) for name, team in duty_history.on_duty(args.date)]
+    if args.name:
+        summary['dates'] = {name: [datetime.date.fromordinal(int(ordinal)).isoformat() for ordinal in duty_history.dates_of(name, args.start, args.end)]
+                            for name in args.name}
+    if args.date is None and not args.name:
+        counts = duty_history.duty_counts(args.start, args.end)
+        summary['counts'] = {name: int(count) for name, count in counts[counts > 0].sort_values(ascending=False, kind='stable').items()}
+    return EXIT_OK, summary
+
+
+def parse_date(text):
+    try:
+        return datetime.date.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"날짜 형식은 YYYY-MM-DD 입니다: {text}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='duty_cli', description="당직 일정 생성/수정/검사/내보내기 (화면 없이 실행)")
+    parser.add_argument('--data-dir', action='append', default=None,
+                        help="staff/vacations/holidays/duties 파일이 있는 폴더. 여러 번 주면 팀마다 차례로 처리 (기본: 현재 폴더)")
+    parser.add_argument('--rules', default=RULES_FILE, help="추가 당번 규칙(JSON) 파일. 상대 경로는 --data-dir 기준")
+    parser.add_argument('--storage', choices=['csv', 'sqlite'], default=os.environ.get('DUTY_STORAGE', 'csv').lower())
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate_parser = commands.add_parser('generate', help="기간 전체 일정을 생성해 duties 파일을 덮어쓴다")
+    generate_parser.add_argument('--start', type=parse_date, required=True)
+    generate_parser.add_argument('--end', type=parse_date, required=True)
+    generate_parser.add_argument('--mode', choices=['random', 'fair'], default='random', help="무작위 추첨 / 공정성 최적화")
+    generate_parser.add_argument('--time-budget', type=float, default=DEFAULT_TIME_BUDGET)
+    generate_parser.add_argument('--scenarios', type=int, default=1, help="2 이상이면 seed를 바꿔 여러 후보를 만들고 가장 공정한 일정을 고른다")
+    generate_parser.add_argument('--workers', type=int, default=None)
+    generate_parser.add_argument('--seed', type=int, default=0)
+    generate_parser.add_argument('--dry-run', action='store_true', help="파일에 쓰지 않고 결과만 출력")
+    generate_parser.add_argument('--by-team', action='store_true', help="staff의 Team 열로 나눠 팀마다 다른 프로세스에서 생성하고 하나로 합친다")
+    generate_parser.add_argument('--history-days', type=int, default=FAIRNESS_WINDOW_DAYS,
+                                 help="시작일 전 이 기간의 당직 기록(history 폴더)으로 당번 횟수와 마지막 당직일을 이어받는다")
+    generate_parser.add_argument('--allow-shared-staff', action='store_true', help="--by-team: 같은 날 두 팀 당번에 들어가는 것을 고치지 않고 보고만 한다")
+    generate_parser.set_defaults(handler=generate)
+
+    repair_parser = commands.add_parser('repair', help="휴가/직원/공휴일 변경으로 무효가 된 자리만 다시 배정")
+    repair_parser.add_argument('--seed', type=int, default=None)
+    repair_parser.add_argument('--dry-run', action='store_true')
+    repair_parser.set_defaults(handler=repair)
+
+    validate_parser = commands.add_parser('validate', help="규칙 위반(휴가 중, 당번 제외, 근무일 아님)을 검사")
+    validate_parser.add_argument('--start', type=parse_date, default=None)
+    validate_parser.add_argument('--end', type=parse_date, default=None)
+    validate_parser.set_defaults(handler=validate)
+
+    export_parser = commands.add_parser('export', help="일정을 CSV/Excel/직원별 iCalendar로 내보내기")
+    export_parser.add_argument('--output', required=True, help="상대 경로는 --data-dir 폴더 기준. ics는 직원별 파일을 둘 폴더")
+    export_parser.add_argument('--format', choices=list(EXPORT_FORMATS), default=None, help="기본: --output 확장자로 판단")
+    export_parser.add_argument('--start', type=parse_date, default=None)
+    export_parser.add_argument('--end', type=parse_date, default=None)
+    export_parser.set_defaults(handler=export)
+
+    holidays_parser = commands.add_parser('holidays', help="한국 공휴일(음력 공휴일, 대체공휴일 포함)을 연도 범위로 채우기")
+    holidays_parser.add_argument('--from-year', type=int, required=True)
+    holidays_parser.add_argument('--to-year', type=int, required=True)
+    holidays_parser.add_argument('--dry-run', action='store_true')
+    holidays_parser.set_defaults(handler=holidays)
+
+    history_parser = commands.add_parser('history', help="지난 당직 기록 조회 (날짜별 당번, 직원별 당직일, 기간별 횟수)")
+    history_parser.add_argument('--date', type=parse_date, default=None, help="이 날의 당번")
+    history_parser.add_argument('--name', action='append', default=None, help="이 직원의 당직일. 여러 번 줄 수 있다")
+    history_parser.add_argument('--start', type=parse_date, default=None)
+    history_parser.add_argument('--end', type=parse_date, default=None)
+    history_parser.add_argument('--rebuild', action='store_true', help="파티션을 모두 읽어 색인을 다시 만든다")
+    history_parser.set_defaults(handler=history)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.data_dir = args.data_dir or ['.']
+    status = EXIT_OK
+    for data_dir in args.data_dir:
+        try:
+            args.current_dir = data_dir
+            repository = open_repository(data_dir, args.storage)
+            code, summary = args.handler(args, repository)
+        except (OSError, ValueError, KeyError, RuntimeError) as e:
+            print(f"{data_dir}: {e}", file=sys.stderr)
+            status = max(status, EXIT_ERROR)
+            continue
+        print(json.dumps({'data_dir': data_dir, 'command': args.command, **summary}, ensure_ascii=False, default=str))
+        status = max(status, code)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
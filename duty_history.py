@@ -0,0 +1,359 @@
+import datetime
+import glob
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from schedule_engine import to_ordinal, to_ordinals, ordinals_to_datetimes, format_duty_date, NO_DUTY_DAY
+from storage import DUTY_COLUMNS, TEAM_COLUMN, DEFAULT_TEAM
+from instrumentation import span
+
+# 지난 당직 일정을 지우지 않고 쌓아 두는 기록 저장소. duties.csv는 지금 편집 중인 일정만 갖고,
+# 저장할 때마다 바뀐 날짜만 history/연도/월.csv 파티션 끝에 덧붙인다 (같은 날짜는 나중 기록이 이긴다).
+# 직원 이름 → 당직일, 날짜 → 당번 색인은 history/index.npz에 두므로 조회는 파티션을 읽지 않는다.
+#   history/2024/07.csv, history/2024/08.csv, ..., history/index.npz
+HISTORY_DIR = 'history'
+INDEX_FILE = 'index.npz'
+INDEX_VERSION = 2
+REVISION_COLUMN = 'Revision'
+HISTORY_COLUMNS = DUTY_COLUMNS + [TEAM_COLUMN, REVISION_COLUMN]
+# 생성할 때 당번 횟수를 이어받는 기간 (시작일 이전 일수)
+FAIRNESS_WINDOW_DAYS = 365
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _duty_frame(duty_df):
+    # 일정표 → 날짜 서수, 두 당번, 팀 (날짜가 없는 행은 버린다)
+    ordinals = to_ordinals(duty_df['Date'])
+    teams = duty_df[TEAM_COLUMN].fillna(DEFAULT_TEAM).astype(str) if TEAM_COLUMN in duty_df.columns else DEFAULT_TEAM
+    frame = pd.DataFrame({
+        'ordinal': ordinals,
+        'Employee 1': duty_df['Employee 1'].fillna('').astype(str).to_numpy(),
+        'Employee 2': duty_df['Employee 2'].fillna('').astype(str).to_numpy(),
+        'team': teams if isinstance(teams, str) else teams.to_numpy(),
+    })
+    return frame[frame['ordinal'] != NO_DUTY_DAY.toordinal()].drop_duplicates(['ordinal', 'team'], keep='last')
+
+
+class DutyHistory:
+    def __init__(self, directory=HISTORY_DIR):
+        self.directory = directory
+        self._index = None
+
+    def partition_path(self, year, month):
+        return os.path.join(self.directory, f'{year:04d}', f'{month:02d}.csv')
+
+    def partitions(self):
+        # {상대 경로: 절대 경로} 연/월 순서
+        paths = sorted(glob.glob(os.path.join(self.directory, '[0-9][0-9][0-9][0-9]', '[0-9][0-9].csv')))
+        return {os.path.relpath(path, self.directory): path for path in paths}
+
+    # ---- 색인 ----
+    # 유효한 (마지막 기록) 당번 한 자리씩: 날짜순 배열 ordinals/names/teams/slots와
+    # 이름순 순열 by_name + 이름별 시작 위치 name_offsets (CSR)
+
+    def index(self):
+        if self._index is None:
+            self._index = self._load_index()
+            if self._index is None:
+                self.rebuild_index()
+        return self._index
+
+    def _load_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        try:
+            with np.load(path, allow_pickle=False) as snapshot:
+                meta = json.loads(str(snapshot['__meta__']))
+                partitions = self.partitions()
+                if meta['version'] != INDEX_VERSION or meta['partitions'] != {key: _file_key(path) for key, path in partitions.items()}:
+                    return None
+                index = {key: snapshot[key] for key in ('ordinals', 'names', 'teams', 'slots', 'by_name', 'name_offsets')}
+        except (OSError, KeyError, ValueError):
+            return None
+        index.update(name_table=meta['names'], team_table=meta['teams'], revision=meta['revision'], spans=meta['spans'],
+                     name_codes={name: i for i, name in enumerate(meta['names'])})
+        return index
+
+    def _save_index(self, index):
+        meta = {'version': INDEX_VERSION, 'revision': index['revision'], 'names': index['name_table'], 'teams': index['team_table'],
+                'spans': index['spans'],
+                'partitions': {key: _file_key(path) for key, path in self.partitions().items()}}
+        arrays = {key: index[key] for key in ('ordinals', 'names', 'teams', 'slots', 'by_name', 'name_offsets')}
+        path = os.path.join(self.directory, INDEX_FILE)
+        fd, temp_path = tempfile.mkstemp(prefix='.' + INDEX_FILE, suffix='.tmp', dir=os.path.abspath(self.directory))
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, __meta__=np.array(json.dumps(meta, ensure_ascii=False)), **arrays)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def _build_index(self, frame, revision):
+        # frame: 유효한 일정 (ordinal, Employee 1, Employee 2, team)
+        ordinals = np.concatenate([frame['ordinal'].to_numpy(dtype=np.int64)] * 2)
+        names = np.concatenate([frame['Employee 1'].to_numpy(dtype=object), frame['Employee 2'].to_numpy(dtype=object)])
+        teams = np.concatenate([frame['team'].to_numpy(dtype=object)] * 2)
+        slots = np.repeat(np.array([0, 1], dtype=np.int8), len(frame))
+        filled = names != ''
+        ordinals, names, teams, slots = ordinals[filled], names[filled], teams[filled], slots[filled]
+        name_codes, name_table = pd.factorize(names, sort=True)
+        team_codes, team_table = pd.factorize(teams, sort=True)
+        order = np.lexsort((slots, team_codes, ordinals))
+        ordinals, name_codes, team_codes, slots = ordinals[order], name_codes[order], team_codes[order], slots[order]
+        by_name = np.lexsort((ordinals, name_codes))
+        return {
+            'ordinals': ordinals, 'names': name_codes.astype(np.int32), 'teams': team_codes.astype(np.int32), 'slots': slots,
+            'by_name': by_name.astype(np.int64),
+            'name_offsets': np.searchsorted(name_codes[by_name], np.arange(len(name_table) + 1)).astype(np.int64),
+            'name_table': [str(name) for name in name_table], 'team_table': [str(team) for team in team_table],
+            'name_codes': {str(name): i for i, name in enumerate(name_table)}, 'revision': int(revision), 'spans': {},
+        }
+
+    def _effective_frame(self, index, lo=0, hi=None):
+        # 색인의 날짜순 [lo, hi) 구간 → 유효한 일정 (ordinal, Employee 1, Employee 2, team)
+        hi = len(index['ordinals']) if hi is None else hi
+        if hi <= lo:
+            return pd.DataFrame(columns=['ordinal', 'Employee 1', 'Employee 2', 'team'])
+        names = np.asarray(index['name_table'], dtype=object)[index['names'][lo:hi]]
+        frame = pd.DataFrame({'ordinal': index['ordinals'][lo:hi], 'team': np.asarray(index['team_table'], dtype=object)[index['teams'][lo:hi]],
+                              'slot': index['slots'][lo:hi], 'name': names})
+        frame = frame.pivot_table(index=['ordinal', 'team'], columns='slot', values='name', aggfunc='last')
+        frame = frame.reindex(columns=[0, 1]).fillna('').reset_index()
+        return frame.rename(columns={0: 'Employee 1', 1: 'Employee 2'})[['ordinal', 'Employee 1', 'Employee 2', 'team']]
+
+    def _splice_index(self, index, lo, hi, frame, revision):
+        # 날짜순 배열의 [lo, hi) 구간을 frame(그 기간의 유효한 일정)으로 바꾼 새 색인. 처음 보는 이름/팀은 표 끝에 붙이고,
+        # by_name은 남는 항목의 위치만 옮긴 뒤 새 항목을 끼워 넣으므로 전체를 다시 정렬하지 않는다
+        name_table, team_table = list(index['name_table']), list(index['team_table'])
+        name_codes, team_codes = dict(index['name_codes']), {team: i for i, team in enumerate(team_table)}
+        ordinals = np.concatenate([frame['ordinal'].to_numpy(dtype=np.int64)] * 2)
+        names = np.concatenate([frame['Employee 1'].to_numpy(dtype=object), frame['Employee 2'].to_numpy(dtype=object)])
+        teams = np.concatenate([frame['team'].to_numpy(dtype=object)] * 2)
+        slots = np.repeat(np.array([0, 1], dtype=np.int8), len(frame))
+        filled = names != ''
+        ordinals, names, teams, slots = ordinals[filled], names[filled], teams[filled], slots[filled]
+        for name in pd.unique(names):
+            if name not in name_codes:
+                name_codes[name] = len(name_table)
+                name_table.append(str(name))
+        for team in pd.unique(teams):
+            if team not in team_codes:
+                team_codes[team] = len(team_table)
+                team_table.append(str(team))
+        codes = np.array([name_codes[name] for name in names], dtype=np.int32)
+        team_ids = np.array([team_codes[team] for team in teams], dtype=np.int32)
+        order = np.lexsort((slots, team_ids, ordinals))
+        ordinals, codes, team_ids, slots = ordinals[order], codes[order], team_ids[order], slots[order]
+
+        # 이름순 순열: 구간 밖 항목은 위치만 밀고, 구간 새 항목은 (이름, 위치) 순서 자리에 끼운다
+        shift = len(ordinals) - (hi - lo)
+        old_offsets = index['name_offsets']
+        entry_codes = np.repeat(np.arange(len(old_offsets) - 1), np.diff(old_offsets))
+        keep = (index['by_name'] < lo) | (index['by_name'] >= hi)
+        kept = index['by_name'][keep]
+        kept = np.where(kept >= hi, kept + shift, kept)
+        kept_codes = entry_codes[keep]
+        positions = lo + np.arange(len(ordinals), dtype=np.int64)
+        added = np.lexsort((positions, codes))
+        width = len(index['ordinals']) + shift + 1
+        at = np.searchsorted(kept_codes.astype(np.int64) * width + kept,
+                             codes[added].astype(np.int64) * width + positions[added])
+        counts = np.bincount(kept_codes, minlength=len(name_table)) + np.bincount(codes, minlength=len(name_table))
+        return {
+            'ordinals': np.concatenate([index['ordinals'][:lo], ordinals, index['ordinals'][hi:]]),
+            'names': np.concatenate([index['names'][:lo], codes, index['names'][hi:]]),
+            'teams': np.concatenate([index['teams'][:lo], team_ids, index['teams'][hi:]]),
+            'slots': np.concatenate([index['slots'][:lo], slots, index['slots'][hi:]]),
+            'by_name': np.insert(kept, at, positions[added]),
+            'name_offsets': np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+            'name_table': name_table, 'team_table': team_table, 'name_codes': name_codes,
+            'revision': int(revision), 'spans': dict(index['spans']),
+        }
+
+    def _read_partitions(self, paths):
+        frames = [pd.read_csv(path, dtype=str, keep_default_na=False) for path in paths]
+        if not frames:
+            return pd.DataFrame(columns=HISTORY_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def _latest(self, records):
+        # 파티션 기록 → 날짜/팀마다 가장 나중 기록 (당번이 둘 다 비어 있으면 지워진 날짜)
+        frame = _duty_frame(records.assign(**{REVISION_COLUMN: pd.to_numeric(records[REVISION_COLUMN], errors='coerce').fillna(0)})
+                            .sort_values(REVISION_COLUMN, kind='stable'))
+        return frame[(frame['Employee 1'] != '') | (frame['Employee 2'] != '')]
+
+    def rebuild_index(self):
+        # 파티션이 색인과 맞지 않으면 (직접 고쳤거나 복사해 온 경우) 전부 읽어 다시 만든다.
+        # 지난번 일정 기간(spans)은 파티션에 없으므로 다음 저장은 새 일정 기간만 바꾼다
+        with span('rebuild history index', 'io'):
+            records = self._read_partitions(self.partitions().values())
+            revision = pd.to_numeric(records[REVISION_COLUMN], errors='coerce').max() if len(records) else 0
+            index = self._build_index(self._latest(records), 0 if pd.isna(revision) else revision)
+            if os.path.isdir(self.directory):
+                self._save_index(index)
+        self._index = index
+        return index
+
+    # ---- 기록 ----
+
+    def archive(self, duty_df):
+        # 저장된 기록과 달라진 날짜만 덧붙인다. 팀마다 새 일정의 첫날부터 끝날까지를 새 일정으로 바꾸며,
+        # 지난번에 기록한 일정과 기간이 겹치면 그 일정의 끝날까지로 넓힌다. 그래서 끝을 잘라 낸 날짜도
+        # 빈 당번으로 기록해 지우고, 겹치지 않는 이전/이후 기간의 기록은 그대로 둔다. 덧붙인 행 수를 돌려준다
+        new = _duty_frame(duty_df)
+        if new.empty:
+            return 0
+        with span('archive duties', 'io', rows=len(new)):
+            index = self.index()
+            spans = new.groupby('team')['ordinal'].agg(['min', 'max'])
+            ends = spans['max'].copy()
+            for team, (first, last) in spans.iterrows():
+                previous = index['spans'].get(team)
+                if previous is not None and previous[0] <= last and first <= previous[1]:
+                    ends[team] = max(last, previous[1])
+            lo, hi = self._date_range(int(spans['min'].min()), int(ends.max()))
+            window = self._effective_frame(index, lo, hi)
+            in_span = window['team'].map(spans['min']).le(window['ordinal']) & window['team'].map(ends).ge(window['ordinal'])
+            old = window[in_span]
+            merged = new.merge(old, on=['ordinal', 'team'], how='outer', suffixes=('', '_old'), indicator=True)
+            removed = merged['_merge'] == 'right_only'
+            merged.loc[removed, ['Employee 1', 'Employee 2']] = ''
+            changed = merged[removed | (merged['_merge'] == 'left_only') |
+                             (merged['Employee 1'] != merged['Employee 1_old']) | (merged['Employee 2'] != merged['Employee 2_old'])]
+            new_spans = {team: [int(first), int(last)] for team, (first, last) in spans.iterrows()}
+            if changed.empty:
+                if any(index['spans'].get(team) != value for team, value in new_spans.items()) and os.path.isdir(self.directory):
+                    index = dict(index, spans=dict(index['spans'], **new_spans))
+                    self._save_index(index)
+                    self._index = index
+                return 0
+
+            revision = index['revision'] + 1
+            records = pd.DataFrame({
+                'Date': [format_duty_date(ordinal) for ordinal in changed['ordinal']],
+                'Employee 1': changed['Employee 1'].to_numpy(), 'Employee 2': changed['Employee 2'].to_numpy(),
+                TEAM_COLUMN: changed['team'].to_numpy(), REVISION_COLUMN: revision,
+            }, columns=HISTORY_COLUMNS)
+            months = ordinals_to_datetimes(changed['ordinal']).to_period('M')
+            for month, rows in records.groupby(months.to_numpy(), sort=True):
+                path = self.partition_path(month.year, month.month)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                exists = os.path.exists(path)
+                with open(path, 'a', newline='', encoding='utf-8') as f:
+                    rows.to_csv(f, header=not exists, index=False)
+
+            # 바뀐 (날짜, 팀)만 구간 안에서 바꿔 끼운다
+            keys = pd.MultiIndex.from_frame(changed[['ordinal', 'team']])
+            kept = window[~pd.MultiIndex.from_frame(window[['ordinal', 'team']]).isin(keys)]
+            added = changed.loc[~removed.loc[changed.index], ['ordinal', 'Employee 1', 'Employee 2', 'team']]
+            index = self._splice_index(index, lo, hi, pd.concat([kept, added], ignore_index=True), revision)
+            index['spans'].update(new_spans)
+            self._save_index(index)
+            self._index = index
+        return len(records)
+
+    # ---- 조회 ----
+
+    def _name_slice(self, name):
+        index = self.index()
+        code = index['name_codes'].get(name)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return index['by_name'][index['name_offsets'][code]:index['name_offsets'][code + 1]]
+
+    def _date_range(self, start=None, end=None):
+        ordinals = self.index()['ordinals']
+        lo = 0 if start is None else np.searchsorted(ordinals, to_ordinal(start), 'left')
+        hi = len(ordinals) if end is None else np.searchsorted(ordinals, to_ordinal(end), 'right')
+        return lo, hi
+
+    def dates_of(self, name, start=None, end=None):
+        # name의 당직일 서수 (정렬, start/end 포함)
+        ordinals = self.index()['ordinals'][self._name_slice(name)]
+        lo = 0 if start is None else np.searchsorted(ordinals, to_ordinal(start), 'left')
+        hi = len(ordinals) if end is None else np.searchsorted(ordinals, to_ordinal(end), 'right')
+        return ordinals[lo:hi]
+
+    def on_duty(self, date):
+        # date 당번: [(이름, 팀)] Employee 1, 2 순서
+        index = self.index()
+        lo, hi = self._date_range(date, date)
+        return [(index['name_table'][name], index['team_table'][team]) for name, team in zip(index['names'][lo:hi], index['teams'][lo:hi])]
+
+    def duty_counts(self, start=None, end=None, names=None):
+        # 기간 안 이름별 당번 횟수. names를 주면 그 순서로 (기록이 없으면 0)
+        index = self.index()
+        lo, hi = self._date_range(start, end)
+        counts = pd.Series(np.bincount(index['names'][lo:hi], minlength=len(index['name_table'])),
+                           index=pd.Index(index['name_table'], dtype=object), dtype=np.int64)
+        return counts if names is None else counts.reindex(pd.Index(names, dtype=object), fill_value=0)
+
+    def window_counts(self, end, days=FAIRNESS_WINDOW_DAYS, names=None):
+        # end 이전 days일(end 포함) 동안의 당번 횟수
+        end = to_ordinal(end)
+        return self.duty_counts(end - days + 1, end, names)
+
+    def last_duties(self, before, names):
+        # before 전 마지막 당직일 서수. 기록이 없으면 NO_DUTY_DAY
+        index = self.index()
+        before = to_ordinal(before)
+        last = np.full(len(names), NO_DUTY_DAY.toordinal(), dtype=np.int64)
+        for i, name in enumerate(names):
+            ordinals = index['ordinals'][self._name_slice(name)]
+            position = np.searchsorted(ordinals, before, 'left')
+            if position:
+                last[i] = ordinals[position - 1]
+        return last
+
+    def duties_between(self, start, end):
+        # start~end 일정표 (DUTY_COLUMNS + Team). 겹치는 달의 파티션만 읽는다
+        start, end = to_ordinal(start), to_ordinal(end)
+        first, last = datetime.date.fromordinal(start), datetime.date.fromordinal(end)
+        paths = [path for path in (self.partition_path(month.year, month.month)
+                                   for month in pd.period_range(first, last, freq='M')) if os.path.exists(path)]
+        frame = self._latest(self._read_partitions(paths))
+        frame = frame[(frame['ordinal'] >= start) & (frame['ordinal'] <= end)].sort_values(['ordinal', 'team'], kind='stable')
+        return pd.DataFrame({'Date': [format_duty_date(ordinal) for ordinal in frame['ordinal']],
+                             'Employee 1': frame['Employee 1'].to_numpy(), 'Employee 2': frame['Employee 2'].to_numpy(),
+                             TEAM_COLUMN: frame['team'].to_numpy()}, columns=DUTY_COLUMNS + [TEAM_COLUMN])
+
+    def seed_staff(self, staff_df, start, days=FAIRNESS_WINDOW_DAYS):
+        # 생성 시작일 전 days일 동안의 당번 횟수와 마지막 당직일을 직원 표에 넣는다. 기록이 없으면 그대로 둔다
+        start = to_ordinal(start)
+        if not self._date_range(None, start - 1)[1]:
+            return staff_df
+        with span('seed fairness from history', 'io'):
+            names = staff_df['Name'].astype(str).tolist()
+            staff_df = staff_df.copy()
+            staff_df['Duty Count'] = self.window_counts(start - 1, days, names).to_numpy()
+            last = np.maximum(to_ordinals(staff_df['Last Duty Day']), self.last_duties(start, names))
+            staff_df['Last Duty Day'] = ordinals_to_datetimes(last)
+        return staff_df
+
+    def seed_rules(self, rules, start):
+        # 월 상한과 같은 요일 연속 규칙이 앞 기간에서 이어지도록, 시작한 달 첫날(짧으면 7일 전)부터
+        # 시작 전날까지의 당번을 규칙에 넘긴다
+        start = to_ordinal(start)
+        first = min(datetime.date.fromordinal(start).replace(day=1).toordinal(), start - 7)
+        lo, hi = self._date_range(first, start - 1)
+        if not len(rules) or lo == hi:
+            return rules
+        index = self.index()
+        return rules.with_history(np.asarray(index['name_table'], dtype=object)[index['names'][lo:hi]], index['ordinals'][lo:hi])
+
+
+_history = None
+
+
+def get_duty_history():
+    # DUTY_HISTORY로 폴더를 바꿀 수 있다
+    global _history
+    if _history is None:
+        _history = DutyHistory(os.environ.get('DUTY_HISTORY', HISTORY_DIR))
+    return _history
@@ -1,38 +1,88 @@
+import os
 import sys
 import datetime
 import calendar
+import numpy as np
 import pandas as pd
-from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTreeView, QDateEdit, QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog, QAbstractItemView, QFrame
-from PyQt5.QtCore import Qt, QAbstractTableModel, QDate
-import plotly.figure_factory as ff
-import math
+from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTreeView, QTableView, QDateEdit, QHeaderView, QFileDialog, QAbstractItemView, QFrame, QComboBox, QDoubleSpinBox, QSpinBox, QProgressBar
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QDate, QThreadPool, pyqtSignal
+from schedule_engine import to_ordinal
+from schedule_repair import ScheduleRepairer
+from vacation_matrix import VacationMatrix
+from scenario_runner import run_scenarios
+from schedule_solver import FairScheduleSolver, DEFAULT_TIME_BUDGET
+from workday_calendar import get_workday_calendar
+from data_store import get_data_store
+from generation_worker import GenerationWorker, FunctionWorker
+from instrumentation import span, traced
+from exporters import EXPORT_FORMATS, export_schedule, format_for_path
+from duty_statistics import DutyStatistics, SLOT_COLUMNS, format_summary
+from team_scheduler import generate_teams, teams_of, team_keys, format_conflicts
+from rule_engine import load_rules
+from duty_history import get_duty_history
+
+# 한 번에 뷰에 올리는 행 수 (긴 일정은 스크롤할 때 fetchMore로 더 올린다)
+FETCH_BATCH = 1000
+
+
+def format_column(series):
+    # 열 전체를 한 번에 표시 문자열로 바꿔 둔다
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.strftime("%Y-%m-%d (%a)").fillna('').to_numpy(dtype=object)
+    return series.astype(object).where(series.notna(), '').astype(str).to_numpy(dtype=object)
+
 
 class DutyTableModel(QAbstractTableModel):
+    # 사용자가 셀을 고쳤을 때 (행, 열, 이전 값)
+    edited = pyqtSignal(int, int, object)
+
     def __init__(self, data):
         super().__init__()
         self._data = data
+        self._text = [format_column(data[column]) for column in data.columns]
+        self._loaded = min(len(data), FETCH_BATCH)
+
+    def rowCount(self, index=QModelIndex()):
+        return 0 if index.isValid() else self._loaded
+
+    def columnCount(self, index=QModelIndex()):
+        return 0 if index.isValid() else len(self._data.columns)
 
-    def rowCount(self, index):
-        return len(self._data)
+    def canFetchMore(self, index):
+        return not index.isValid() and self._loaded < len(self._data)
 
-    def columnCount(self, index):
-        return len(self._data.columns)
+    def fetchMore(self, index):
+        if index.isValid():
+            return
+        count = min(FETCH_BATCH, len(self._data) - self._loaded)
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + count - 1)
+        self._loaded += count
+        self.endInsertRows()
 
     def data(self, index, role):
         if role == Qt.DisplayRole or role == Qt.EditRole:
-            value = self._data.iloc[index.row(), index.column()]
-            if isinstance(value, pd.Timestamp):
-                return value.strftime("%Y-%m-%d (%a)")
-            return str(value)
+            return self._text[index.column()][index.row()]
         return None
 
     def setData(self, index, value, role):
         if role == Qt.EditRole:
-            self._data.iloc[index.row(), index.column()] = value
-            self.dataChanged.emit(index, index)
+            row, column = index.row(), index.column()
+            if pd.api.types.is_datetime64_any_dtype(self._data.dtypes.iloc[column]):
+                value = pd.to_datetime(str(value)[:10], errors='coerce')
+            old = self._data.iloc[row, column]
+            self.set_cell(row, column, value)
+            self.edited.emit(row, column, old)
             return True
         return False
 
+    def set_cell(self, row, column, value):
+        # 셀 하나만 바꾸고 그 셀만 다시 그린다 (edited는 보내지 않는다)
+        self._data.iloc[row, column] = value
+        self._text[column][row] = format_column(self._data.iloc[row:row + 1, column])[0]
+        if row < self._loaded:
+            index = self.index(row, column)
+            self.dataChanged.emit(index, index)
+
     def flags(self, index):
         return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
 
@@ -44,12 +94,48 @@ class DutyTableModel(QAbstractTableModel):
                 return str(self._data.index[section])
         return None
 
+    def dataframe(self):
+        return self._data
+
+    @traced('duty table refresh', 'ui')
+    def set_dataframe(self, data):
+        # 새 DataFrame으로 교체. 열 구성과 행 수가 같으면 바뀐 행 구간만 dataChanged로 알린다
+        text = [format_column(data[column]) for column in data.columns]
+        if list(data.columns) != list(self._data.columns) or len(data) != len(self._data):
+            self.beginResetModel()
+            self._data, self._text = data, text
+            self._loaded = min(len(data), max(self._loaded, FETCH_BATCH))
+            self.endResetModel()
+            return
+        changed = np.zeros(len(data), dtype=bool)
+        for old, new in zip(self._text, text):
+            changed |= old != new
+        self._data, self._text = data, text
+        self.emit_changed_rows(np.flatnonzero(changed[:self._loaded]))
+
+    def emit_changed_rows(self, rows):
+        # 연속된 행 묶음마다 dataChanged 한 번
+        if len(rows) == 0:
+            return
+        breaks = np.flatnonzero(np.diff(rows) > 1)
+        starts = np.concatenate([[rows[0]], rows[breaks + 1]])
+        ends = np.concatenate([rows[breaks], [rows[-1]]])
+        last_column = self.columnCount() - 1
+        for start, end in zip(starts, ends):
+            self.dataChanged.emit(self.index(int(start), 0), self.index(int(end), last_column))
+
 class DutyScheduler(QDialog):
+    # 당직 통계 요약(dict)이 바뀔 때마다. 메인 창의 '당직 실시간'이 받는다
+    statistics_changed = pyqtSignal(object)
+
     def __init__(self, parent=None):
         super(DutyScheduler, self).__init__(parent)
         self.setWindowTitle("당직 일정 생성")
         self.setGeometry(100, 100, 1200, 800)
 
+        self.staff_df = None
+        self.store = get_data_store()
+
         main_layout = QHBoxLayout()
         content_layout = QVBoxLayout()
 
@@ -76,12 +162,28 @@ class DutyScheduler(QDialog):
         date_layout.addWidget(QLabel("종료 날짜:"))
         date_layout.addWidget(self.end_date_edit)
 
+        self.mode_combo = QComboBox()
+        self.mode_combo.addItems(['무작위 추첨', '공정성 최적화'])
+        self.time_budget_spin = QDoubleSpinBox()
+        self.time_budget_spin.setRange(0.1, 600.0)
+        self.time_budget_spin.setValue(DEFAULT_TIME_BUDGET)
+        self.time_budget_spin.setSuffix(" 초")
+
+        date_layout.addWidget(QLabel("배정 방식:"))
+        date_layout.addWidget(self.mode_combo)
+        date_layout.addWidget(QLabel("최적화 시간:"))
+        date_layout.addWidget(self.time_budget_spin)
+
         date_selection_frame.setLayout(date_layout)
         layout.addWidget(date_selection_frame)
 
     def create_duty_management_frame(self, layout):
         self.duty_df = self.load_duties()
         self.model = DutyTableModel(self.duty_df)
+        self.model.edited.connect(self.invalidate_repairer)
+        self.model.edited.connect(self.on_duty_edited)
+        self.repairer = None
+        self.generation_inputs = None
 
         self.duty_tree = QTreeView()
         self.duty_tree.setModel(self.model)
@@ -93,15 +195,29 @@ class DutyScheduler(QDialog):
 
         layout.addWidget(QLabel("당직 일정 목록"))
         layout.addWidget(self.duty_tree)
+        self.duty_tree.clicked.connect(self.show_vacations_for_duty)
 
         button_layout = QHBoxLayout()
         generate_button = QPushButton("이번 달 당번 일정 생성하기")
+        batch_button = QPushButton("기간 전체 일정 생성하기")
+        scenario_button = QPushButton("최적 일정 찾기")
+        team_button = QPushButton("팀별 일정 생성하기")
+        repair_button = QPushButton("변경 사항 반영하기")
+        self.scenario_count_spin = QSpinBox()
+        self.scenario_count_spin.setRange(1, 10000)
+        self.scenario_count_spin.setValue(os.cpu_count() or 4)
+        self.scenario_count_spin.setSuffix(" 개 후보")
         gantt_button = QPushButton("간트 차트 생성하기")
         export_button = QPushButton("생성한 일정 내보내기")
         apply_button = QPushButton("적용하기")
         save_button = QPushButton("저장하고 나가기")
 
         button_layout.addWidget(generate_button)
+        button_layout.addWidget(batch_button)
+        button_layout.addWidget(scenario_button)
+        button_layout.addWidget(self.scenario_count_spin)
+        button_layout.addWidget(team_button)
+        button_layout.addWidget(repair_button)
         button_layout.addWidget(gantt_button)
         button_layout.addWidget(export_button)
         button_layout.addWidget(apply_button)
@@ -109,7 +225,25 @@ class DutyScheduler(QDialog):
 
         layout.addLayout(button_layout)
 
+        progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setTextVisible(True)
+        self.progress_bar.hide()
+        self.cancel_button = QPushButton("생성 취소")
+        self.cancel_button.setEnabled(False)
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.cancel_button)
+        layout.addLayout(progress_layout)
+
+        self.worker = None
+        self.worker_buttons = [generate_button, batch_button, scenario_button, team_button, repair_button, gantt_button]
+
+        self.cancel_button.clicked.connect(self.cancel_generation)
         generate_button.clicked.connect(self.generate_duty_schedule)
+        batch_button.clicked.connect(self.generate_batch_schedule)
+        scenario_button.clicked.connect(self.generate_best_schedule)
+        team_button.clicked.connect(self.generate_team_schedule)
+        repair_button.clicked.connect(self.repair_schedule)
         gantt_button.clicked.connect(self.create_gantt_chart)
         export_button.clicked.connect(self.export_duties)
         apply_button.clicked.connect(self.apply_changes)
@@ -124,14 +258,25 @@ class DutyScheduler(QDialog):
         stat_layout.addWidget(self.total_workdays_label)
 
         self.duty_counts_df = pd.DataFrame(columns=['Name', 'Duty Count'])
+        # 직원 이름 → 당번 횟수 표의 행 번호
+        self.duty_count_rows = {}
         self.duty_counts_model = DutyTableModel(self.duty_counts_df)
-        self.duty_counts_view = QTableWidget()
+        self.duty_counts_view = QTableView()
         self.duty_counts_view.setModel(self.duty_counts_model)
         self.duty_counts_view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
 
         stat_layout.addWidget(QLabel("직원 당번 횟수"))
         stat_layout.addWidget(self.duty_counts_view)
 
+        self.statistics_label = QLabel()
+        self.statistics_label.setWordWrap(True)
+        stat_layout.addWidget(self.statistics_label)
+
+        # 통계는 일정 전체가 바뀔 때만 다시 만들고, 셀 편집은 on_duty_edited에서 증분 반영
+        self.statistics = DutyStatistics(get_workday_calendar().holidays)
+        self.store.holidays_changed.connect(self.on_holidays_changed)
+        self.reset_statistics()
+
         statistics_frame.setLayout(stat_layout)
         layout.addWidget(statistics_frame)
 
@@ -142,7 +287,8 @@ class DutyScheduler(QDialog):
 
         self.vacation_df = self.load_vacations()
         self.vacation_model = DutyTableModel(self.vacation_df)
-        self.vacation_view = QTableWidget()
+        self.store.vacations_changed.connect(self.on_vacations_changed)
+        self.vacation_view = QTableView()
         self.vacation_view.setModel(self.vacation_model)
         self.vacation_view.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.vacation_view.setSelectionMode(QAbstractItemView.SingleSelection)
@@ -151,186 +297,354 @@ class DutyScheduler(QDialog):
         vac_layout.addWidget(QLabel("이번 달 직원 휴가 일정"))
         vac_layout.addWidget(self.vacation_view)
 
+        self.vacation_matrix = None
+        self.off_staff_label = QLabel("")
+        self.off_staff_label.setWordWrap(True)
+        vac_layout.addWidget(self.off_staff_label)
+
         vacation_frame.setLayout(vac_layout)
         layout.addWidget(vacation_frame)
 
+    def on_vacations_changed(self, vacation_df):
+        self.vacation_df = vacation_df
+        self.vacation_model.set_dataframe(self.vacation_df)
+
     def load_duties(self):
-        try:
-            df = pd.read_csv('duties.csv', parse_dates=['Date'])
-            if 'Employee 1' not in df.columns or 'Employee 2' not in df.columns:
-                df['Employee 1'] = ""
-                df['Employee 2'] = ""
-            return df
-        except FileNotFoundError:
-            return pd.DataFrame(columns=['Date', 'Employee 1', 'Employee 2'])
+        df = self.store.duties().copy()
+        if 'Employee 1' not in df.columns or 'Employee 2' not in df.columns:
+            df['Employee 1'] = ""
+            df['Employee 2'] = ""
+        return df
 
     def load_vacations(self):
+        return self.store.vacations()
+
+    def load_generation_staff(self, start=None):
+        # start를 주면 그 전 1년 치 당직 기록으로 당번 횟수와 마지막 당직일을 채운다
+        staff_df = self.store.staff().copy()
+        staff_df['Last Duty Day'] = pd.to_datetime(staff_df['Last Duty Day']).fillna(pd.Timestamp('1900-01-01'))
+        if 'Duty Count' not in staff_df.columns:
+            staff_df['Duty Count'] = 0
+        if start is not None:
+            staff_df = get_duty_history().seed_staff(staff_df, start)
+        return staff_df
+
+    def load_rules(self, start=None):
+        # rules.json을 생성할 때마다 다시 읽는다. 형식이 틀리면 None (생성하지 않는다)
+        # start를 주면 그 달의 앞부분과 직전 한 주 당직 기록으로 규칙 상태를 잇는다
         try:
-            df = pd.read_csv('vacations.csv', parse_dates=['Start Date', 'End Date'])
-            return df
-        except FileNotFoundError:
-            return pd.DataFrame(columns=['Name', 'Start Date', 'End Date'])
+            rules = load_rules()
+            return rules if start is None else get_duty_history().seed_rules(rules, start)
+        except (OSError, ValueError) as e:
+            self.total_workdays_label.setText(f"규칙 파일 오류: {e}")
+            return None
+
+    def make_solver(self):
+        if self.mode_combo.currentText() == '공정성 최적화':
+            return FairScheduleSolver(time_budget=self.time_budget_spin.value())
+        return None
 
     def generate_duty_schedule(self):
         year = self.start_date_edit.date().year()
         month = self.start_date_edit.date().month()
-        workdays = self.get_workdays(year, month)
-        duty_schedule = []
-        today = datetime.datetime(year, month, 1)
-
-        # Load staff data
-        try:
-            self.staff_df = pd.read_csv('staff.csv', parse_dates=['Last Duty Day'])
-            self.staff_df['Last Duty Day'] = pd.to_datetime(self.staff_df['Last Duty Day']).fillna(pd.Timestamp('1900-01-01'))
-            if 'Duty Count' not in self.staff_df.columns:
-                self.staff_df['Duty Count'] = 0
-        except FileNotFoundError:
-            self.staff_df = pd.DataFrame(columns=['Name', 'On Duty', 'Duty Count', 'Last Duty Day'])
-            self.staff_df['Duty Count'] = 0
-
-        # Load vacation data
-        try:
-            vacation_df = pd.read_csv('vacations.csv', parse_dates=['Start Date', 'End Date'])
-        except FileNotFoundError:
-            vacation_df = pd.DataFrame(columns=['Name', 'Start Date', 'End Date'])
-
-        for day in workdays:
-            today = today.replace(day=day)
-            available_staff = self.staff_df[(self.staff_df['On Duty']) & ((today - self.staff_df['Last Duty Day']) > datetime.timedelta(days=3))]
-            if len(available_staff) < 2:
-                available_staff = self.staff_df[self.staff_df['On Duty']]
-
-            # Remove staff who are on vacation
-            vacation_today = vacation_df[(vacation_df['Start Date'] <= today) & (vacation_df['End Date'] >= today)]
-            available_staff = available_staff[~available_staff['Name'].isin(vacation_today['Name'])]
-
-            selected_staff = available_staff.sample(n=2, replace=False)
-            duty_schedule.append({'Date': today.strftime("%Y-%m-%d (%a)"), 'Employee 1': selected_staff.iloc[0]['Name'], 'Employee 2': selected_staff.iloc[1]['Name']})
-
-            # Update duty count and last duty day
-            self.staff_df.loc[selected_staff.index, 'Duty Count'] += 1
-            self.staff_df.loc[selected_staff.index, 'Last Duty Day'] = today
-
-        self.duty_df = pd.DataFrame(duty_schedule)
-        self.model._data = self.duty_df
-        self.model.layoutChanged.emit()
-        self.update_duty_counts()
+        self.get_workdays(year, month)
+        first_day = datetime.date(year, month, 1)
+        last_day = first_day.replace(day=calendar.monthrange(year, month)[1])
+        # 해당 월과 겹치는 휴가만 조회
+        self.start_generation(first_day.toordinal(), last_day.toordinal(), self.store.vacations_between(first_day, last_day))
+
+    def generate_batch_schedule(self):
+        start = self.start_date_edit.date().toPyDate().toordinal()
+        end = self.end_date_edit.date().toPyDate().toordinal()
+        if end < start:
+            self.total_workdays_label.setText("종료 날짜가 시작 날짜보다 빠릅니다.")
+            return
+        self.start_generation(start, end, self.load_vacations())
+
+    def start_generation(self, start, end, vacation_df):
+        # 입력은 GUI 스레드에서 한 번만 읽고, 생성은 QThreadPool에서 달 단위로 진행한다
+        if self.worker is not None:
+            return
+        rules = self.load_rules(start)
+        if rules is None:
+            return
+        staff_df = self.load_generation_staff(start)
+        worker = GenerationWorker(staff_df, vacation_df, get_workday_calendar().holidays, start, end, self.make_solver(), rules)
+        worker.signals.progress.connect(self.on_generation_progress)
+        worker.signals.finished.connect(lambda result: self.on_generation_finished(result, staff_df, vacation_df))
+        worker.signals.failed.connect(self.on_generation_failed)
+        worker.signals.cancelled.connect(self.on_generation_cancelled)
+        self.progress_bar.setRange(0, worker.total_months)
+        self.start_worker(worker, "생성 중...")
+
+    def start_worker(self, worker, text):
+        self.worker = worker
+        self.progress_bar.setValue(0)
+        self.progress_bar.setFormat(text)
+        self.progress_bar.show()
+        self.cancel_button.setEnabled(worker.cancellable)
+        for button in self.worker_buttons:
+            button.setEnabled(False)
+        QThreadPool.globalInstance().start(worker)
+
+    def finish_worker(self):
+        self.worker = None
+        self.progress_bar.hide()
+        self.cancel_button.setEnabled(False)
+        for button in self.worker_buttons:
+            button.setEnabled(True)
+
+    def cancel_generation(self):
+        if self.worker is not None and self.worker.cancellable:
+            self.worker.cancel()
+            self.progress_bar.setFormat("취소하는 중...")
+
+    def on_generation_progress(self, done, total, label):
+        self.progress_bar.setMaximum(total)
+        self.progress_bar.setValue(done)
+        self.progress_bar.setFormat(f"{label} (%p%)")
+
+    def on_generation_finished(self, result, staff_df, vacation_df):
+        # 결과는 한 번에 교체한다 (중간 상태의 표는 보이지 않는다)
+        self.finish_worker()
+        self.remember_generation_inputs(staff_df, vacation_df)
+        self.staff_df = result['staff_df']
+        self.vacation_matrix = result['vacation_matrix']
+        self.duty_df = result['duty_df']
+        self.model.set_dataframe(self.duty_df)
+        self.reset_statistics()
+        self.total_workdays_label.setText(f"생성 완료 (당번 가능한 평일 수: {result['workdays']})")
+
+    def on_generation_failed(self, message):
+        self.finish_worker()
+        self.total_workdays_label.setText(f"실패: {message}")
+
+    def on_generation_cancelled(self):
+        self.finish_worker()
+        self.total_workdays_label.setText("일정 생성을 취소했습니다.")
+
+    def generate_best_schedule(self):
+        start = self.start_date_edit.date().toPyDate().toordinal()
+        end = self.end_date_edit.date().toPyDate().toordinal()
+        if end < start:
+            self.total_workdays_label.setText("종료 날짜가 시작 날짜보다 빠릅니다.")
+            return
+        if self.worker is not None:
+            return
+
+        rules = self.load_rules(start)
+        if rules is None:
+            return
+        staff_df = self.load_generation_staff(start)
+        vacation_df = self.load_vacations()
+        seeds = range(self.scenario_count_spin.value())
+        worker = FunctionWorker(run_scenarios, staff_df, vacation_df, get_workday_calendar().holidays, start, end, seeds, rules=rules)
+        worker.signals.finished.connect(lambda result: self.on_scenarios_finished(result, staff_df, vacation_df))
+        worker.signals.failed.connect(self.on_generation_failed)
+        self.start_worker(worker, "후보 일정 비교 중...")
+
+    def on_scenarios_finished(self, result, staff_df, vacation_df):
+        self.finish_worker()
+        self.remember_generation_inputs(staff_df, vacation_df)
+        best = result['summary'].iloc[0]
+        self.total_workdays_label.setText(
+            f"후보 {len(result['summary'])}개 중 seed {result['seed']} 선택 "
+            f"(횟수 차이: {best['count_spread']:.0f}, 최소 간격: {best['min_gap']:.0f}, 요일 쏠림: {best['weekday_imbalance']:.2f})")
+
+        self.staff_df = result['staff_df']
+        self.duty_df = result['duty_df']
+        self.model.set_dataframe(self.duty_df)
+        self.reset_statistics()
+
+    def generate_team_schedule(self):
+        # staff의 Team 열로 나눠 팀마다 다른 프로세스에서 만들고, 같은 날 두 팀에 들어간 직원은 합칠 때 고친다
+        start = self.start_date_edit.date().toPyDate().toordinal()
+        end = self.end_date_edit.date().toPyDate().toordinal()
+        if end < start:
+            self.total_workdays_label.setText("종료 날짜가 시작 날짜보다 빠릅니다.")
+            return
+        if self.worker is not None:
+            return
+
+        rules = self.load_rules(start)
+        if rules is None:
+            return
+        staff_df = self.load_generation_staff(start)
+        vacation_df = self.load_vacations()
+        worker = FunctionWorker(generate_teams, staff_df, vacation_df, get_workday_calendar().holidays, start, end, self.make_solver(),
+                                rules=rules, cancellable=True)
+        worker.signals.progress.connect(self.on_generation_progress)
+        worker.signals.finished.connect(lambda result: self.on_teams_finished(result, staff_df, vacation_df))
+        worker.signals.failed.connect(self.on_generation_failed)
+        worker.signals.cancelled.connect(self.on_generation_cancelled)
+        team_count = len(teams_of(staff_df))
+        self.progress_bar.setRange(0, team_count)
+        self.start_worker(worker, f"{team_count}개 팀 생성 중...")
+
+    def on_teams_finished(self, result, staff_df, vacation_df):
+        self.finish_worker()
+        self.remember_generation_inputs(staff_df, vacation_df)
+        conflicts = format_conflicts(result['conflicts'])
+        text = f"{len(result['teams'])}개 팀 생성 완료 (당직일 {len(result['duty_df'])}행, 팀 사이 겹침 다시 배정: {len(result['reassigned'])}자리)"
+        if conflicts:
+            text += f"\n남은 겹침: {'; '.join(conflicts[:5])}" + (" ..." if len(conflicts) > 5 else "")
+        self.total_workdays_label.setText(text)
+
+        self.staff_df = result['staff_df']
+        self.duty_df = result['duty_df']
+        self.model.set_dataframe(self.duty_df)
+        self.reset_statistics()
+
+    def remember_generation_inputs(self, staff_df, vacation_df, keep_repairer=False):
+        # 나중에 변경분만 찾아 일정을 고칠 수 있도록 생성 당시 입력을 보관
+        # 수정 뒤(keep_repairer)에는 생성 전 마지막 당직일을 처음 것 그대로 둔다 (파일에서 불러온 일정이면 없음)
+        if keep_repairer:
+            last_duty = self.generation_inputs['last_duty'] if self.generation_inputs is not None else None
+        else:
+            self.repairer = None
+            last_duty = staff_df[['Name', 'Last Duty Day']].copy()
+        self.generation_inputs = {
+            'last_duty': last_duty,
+            'vacations': vacation_df.copy(),
+            'on_duty': set(staff_df.loc[staff_df['On Duty'].fillna(False).astype(bool), 'Name']),
+            'holidays': get_workday_calendar().holidays,
+        }
+
+    def invalidate_repairer(self, *args):
+        self.repairer = None
+
+    def repair_schedule(self):
+        if self.duty_df.empty:
+            return
+        if team_keys(self.duty_df).nunique() > 1:
+            # 수정기는 날짜 하나에 행 하나를 가정한다. 여러 팀 일정은 팀별 생성으로 다시 만든다
+            self.total_workdays_label.setText("여러 팀 일정은 '팀별 일정 생성하기'로 다시 생성하세요.")
+            return
+        staff_df = self.load_generation_staff()
+        vacation_df = self.load_vacations()
+        holidays = get_workday_calendar().holidays
+        if self.repairer is None:
+            rules = self.load_rules()
+            if rules is None:
+                return
+            # 생성한 일정이면 생성에 넣은 마지막 당직일을 일정 이전 값으로 쓴다 (self.staff_df는 생성 뒤 값)
+            generation_staff = self.generation_inputs['last_duty'] if self.generation_inputs is not None else None
+            self.repairer = ScheduleRepairer(self.duty_df, self.staff_df if self.staff_df is not None else staff_df, vacation_df, get_workday_calendar(),
+                                             rules=rules, generation_staff=generation_staff)
+        self.repairer.update_staff(staff_df)
+        self.repairer.set_vacations(vacation_df)
+
+        if self.generation_inputs is None:
+            # 생성 기록이 없는 일정(파일에서 불러온 일정)은 전체를 검사
+            report = self.repairer.repair(changed_names=self.repairer.staff_index.keys(), changed_holidays=holidays)
+        else:
+            previous = self.generation_inputs
+            merged = vacation_df.merge(previous['vacations'].drop_duplicates(), how='left', indicator=True)
+            changed_vacations = merged[merged['_merge'] == 'left_only']
+            on_duty = set(staff_df.loc[staff_df['On Duty'].fillna(False).astype(bool), 'Name'])
+            report = self.repairer.repair(changed_vacations=changed_vacations,
+                                          changed_names=previous['on_duty'] - on_duty,
+                                          changed_holidays=previous['holidays'] ^ holidays)
+        self.remember_generation_inputs(staff_df, vacation_df, keep_repairer=True)
+        self.repairer.apply_to(self.staff_df if self.staff_df is not None else staff_df)
+
+        self.duty_df = self.repairer.duty_df
+        self.model.set_dataframe(self.duty_df)
+        self.reset_statistics()
+        self.total_workdays_label.setText(
+            f"다시 배정: {len(report['reassigned'])}자리, 삭제: {len(report['removed'])}일, 추가: {len(report['added'])}일")
+
+    def staff_off_on(self, date):
+        ordinal = to_ordinal(date)
+        matrix = self.vacation_matrix
+        if matrix is None or not matrix.first_ordinal <= ordinal <= matrix.last_ordinal:
+            vacation_df = self.store.vacations_between(datetime.date.fromordinal(ordinal), datetime.date.fromordinal(ordinal))
+            matrix = VacationMatrix.from_dataframe(vacation_df, vacation_df['Name'].dropna().unique(), ordinal, ordinal)
+        return matrix.who_is_off(ordinal)
+
+    def show_vacations_for_duty(self, index):
+        date = self.duty_df.iloc[index.row()]['Date']
+        off_staff = self.staff_off_on(date)
+        self.off_staff_label.setText(f"{str(date)[:10]} 휴가자: {', '.join(off_staff) if off_staff else '없음'}")
 
     def get_workdays(self, year, month):
-        num_days = calendar.monthrange(year, month)[1]
-        weekdays = [
-            day for day in range(1, num_days + 1)
-            if calendar.weekday(year, month, day) < 5  # 주말 제외
-            and datetime.date(year, month, day) not in self.holidays_df['Date'].dt.date.tolist()  # 공휴일 제외
-        ]
+        weekdays = get_workday_calendar().workdays(year, month)  # 주말, 공휴일 제외
         self.total_workdays_label.setText(f"{year}년 {month}월의 당번 가능한 평일 수: {len(weekdays)}")
         return weekdays
 
-    def update_duty_counts(self):
-        duty_counts = self.duty_df['Employee 1'].append(self.duty_df['Employee 2']).value_counts().reset_index()
-        duty_counts.columns = ['Name', 'Duty Count']
-        self.duty_counts_df = duty_counts
-        self.duty_counts_model._data = self.duty_counts_df
-        self.duty_counts_model.layoutChanged.emit()
+    def reset_statistics(self):
+        with span('statistics reset', 'ui'):
+            self.statistics.reset(self.duty_df)
+        self.update_duty_counts()
+
+    def on_holidays_changed(self, holidays_df):
+        self.statistics.set_holidays(get_workday_calendar().holidays, self.duty_df)
+        self.update_duty_counts()
+
+    def on_duty_edited(self, row, column, old):
+        duty_df = self.model.dataframe()
+        name = duty_df.columns[column]
+        if name in SLOT_COLUMNS:
+            partner = duty_df.at[duty_df.index[row], SLOT_COLUMNS[1 - SLOT_COLUMNS.index(name)]]
+            self.statistics.replace(duty_df.at[duty_df.index[row], 'Date'], old, duty_df.iat[row, column], partner)
+            self.update_duty_counts([old, duty_df.iat[row, column]])
+        elif name == 'Date':
+            # 날짜만 옮겨도 당번 횟수는 그대로다
+            self.statistics.move_day(old, duty_df.iat[row, column], *duty_df.loc[duty_df.index[row], SLOT_COLUMNS])
+            self.update_duty_counts([])
+
+    @traced('update duty counts', 'ui')
+    def update_duty_counts(self, names=None):
+        # 누적 통계에서 읽기만 한다 (duty_df를 다시 세지 않는다).
+        # names: 셀 편집으로 횟수가 바뀐 직원. 주어지면 표에서 그 행만 고치고, 표에 없는 직원이 생기면 표 전체를 다시 만든다
+        names = None if names is None else [name for name in names if not pd.isna(name) and name != '']
+        if names is None or any(name not in self.duty_count_rows for name in names):
+            self.duty_counts_df = self.statistics.counts_frame()
+            self.duty_count_rows = {name: row for row, name in enumerate(self.duty_counts_df['Name'])}
+            self.duty_counts_model.set_dataframe(self.duty_counts_df)
+        else:
+            for name in names:
+                self.duty_counts_model.set_cell(self.duty_count_rows[name], 1, self.statistics.counts[name])
+        summary = self.statistics.summary()
+        self.statistics_label.setText(format_summary(summary))
+        self.statistics_changed.emit(summary)
 
     def apply_changes(self):
-        self.model.layoutChanged.emit()
+        # 편집 내용은 setData에서 이미 셀 단위로 반영되어 있다
         self.update_duty_counts()
 
     def save_and_exit(self):
         self.apply_changes()
-        self.duty_df.to_csv('duties.csv', index=False)
+        self.store.set_duties(self.duty_df.copy(), save=True)
+        # duties.csv는 덮어쓰지만 지난 일정은 기록 저장소에 남는다
+        get_duty_history().archive(self.duty_df)
         self.close()
 
     def create_gantt_chart(self):
-        year = self.start_date_edit.date().year()
-        month = self.start_date_edit.date().month()
-        df = []
-        for _, row in self.duty_df.iterrows():
-            duty_date = datetime.datetime.strptime(row['Date'], "%Y-%m-%d (%a)")
-            df.append(dict(Task=row['Employee 1'], Start=duty_date, Finish=duty_date + datetime.timedelta(days=1), Resource='Duty'))
-            df.append(dict(Task=row['Employee 2'], Start=duty_date, Finish=duty_date + datetime.timedelta(days=1), Resource='Duty'))
-
-        # Calculate the number of weeks in the month
-        num_weeks = math.ceil(calendar.monthrange(year, month)[1] / 7.0)
-        week_dates = [(datetime.datetime(year, month, 1) + datetime.timedelta(days=7 * i)).strftime("%Y-%m-%d") for i in range(num_weeks)]
-
-        fig = ff.create_gantt(df, index_col='Resource', show_colorbar=False, group_tasks=True, title=f'{year}년 {month}월의 당직 일정표')
-
-        # Define weekend and weekday for grid color reference
-        weekend_color = 'rgb(255,000,051)'
-        weekday_color = 'rgb(230,230,230)'
-
-        # Add background color for weekends and vertical lines for each day
-        days_in_month = calendar.monthrange(year, month)[1]
-        start_date = datetime.datetime(year, month, 1)
-        end_date = datetime.datetime(year, month, days_in_month)
-        shapes = []
-        for single_date in (start_date + datetime.timedelta(n) for n in range(days_in_month)):
-            if single_date.weekday() == 5:  # 토요일
-                fillcolor = 'blue'
-            elif single_date.weekday() == 6:  # 일요일
-                fillcolor = 'red'
-            else:
-                fillcolor = weekday_color
-
-            shape = {
-                'type': 'rect',
-                'x0': single_date,
-                'x1': single_date + datetime.timedelta(days=1),
-                'y0': 0,
-                'y1': 1,
-                'xref': 'x',
-                'yref': 'paper',
-                'fillcolor': fillcolor,
-                'opacity': 0.3,
-                'line': {
-                    'width': 0,
-                }
-            }
-            shapes.append(shape)
-
-        fig.update_layout(
-            shapes=shapes,
-            xaxis={
-                'tickvals': [date.strftime('%Y-%m-%d') for date in pd.date_range(start=start_date, end=end_date)],
-                'ticktext': [date.strftime('%-d(%a)') for date in pd.date_range(start=start_date, end=end_date)],
-                'tickangle': 45,
-                'showgrid': True,
-                'gridwidth': 1,
-                'gridcolor': 'gray'
-            },
-            yaxis={
-                'showgrid': True,
-                'gridwidth': 1,
-                'gridcolor': 'gray'
-            },
-            height=50 * len(self.staff_df) # Adjust height to number of staff
-        )
-
-        # Add annotations for week numbers
-        annotations = []
-        for i, week_date in enumerate(week_dates):
-            annotations.append({
-                'x': week_date,
-                'y': 1.05,
-                'xref': 'x',
-                'yref': 'paper',
-                'text': f'{i+1}주',
-                'showarrow': False,
-                'font': {'color': 'black', 'size': 12},
-                'bgcolor': 'white'
-            })
-
-        fig.update_layout(annotations=annotations)
-
-        fig.show()
+        # 창 안에서는 QPainter로 바로 그리고, plotly는 HTML 내보내기/브라우저 보기에서만 쓴다
+        from gantt_chart import GanttDialog
+        self.gantt_dialog = GanttDialog(self.duty_df.copy(), get_workday_calendar().holidays, self)
+        self.gantt_dialog.show()
 
     def export_duties(self):
+        # CSV/Excel은 파일 하나, iCalendar는 고른 이름의 폴더에 직원별 .ics 파일을 만든다
         options = QFileDialog.Options()
-        file, _ = QFileDialog.getSaveFileName(self, "Save Duty Schedule", "", "CSV Files (*.csv);;All Files (*)", options=options)
-        if file:
-            self.duty_df.to_csv(file, index=False)
+        file, selected = QFileDialog.getSaveFileName(self, "Save Duty Schedule", "", ";;".join(EXPORT_FORMATS.values()), options=options)
+        if not file or self.worker is not None:
+            return
+        export_format = next(key for key, label in EXPORT_FORMATS.items() if label == selected) if selected else format_for_path(file)
+        if export_format == 'ics':
+            file = os.path.splitext(file)[0]
+        elif not file.lower().endswith('.' + export_format):
+            file += '.' + export_format
+        worker = FunctionWorker(export_schedule, self.duty_df.copy(), file, export_format)
+        worker.signals.finished.connect(lambda result: self.on_export_finished(file))
+        worker.signals.failed.connect(self.on_generation_failed)
+        self.start_worker(worker, "내보내는 중...")
+
+    def on_export_finished(self, path):
+        self.finish_worker()
+        self.total_workdays_label.setText(f"{path}(으)로 내보냈습니다.")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
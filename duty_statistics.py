@@ -0,0 +1,229 @@
+from bisect import bisect_left, insort
+from collections import Counter
+import numpy as np
+import pandas as pd
+from schedule_engine import to_ordinal, to_ordinals, NO_DUTY_DAY
+
+SLOT_COLUMNS = ['Employee 1', 'Employee 2']
+WEEKDAY_NAMES = ['월', '화', '수', '목', '금', '토', '일']
+
+
+def _pair(first, second):
+    return (first, second) if str(first) <= str(second) else (second, first)
+
+
+def _nearest(keys, start, step):
+    # start부터 step 방향으로 keys에 있는 첫 값 (keys가 비어 있지 않고 그 방향에 값이 있을 때만 부른다)
+    while start not in keys:
+        start += step
+    return start
+
+
+# 당직 일정의 누적 통계. 처음 한 번 reset으로 만들고, 이후에는 셀 하나가 바뀔 때마다
+# 그 자리의 기여분만 빼고 더하므로 duty_df 전체를 다시 세지 않는다.
+# 요약 값(횟수 차이, 최다 짝, 요일 합계 등)도 같이 유지하므로 summary()는 직원/짝 수와 상관없이 바로 끝난다.
+class DutyStatistics:
+    def __init__(self, holidays=()):
+        self.holidays = frozenset(holidays)
+        self.reset()
+
+    def reset(self, duty_df=None):
+        self.counts = Counter()
+        self.weekdays = {}
+        self.holiday_adjacent = Counter()
+        self.pairs = Counter()
+        self.dates = {}
+        # 당번 간격(일) 다중 집합과 합계
+        self.gaps = Counter()
+        self.gap_total = 0
+        self.gap_count = 0
+        self.min_gap = None
+        self.days = 0
+        # 요약용: 당번 횟수별 직원 수와 최대/최소, 짝 횟수별 짝 묶음과 최대, 요일/공휴일 앞뒤 합계
+        self.count_freq = Counter()
+        self.max_count = 0
+        self.min_count = 0
+        self.pair_buckets = {}
+        self.top_pair_count = 0
+        self.weekday_total = np.zeros(7, dtype=np.int64)
+        self.holiday_adjacent_total = 0
+        if duty_df is not None and len(duty_df):
+            ordinals = to_ordinals(duty_df['Date'])
+            for ordinal, first, second in zip(ordinals, duty_df[SLOT_COLUMNS[0]], duty_df[SLOT_COLUMNS[1]]):
+                self.add_day(int(ordinal), first, second)
+
+    def set_holidays(self, holidays, duty_df):
+        self.holidays = frozenset(holidays)
+        self.reset(duty_df)
+
+    def is_holiday_adjacent(self, ordinal):
+        return ordinal - 1 in self.holidays or ordinal + 1 in self.holidays
+
+    def _gap(self, gap, delta):
+        self.gaps[gap] += delta
+        if not self.gaps[gap]:
+            del self.gaps[gap]
+        self.gap_total += gap * delta
+        self.gap_count += delta
+        if delta > 0 and (self.min_gap is None or gap < self.min_gap):
+            self.min_gap = gap
+        elif gap == self.min_gap and gap not in self.gaps:
+            # 가장 짧은 간격이 없어질 때만 남은 간격 종류를 훑는다
+            self.min_gap = min(self.gaps) if self.gaps else None
+
+    def _count(self, name, delta):
+        old = self.counts[name]
+        new = old + delta
+        if new:
+            self.counts[name] = new
+        else:
+            del self.counts[name]
+        freq = self.count_freq
+        if old:
+            freq[old] -= 1
+            if not freq[old]:
+                del freq[old]
+        if new:
+            freq[new] += 1
+        if not freq:
+            self.max_count = self.min_count = 0
+            return
+        # 횟수는 1씩 바뀌므로 최대/최소도 대개 바로 옆 값으로 옮겨 간다
+        if new > self.max_count:
+            self.max_count = new
+        elif old == self.max_count and old not in freq:
+            self.max_count = _nearest(freq, old - 1, -1)
+        if new and (not self.min_count or new < self.min_count):
+            self.min_count = new
+        elif old == self.min_count and old not in freq:
+            self.min_count = _nearest(freq, old + 1, 1)
+
+    def add(self, ordinal, name):
+        if pd.isna(name) or name == '' or ordinal == NO_DUTY_DAY.toordinal():
+            return
+        self._count(name, 1)
+        self.weekdays.setdefault(name, np.zeros(7, dtype=np.int64))[(ordinal - 1) % 7] += 1
+        self.weekday_total[(ordinal - 1) % 7] += 1
+        if self.is_holiday_adjacent(ordinal):
+            self.holiday_adjacent[name] += 1
+            self.holiday_adjacent_total += 1
+        dates = self.dates.setdefault(name, [])
+        i = bisect_left(dates, ordinal)
+        before = dates[i - 1] if i > 0 else None
+        after = dates[i] if i < len(dates) else None
+        if before is not None and after is not None:
+            self._gap(after - before, -1)
+        if before is not None:
+            self._gap(ordinal - before, 1)
+        if after is not None:
+            self._gap(after - ordinal, 1)
+        insort(dates, ordinal)
+
+    def remove(self, ordinal, name):
+        dates = self.dates.get(name)
+        if not dates:
+            return
+        i = bisect_left(dates, ordinal)
+        if i == len(dates) or dates[i] != ordinal:
+            return
+        before = dates[i - 1] if i > 0 else None
+        after = dates[i + 1] if i + 1 < len(dates) else None
+        if before is not None:
+            self._gap(ordinal - before, -1)
+        if after is not None:
+            self._gap(after - ordinal, -1)
+        if before is not None and after is not None:
+            self._gap(after - before, 1)
+        del dates[i]
+        self._count(name, -1)
+        self.weekdays[name][(ordinal - 1) % 7] -= 1
+        self.weekday_total[(ordinal - 1) % 7] -= 1
+        if self.is_holiday_adjacent(ordinal):
+            self.holiday_adjacent_total -= 1
+            self.holiday_adjacent[name] -= 1
+            if not self.holiday_adjacent[name]:
+                del self.holiday_adjacent[name]
+
+    def _add_pair(self, first, second, delta):
+        if pd.isna(first) or pd.isna(second) or first == '' or second == '':
+            return
+        pair = _pair(first, second)
+        old = self.pairs[pair]
+        new = old + delta
+        if new:
+            self.pairs[pair] = new
+        else:
+            del self.pairs[pair]
+        buckets = self.pair_buckets
+        if old:
+            del buckets[old][pair]
+            if not buckets[old]:
+                del buckets[old]
+        if new:
+            buckets.setdefault(new, {})[pair] = None
+        if not buckets:
+            self.top_pair_count = 0
+        elif new > self.top_pair_count:
+            self.top_pair_count = new
+        elif old == self.top_pair_count and old not in buckets:
+            self.top_pair_count = _nearest(buckets, old - 1, -1)
+
+    def add_day(self, ordinal, first, second):
+        self.add(ordinal, first)
+        self.add(ordinal, second)
+        self._add_pair(first, second, 1)
+        self.days += 1
+
+    def remove_day(self, ordinal, first, second):
+        self.remove(ordinal, first)
+        self.remove(ordinal, second)
+        self._add_pair(first, second, -1)
+        self.days -= 1
+
+    def replace(self, date, old, new, partner):
+        # 한 자리의 당번이 old → new로 바뀐 경우
+        ordinal = to_ordinal(date)
+        self.remove(ordinal, old)
+        self._add_pair(old, partner, -1)
+        self.add(ordinal, new)
+        self._add_pair(new, partner, 1)
+
+    def move_day(self, old_date, new_date, first, second):
+        # 날짜 칸이 바뀐 경우
+        self.remove_day(to_ordinal(old_date), first, second)
+        self.add_day(to_ordinal(new_date), first, second)
+
+    def counts_frame(self):
+        counts = pd.DataFrame(self.counts.most_common(), columns=['Name', 'Duty Count'])
+        return counts
+
+    def weekday_totals(self):
+        return self.weekday_total.copy()
+
+    def summary(self):
+        top = self.top_pair_count
+        return {
+            'days': self.days,
+            'staff': len(self.counts),
+            'count_spread': self.max_count - self.min_count,
+            'min_gap': self.min_gap,
+            'mean_gap': self.gap_total / self.gap_count if self.gap_count else None,
+            'holiday_adjacent': self.holiday_adjacent_total,
+            'weekdays': dict(zip(WEEKDAY_NAMES, self.weekday_total.tolist())),
+            'top_pair': (next(iter(self.pair_buckets[top])), top) if top else None,
+        }
+
+
+def format_summary(summary):
+    # 통계 창과 메인 창의 '당직 실시간'에서 같이 쓰는 요약 문구
+    if not summary['days']:
+        return "생성된 당직 일정이 없습니다."
+    lines = [f"당직일 {summary['days']}일, 당번 직원 {summary['staff']}명, 횟수 차이 {summary['count_spread']}회"]
+    if summary['min_gap'] is not None:
+        lines.append(f"당번 간격: 최소 {summary['min_gap']}일, 평균 {summary['mean_gap']:.1f}일")
+    lines.append("요일별: " + ", ".join(f"{day} {count}" for day, count in summary['weekdays'].items() if day not in ('토', '일') or count))
+    lines.append(f"공휴일 앞뒤 당번: {summary['holiday_adjacent']}회")
+    if summary['top_pair'] is not None:
+        (first, second), count = summary['top_pair']
+        lines.append(f"가장 자주 짝지어진 직원: {first}, {second} ({count}회)")
+    return "\n".join(lines)
@@ -0,0 +1,175 @@
+import csv
+import datetime
+import os
+import re
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from schedule_engine import to_ordinals, DATE_FORMAT, NO_DUTY_DAY, EPOCH_ORDINAL
+from storage import DUTY_COLUMNS, TEAM_COLUMN
+from instrumentation import traced
+
+# 일정을 CHUNK_ROWS 행씩 잘라 바로 파일에 쓰는 내보내기. 전체 출력이나 직원별 사본을 메모리에 만들지 않는다
+CHUNK_ROWS = 5000
+# 직원별 .ics를 쓸 때 동시에 열어 둘 파일 수 (넘으면 가장 오래 안 쓴 파일을 닫는다)
+MAX_OPEN_FILES = 256
+
+EXPORT_FORMATS = OrderedDict([
+    ('csv', "CSV Files (*.csv)"),
+    ('xlsx', "Excel Files (*.xlsx)"),
+    ('ics', "iCalendar - 직원별 (*.ics)"),
+])
+
+
+def format_for_path(path):
+    # 확장자로 형식을 고른다 (확장자가 없으면 직원별 .ics 폴더로 본다)
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension in EXPORT_FORMATS:
+        return extension
+    return 'ics' if not extension else 'csv'
+
+
+def iter_chunks(duty_df, chunk_rows=CHUNK_ROWS):
+    for start in range(0, len(duty_df), chunk_rows):
+        yield duty_df.iloc[start:start + chunk_rows]
+
+
+def _date_text(dates):
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates.dt.strftime(DATE_FORMAT).fillna('').to_numpy(dtype=object)
+    return dates.astype(object).where(dates.notna(), '').to_numpy(dtype=object)
+
+
+def _columns(duty_df):
+    # 여러 팀 일정이면 Team 열도 함께 쓴다
+    return DUTY_COLUMNS + ([TEAM_COLUMN] if TEAM_COLUMN in duty_df.columns else [])
+
+
+def _rows(chunk, columns):
+    return zip(_date_text(chunk['Date']), *(chunk[column].to_numpy(dtype=object) for column in columns[1:]))
+
+
+@traced('export csv', 'io')
+def export_csv(duty_df, path, chunk_rows=CHUNK_ROWS):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        columns = _columns(duty_df)
+        writer.writerow(columns)
+        for chunk in iter_chunks(duty_df, chunk_rows):
+            writer.writerows(_rows(chunk, columns))
+    return path
+
+
+@traced('export xlsx', 'io')
+def export_xlsx(duty_df, path, chunk_rows=CHUNK_ROWS):
+    # openpyxl은 선택 의존성이다. write_only 통합 문서는 행을 바로 파일로 흘려 보낸다
+    try:
+        from openpyxl import Workbook
+    except ImportError:
+        raise RuntimeError("Excel로 내보내려면 openpyxl 패키지가 필요합니다 (pip install openpyxl).")
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('당직 일정')
+    columns = _columns(duty_df)
+    sheet.append(columns)
+    for chunk in iter_chunks(duty_df, chunk_rows):
+        for row in _rows(chunk, columns):
+            sheet.append(list(row))
+    workbook.save(path)
+    return path
+
+
+def _ics_text(value):
+    return str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+
+def ics_filename(name):
+    # 파일 이름에 쓸 수 없는 문자는 _로 바꾼다
+    return re.sub(r'[\\/:*?"<>|\s]+', '_', str(name)).strip('_') or 'unnamed'
+
+
+def _ics_dates(ordinals):
+    # 서수 배열 → 'YYYYMMDD' 문자열 배열
+    text = np.datetime_as_string((ordinals - EPOCH_ORDINAL).astype('datetime64[D]'), unit='D')
+    return np.char.replace(text, '-', '').astype(object)
+
+
+class _IcsFanout:
+    # 직원별 .ics 파일에 이어 쓰기. 열린 파일 수는 MAX_OPEN_FILES로 제한한다
+    def __init__(self, directory, max_open=MAX_OPEN_FILES):
+        self.directory = directory
+        self.max_open = max_open
+        self.handles = OrderedDict()
+        self.paths = {}
+        self.filenames = set()
+        self.suffixes = {}
+
+    def write(self, name, text):
+        handle = self.handles.get(name)
+        if handle is None:
+            path = self.paths.get(name)
+            if path is None:
+                # 이름을 바꿔 적은 결과가 겹치면 뒤에 번호를 붙인다
+                filename = base = ics_filename(name)
+                while filename in self.filenames:
+                    self.suffixes[base] = self.suffixes.get(base, 1) + 1
+                    filename = f'{base}_{self.suffixes[base]}'
+                self.filenames.add(filename)
+                path = self.paths[name] = os.path.join(self.directory, filename + '.ics')
+                handle = open(path, 'w', newline='', encoding='utf-8')
+                handle.write(f"BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//duty-scheduler//KO\r\nX-WR-CALNAME:{_ics_text(name)} 당직\r\n")
+            else:
+                handle = open(path, 'a', newline='', encoding='utf-8')
+            self.handles[name] = handle
+            if len(self.handles) > self.max_open:
+                self.handles.popitem(last=False)[1].close()
+        else:
+            self.handles.move_to_end(name)
+        handle.write(text)
+
+    def close(self):
+        for handle in self.handles.values():
+            handle.close()
+        self.handles.clear()
+        for path in self.paths.values():
+            with open(path, 'a', newline='', encoding='utf-8') as handle:
+                handle.write("END:VCALENDAR\r\n")
+        return list(self.paths.values())
+
+
+@traced('export ics', 'io')
+def export_ics(duty_df, directory, chunk_rows=CHUNK_ROWS):
+    # 한 번 훑으면서 직원마다 <이름>.ics에 종일 일정(VEVENT)을 나눠 쓴다
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.datetime.now(datetime.timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    fanout = _IcsFanout(directory)
+    try:
+        for chunk in iter_chunks(duty_df, chunk_rows):
+            ordinals = to_ordinals(chunk['Date'])
+            valid = ordinals != NO_DUTY_DAY.toordinal()
+            days = _ics_dates(ordinals)
+            next_days = _ics_dates(ordinals + 1)
+            first = chunk['Employee 1'].to_numpy(dtype=object)
+            second = chunk['Employee 2'].to_numpy(dtype=object)
+            for slot, (names, partners) in enumerate(((first, second), (second, first)), start=1):
+                for day, next_day, name, partner in zip(days[valid], next_days[valid], names[valid], partners[valid]):
+                    if pd.isna(name) or name == '':
+                        continue
+                    fanout.write(name, (
+                        f"BEGIN:VEVENT\r\nUID:{day}-{slot}@duty-scheduler\r\nDTSTAMP:{stamp}\r\n"
+                        f"DTSTART;VALUE=DATE:{day}\r\nDTEND;VALUE=DATE:{next_day}\r\n"
+                        f"SUMMARY:{_ics_text('당직')}\r\nDESCRIPTION:{_ics_text(f'함께 근무: {partner}')}\r\nEND:VEVENT\r\n"))
+    finally:
+        paths = fanout.close()
+    return paths
+
+
+def export_schedule(duty_df, path, export_format=None):
+    # path: csv/xlsx는 파일, ics는 직원별 파일을 둘 폴더
+    export_format = export_format or format_for_path(path)
+    if export_format == 'csv':
+        return export_csv(duty_df, path)
+    if export_format == 'xlsx':
+        return export_xlsx(duty_df, path)
+    if export_format == 'ics':
+        return export_ics(duty_df, path)
+    raise ValueError(f"지원하지 않는 형식입니다: {export_format}")
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+from schedule_engine import to_ordinals
+
+
+def duty_assignments(duty_df):
+    # 일정표를 (이름, 날짜 서수) 한 줄씩으로 펼친다
+    ordinals = to_ordinals(duty_df['Date'])
+    return pd.DataFrame({
+        'Name': np.concatenate([duty_df['Employee 1'].to_numpy(dtype=object), duty_df['Employee 2'].to_numpy(dtype=object)]),
+        'ordinal': np.concatenate([ordinals, ordinals]),
+    }).sort_values(['Name', 'ordinal'], kind='stable')
+
+
+def fairness_metrics(duty_df, names=None):
+    # names: 당번 대상 직원 목록. 주어지면 한 번도 배정되지 않은 직원도 횟수 0으로 계산
+    assignments = duty_assignments(duty_df)
+    counts = assignments['Name'].value_counts()
+    if names is not None:
+        counts = counts.reindex(pd.Index(names).unique(), fill_value=0)
+    gaps = assignments.groupby('Name')['ordinal'].diff().dropna()
+    weekday_table = pd.crosstab(assignments['Name'], (assignments['ordinal'] - 1) % 7).reindex(columns=range(5), fill_value=0)
+    return {
+        'count_std': float(counts.std(ddof=0)) if len(counts) else 0.0,
+        'count_spread': int(counts.max() - counts.min()) if len(counts) else 0,
+        'min_gap': int(gaps.min()) if len(gaps) else None,
+        'mean_gap': float(gaps.mean()) if len(gaps) else None,
+        'weekday_imbalance': float((weekday_table.max(axis=1) - weekday_table.min(axis=1)).mean()) if len(weekday_table) else 0.0,
+    }
@@ -0,0 +1,246 @@
+import sys
+import datetime
+import numpy as np
+import pandas as pd
+from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QHBoxLayout, QWidget, QScrollArea, QPushButton, QLabel, QFileDialog
+from PyQt5.QtCore import Qt, QRectF, QThreadPool
+from PyQt5.QtGui import QPainter, QColor, QFont
+from instrumentation import span, traced
+from schedule_engine import EPOCH_ORDINAL, iter_months, to_ordinals
+
+# 이 기간(일)보다 긴 일정은 plotly 그림에서 직원×월 당번 수로 묶어 그린다
+AGGREGATE_AFTER_DAYS = 92
+DAY_MS = 24 * 60 * 60 * 1000
+
+WEEKEND_COLOR = 'rgba(255,0,51,0.15)'
+HOLIDAY_COLOR = 'rgba(255,140,0,0.25)'
+BAR_COLOR = 'rgb(65,105,225)'
+
+
+def gantt_tasks(duty_df):
+    # 당번 한 자리 = 한 행 (Task=이름, Start/Finish=날짜), 이름/날짜 순
+    dates = pd.to_datetime(duty_df['Date'].astype(str).str.slice(0, 10), errors='coerce').to_numpy()
+    tasks = pd.DataFrame({
+        'Task': np.concatenate([duty_df['Employee 1'].to_numpy(dtype=object), duty_df['Employee 2'].to_numpy(dtype=object)]),
+        'Start': np.concatenate([dates, dates]),
+    }).dropna()
+    tasks['Finish'] = tasks['Start'] + pd.Timedelta(days=1)
+    return tasks.sort_values(['Task', 'Start'], ignore_index=True)
+
+
+def staff_month_counts(tasks):
+    # 직원 × 월 당번 수 (긴 기간을 한눈에 보기 위한 집계)
+    return pd.crosstab(tasks['Task'], tasks['Start'].dt.to_period('M'))
+
+
+def shading_runs(start, end, holidays=()):
+    # [start, end] 서수 구간에서 주말/공휴일이 이어지는 구간들을 (첫 서수, 마지막 서수 + 1) 배열로
+    days = np.arange(start, end + 1)
+    weekend = (days - 1) % 7 >= 5
+    holiday = np.isin(days, np.fromiter(holidays, dtype=np.int64)) & ~weekend
+    return {'weekend': _runs(days, weekend), 'holiday': _runs(days, holiday)}
+
+
+def _runs(days, mask):
+    edges = np.diff(np.concatenate([[0], mask.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return np.stack([days[starts], days[ends - 1] + 1], axis=1) if len(starts) else np.empty((0, 2), dtype=np.int64)
+
+
+def _ordinal_ms(ordinals):
+    return (np.asarray(ordinals, dtype=np.int64) - EPOCH_ORDINAL) * DAY_MS
+
+
+def _shading_shape(runs, color):
+    # 같은 종류의 음영은 사각형 여러 개를 SVG 경로 하나로 묶는다 (날짜 축의 경로 좌표는 epoch ms)
+    path = ' '.join(f'M{x0},0 H{x1} V1 H{x0} Z' for x0, x1 in zip(_ordinal_ms(runs[:, 0]), _ordinal_ms(runs[:, 1])))
+    return {'type': 'path', 'path': path, 'xref': 'x', 'yref': 'paper', 'fillcolor': color, 'line': {'width': 0}, 'layer': 'below'}
+
+
+def date_span(tasks, start=None, end=None):
+    start = start if start is not None else tasks['Start'].min()
+    end = end if end is not None else tasks['Start'].max()
+    return pd.Timestamp(start).toordinal(), pd.Timestamp(end).toordinal()
+
+
+@traced('gantt figure', 'chart')
+def build_gantt_figure(duty_df, holidays=(), start=None, end=None, title=None, aggregate=None):
+    # plotly는 무거우므로 그림을 처음 만들 때 가져온다
+    import plotly.graph_objects as go
+
+    tasks = gantt_tasks(duty_df)
+    if tasks.empty:
+        return go.Figure(layout={'title': title or '당직 일정표'})
+    first, last = date_span(tasks, start, end)
+    names = tasks['Task'].unique()
+    if aggregate is None:
+        aggregate = last - first > AGGREGATE_AFTER_DAYS
+
+    if aggregate:
+        counts = staff_month_counts(tasks)
+        fig = go.Figure(go.Heatmap(z=counts.to_numpy(), x=counts.columns.astype(str), y=counts.index,
+                                   colorscale='Blues', colorbar={'title': '당번 수'}))
+    else:
+        # 한 자리당 막대 하나를 trace 하나에 모두 담는다
+        fig = go.Figure(go.Bar(base=tasks['Start'], x=np.full(len(tasks), DAY_MS), y=tasks['Task'], orientation='h',
+                               marker_color=BAR_COLOR, hovertext=tasks['Start'].dt.strftime('%Y-%m-%d (%a)'), hoverinfo='y+text'))
+        runs = shading_runs(first, last, holidays)
+        shapes = [_shading_shape(runs[kind], color) for kind, color in (('weekend', WEEKEND_COLOR), ('holiday', HOLIDAY_COLOR)) if len(runs[kind])]
+        fig.update_layout(shapes=shapes, barmode='overlay')
+        fig.update_xaxes(type='date', range=[_ordinal_ms(first), _ordinal_ms(last + 1)], showgrid=True, gridcolor='gray')
+
+    start_date, end_date = datetime.date.fromordinal(first), datetime.date.fromordinal(last)
+    fig.update_layout(title=title or f'{start_date} ~ {end_date} 당직 일정표', height=max(400, 22 * len(names) + 150))
+    fig.update_yaxes(autorange='reversed', showgrid=True, gridcolor='gray')
+    return fig
+
+
+def export_html(fig, path):
+    # plotly.js를 파일에 포함하므로 인터넷 없이 열린다
+    fig.write_html(path, include_plotlyjs=True, full_html=True)
+    return path
+
+
+# plotly 없이 QPainter로 그리는 간트 차트. 보이는 행만 그린다
+class GanttCanvas(QWidget):
+    LABEL_WIDTH = 120
+    HEADER_HEIGHT = 24
+    ROW_HEIGHT = 20
+
+    def __init__(self, parent=None):
+        super(GanttCanvas, self).__init__(parent)
+        self.names = np.empty(0, dtype=object)
+        self.rows = np.empty(0, dtype=np.int64)
+        self.days = np.empty(0, dtype=np.int64)
+        self.first = self.last = datetime.date.today().toordinal()
+        self.runs = {'weekend': np.empty((0, 2)), 'holiday': np.empty((0, 2))}
+        self.day_width = 12.0
+
+    def set_schedule(self, duty_df, holidays=(), start=None, end=None):
+        tasks = gantt_tasks(duty_df)
+        if not tasks.empty:
+            self.first, self.last = date_span(tasks, start, end)
+        codes, self.names = pd.factorize(tasks['Task'], sort=True)
+        self.rows = codes.astype(np.int64)
+        self.days = (to_ordinals(tasks['Start']) - self.first) if len(tasks) else np.empty(0, dtype=np.int64)
+        self.runs = shading_runs(self.first, self.last, holidays)
+        # 긴 기간은 하루 폭을 줄인다 (최소 2픽셀)
+        self.day_width = max(2.0, min(12.0, 4000.0 / (self.last - self.first + 1)))
+        self.setMinimumSize(int(self.LABEL_WIDTH + self.day_width * (self.last - self.first + 1)) + 1,
+                            self.HEADER_HEIGHT + self.ROW_HEIGHT * len(self.names) + 1)
+        self.update()
+
+    def paintEvent(self, event):
+        with span('gantt paint', 'chart'):
+            painter = QPainter(self)
+            painter.fillRect(event.rect(), Qt.white)
+            height = self.HEADER_HEIGHT + self.ROW_HEIGHT * len(self.names)
+            left = self.LABEL_WIDTH
+
+            for kind, color in (('weekend', QColor(255, 0, 51, 40)), ('holiday', QColor(255, 140, 0, 64))):
+                for x0, x1 in self.runs[kind]:
+                    painter.fillRect(QRectF(left + (x0 - self.first) * self.day_width, self.HEADER_HEIGHT,
+                                            (x1 - x0) * self.day_width, height - self.HEADER_HEIGHT), color)
+
+            # 월 경계선과 월 이름
+            painter.setPen(QColor(160, 160, 160))
+            painter.setFont(QFont(painter.font().family(), 8))
+            for year, month, first, _ in iter_months(self.first, self.last):
+                x = left + (first - self.first) * self.day_width
+                painter.drawLine(int(x), 0, int(x), height)
+                painter.drawText(int(x) + 3, self.HEADER_HEIGHT - 7, f'{year}.{month:02d}')
+
+            first_row = max(0, (event.rect().top() - self.HEADER_HEIGHT) // self.ROW_HEIGHT)
+            last_row = min(len(self.names), (event.rect().bottom() - self.HEADER_HEIGHT) // self.ROW_HEIGHT + 1)
+            painter.setPen(Qt.black)
+            for row in range(first_row, last_row):
+                y = self.HEADER_HEIGHT + row * self.ROW_HEIGHT
+                painter.drawText(4, y + self.ROW_HEIGHT - 5, str(self.names[row]))
+
+            visible = (self.rows >= first_row) & (self.rows < last_row)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(65, 105, 225))
+            bar = max(1.0, self.day_width - 1)
+            painter.drawRects([QRectF(left + day * self.day_width, self.HEADER_HEIGHT + row * self.ROW_HEIGHT + 3, bar, self.ROW_HEIGHT - 6)
+                               for day, row in zip(self.days[visible], self.rows[visible])])
+            painter.end()
+
+    def save_png(self, path):
+        return self.grab().save(path, 'PNG')
+
+
+class GanttDialog(QDialog):
+    def __init__(self, duty_df, holidays=(), parent=None):
+        super(GanttDialog, self).__init__(parent)
+        self.setWindowTitle("당직 일정표")
+        self.setGeometry(100, 100, 1200, 700)
+        self.duty_df = duty_df
+        self.holidays = holidays
+        self.worker = None
+
+        layout = QVBoxLayout()
+        self.canvas = GanttCanvas()
+        self.canvas.set_schedule(duty_df, holidays)
+        scroll_area = QScrollArea()
+        scroll_area.setWidget(self.canvas)
+        layout.addWidget(scroll_area)
+
+        button_layout = QHBoxLayout()
+        png_button = QPushButton("PNG로 저장")
+        html_button = QPushButton("HTML로 내보내기")
+        browser_button = QPushButton("브라우저에서 보기")
+        button_layout.addWidget(png_button)
+        button_layout.addWidget(html_button)
+        button_layout.addWidget(browser_button)
+        layout.addLayout(button_layout)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        png_button.clicked.connect(self.save_png)
+        html_button.clicked.connect(self.save_html)
+        browser_button.clicked.connect(self.show_in_browser)
+
+    def save_png(self):
+        path, _ = QFileDialog.getSaveFileName(self, "PNG로 저장", "", "PNG Files (*.png)")
+        if path:
+            self.canvas.save_png(path)
+            self.status_label.setText(f"{path}에 저장했습니다.")
+
+    def save_html(self):
+        path, _ = QFileDialog.getSaveFileName(self, "HTML로 내보내기", "", "HTML Files (*.html)")
+        if path:
+            self.run_plotly(lambda fig: export_html(fig, path), f"{path}에 저장했습니다.")
+
+    def show_in_browser(self):
+        self.run_plotly(lambda fig: fig, None, show=True)
+
+    def run_plotly(self, action, message, show=False):
+        # plotly 그림 구성/파일 쓰기는 백그라운드에서, 브라우저 열기만 GUI 스레드에서
+        from generation_worker import FunctionWorker
+        if self.worker is not None:
+            return
+        self.worker = FunctionWorker(lambda: action(build_gantt_figure(self.duty_df, self.holidays)))
+        self.worker.signals.finished.connect(lambda result: self.on_plotly_finished(result, message, show))
+        self.worker.signals.failed.connect(self.on_plotly_failed)
+        self.status_label.setText("plotly 그림을 만드는 중...")
+        QThreadPool.globalInstance().start(self.worker)
+
+    def on_plotly_finished(self, result, message, show):
+        self.worker = None
+        self.status_label.setText(message or "")
+        if show:
+            result.show()
+
+    def on_plotly_failed(self, message):
+        self.worker = None
+        self.status_label.setText(f"실패: {message}")
+
+if __name__ == "__main__":
+    app = QApplication(sys.argv)
+    from data_store import get_data_store
+    window = GanttDialog(get_data_store().duties())
+    window.show()
+    sys.exit(app.exec_())
@@ -0,0 +1,112 @@
+import threading
+import traceback
+import pandas as pd
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+from schedule_engine import ScheduleEngine, GenerationCancelled, iter_months
+from vacation_matrix import VacationMatrix
+from workday_calendar import WorkdayCalendar
+from instrumentation import span
+
+
+class WorkerSignals(QObject):
+    progress = pyqtSignal(int, int, str)  # 끝난 양, 전체 양, 설명 (달 단위 또는 최적화 단계)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    cancelled = pyqtSignal()
+
+
+# QThreadPool에서 당번 일정을 생성한다. 결과는 finished 시그널로 GUI 스레드에 한 번에 넘긴다
+class GenerationWorker(QRunnable):
+    cancellable = True
+
+    def __init__(self, staff_df, vacation_df, holidays, start, end, solver=None, rules=None):
+        super().__init__()
+        self.signals = WorkerSignals()
+        self.staff_df = staff_df.copy()
+        self.vacation_df = vacation_df
+        # 공용 달력은 GUI에서도 쓰므로 작업용 달력을 따로 만든다
+        self.workday_calendar = WorkdayCalendar()
+        self.workday_calendar.set_holidays(holidays)
+        self.start = start
+        self.end = end
+        self.solver = solver
+        self.rules = rules
+        self._cancel = threading.Event()
+
+    @property
+    def total_months(self):
+        return sum(1 for _ in iter_months(self.start, self.end))
+
+    def cancel(self):
+        self._cancel.set()
+
+    def run(self):
+        with span('generation worker', 'worker'):
+            self._run()
+
+    def _run(self):
+        try:
+            engine = ScheduleEngine.from_staff_df(self.staff_df, rules=self.rules)
+            vacations = VacationMatrix.from_dataframe(self.vacation_df, engine.names, self.start, self.end)
+            total = self.total_months
+            frames = []
+            # 최적화 모드는 첫 달이 나오기 전에 전체 기간을 푸므로, 그동안의 단계를 진행으로 알리고 취소도 받는다
+            months = engine.generate_months(self.workday_calendar, self.start, self.end, vacations, self.solver,
+                                            cancel=self._cancel, progress=self.report_solver_progress)
+            for done, (year, month, rows) in enumerate(months, start=1):
+                if self._cancel.is_set():
+                    self.signals.cancelled.emit()
+                    return
+                frames.append(pd.DataFrame(rows, columns=['Date', 'Employee 1', 'Employee 2']))
+                self.signals.progress.emit(done, total, f"{year}년 {month}월까지 생성 완료")
+            duty_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['Date', 'Employee 1', 'Employee 2'])
+            self.signals.finished.emit({
+                'duty_df': duty_df,
+                'staff_df': engine.apply_to(self.staff_df),
+                'vacation_matrix': vacations,
+                'workdays': len(duty_df),
+            })
+        except GenerationCancelled:
+            self.signals.cancelled.emit()
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(str(e))
+
+    def report_solver_progress(self, done, total, phase):
+        self.signals.progress.emit(done, total, f"공정성 최적화: {phase}")
+
+
+# 임의의 함수를 백그라운드에서 실행 (간트 차트 구성, 시나리오 실행 등)
+# cancellable이면 함수에 cancel(threading.Event)과 progress(done, total, 설명)를 넘기고,
+# 함수가 GenerationCancelled를 올리면 cancelled 시그널을 보낸다
+class FunctionWorker(QRunnable):
+    def __init__(self, function, *args, cancellable=False, **kwargs):
+        super().__init__()
+        self.signals = WorkerSignals()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self._cancel = threading.Event() if cancellable else None
+
+    @property
+    def cancellable(self):
+        return self._cancel is not None
+
+    def cancel(self):
+        if self._cancel is not None:
+            self._cancel.set()
+
+    def run(self):
+        kwargs = self.kwargs
+        if self._cancel is not None:
+            kwargs = dict(kwargs, cancel=self._cancel, progress=self.signals.progress.emit)
+        try:
+            result = self.function(*self.args, **kwargs)
+        except GenerationCancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            traceback.print_exc()
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(result)
@@ -1,7 +1,10 @@
 import sys
-from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton, QHeaderView, QLabel
+from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton, QHeaderView, QLabel, QSpinBox
 from PyQt5.QtCore import Qt
 import pandas as pd
+from data_store import get_data_store
+from instrumentation import traced
+from korean_holidays import holidays_between, merge_holidays
 
 class HolidayManager(QDialog):
     def __init__(self, parent=None):
@@ -17,9 +20,26 @@ class HolidayManager(QDialog):
         self.holiday_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.holiday_table.verticalHeader().setVisible(False)
 
-        layout.addWidget(QLabel(f"{pd.Timestamp.now().year}년 휴일 목록"))
+        self.title_label = QLabel()
+        layout.addWidget(self.title_label)
         layout.addWidget(self.holiday_table)
 
+        # 내장 공휴일 표에서 연도 범위를 한 번에 채운다
+        generate_layout = QHBoxLayout()
+        this_year = pd.Timestamp.now().year
+        self.from_year_spin = QSpinBox()
+        self.to_year_spin = QSpinBox()
+        for spin in (self.from_year_spin, self.to_year_spin):
+            spin.setRange(1900, 2200)
+            spin.setValue(this_year)
+            spin.setSuffix("년")
+        self.generate_button = QPushButton("공휴일 자동 채우기")
+        generate_layout.addWidget(self.from_year_spin)
+        generate_layout.addWidget(QLabel("~"))
+        generate_layout.addWidget(self.to_year_spin)
+        generate_layout.addWidget(self.generate_button)
+        layout.addLayout(generate_layout)
+
         button_layout = QHBoxLayout()
         self.load_button = QPushButton("공휴일 불러오기")
         self.add_button = QPushButton("휴일 추가")
@@ -41,36 +61,56 @@ class HolidayManager(QDialog):
         self.setLayout(layout)
 
         self.load_button.clicked.connect(self.load_holidays)
+        self.generate_button.clicked.connect(self.generate_holidays)
         self.add_button.clicked.connect(self.add_holiday)
         self.remove_button.clicked.connect(self.remove_holiday)
         self.apply_button.clicked.connect(self.apply_changes)
         self.save_button.clicked.connect(self.save_and_exit)
 
-        self.holidays_df = pd.DataFrame(columns=['Date', 'Holiday Name'])
-        self.load_holidays()
+        self.store = get_data_store()
+        self.published_df = None
+        self.store.holidays_changed.connect(self.on_holidays_changed)
+        self.on_holidays_changed(self.store.holidays())
 
     def load_holidays(self):
-        try:
-            self.holidays_df = pd.read_csv('holidays.csv', parse_dates=['Date'])
-        except FileNotFoundError:
-            self.holidays_df = pd.DataFrame(columns=['Date', 'Holiday Name'])
+        self.store.reload_holidays()
+
+    def generate_holidays(self):
+        first_year, last_year = self.from_year_spin.value(), self.to_year_spin.value()
+        if last_year < first_year:
+            first_year, last_year = last_year, first_year
+        self.holidays_df, added = merge_holidays(self.holidays_df, holidays_between(first_year, last_year))
         self.update_holiday_table()
+        self.holiday_statistics.setText(f"{first_year}~{last_year}년 공휴일 {added}일을 추가했습니다. " + self.holiday_statistics.text())
 
+    def on_holidays_changed(self, holidays_df):
+        # 이 창에서 보낸 변경은 이미 표에 반영되어 있다
+        if holidays_df is self.published_df:
+            return
+        self.holidays_df = holidays_df.reset_index(drop=True)
+        self.update_holiday_table()
+
+    @traced('holiday table refresh', 'ui')
     def update_holiday_table(self):
+        # 여러 해를 한 번에 채우면 행이 수천 개가 되므로 그리는 동안 화면 갱신을 멈춘다
+        self.holiday_table.setUpdatesEnabled(False)
         self.holiday_table.setRowCount(len(self.holidays_df))
-        for i, row in self.holidays_df.iterrows():
-            self.holiday_table.setItem(i, 0, QTableWidgetItem(row['Date'].strftime('%Y/%m/%d')))
-            self.holiday_table.setItem(i, 1, QTableWidgetItem(row['Holiday Name']))
+        dates = pd.to_datetime(self.holidays_df['Date']).dt.strftime('%Y/%m/%d').fillna('')
+        for i, (date, name) in enumerate(zip(dates, self.holidays_df['Holiday Name'])):
+            self.holiday_table.setItem(i, 0, QTableWidgetItem(date))
+            self.holiday_table.setItem(i, 1, QTableWidgetItem('' if pd.isna(name) else str(name)))
+        self.holiday_table.setUpdatesEnabled(True)
         self.update_holiday_statistics()
 
     def add_holiday(self):
-        self.holidays_df = self.holidays_df.append({'Date': pd.Timestamp.now(), 'Holiday Name': '신규 휴일'}, ignore_index=True)
+        new_row = pd.DataFrame({'Date': [pd.Timestamp.now().normalize()], 'Holiday Name': ['신규 휴일']})
+        self.holidays_df = pd.concat([self.holidays_df, new_row], ignore_index=True)
         self.update_holiday_table()
 
     def remove_holiday(self):
         current_row = self.holiday_table.currentRow()
         if current_row >= 0:
-            self.holidays_df = self.holidays_df.drop(self.holidays_df.index[current_row])
+            self.holidays_df = self.holidays_df.drop(self.holidays_df.index[current_row]).reset_index(drop=True)
             self.update_holiday_table()
 
     def apply_changes(self):
@@ -80,19 +120,35 @@ class HolidayManager(QDialog):
             if date_item and name_item:
                 self.holidays_df.at[row, 'Date'] = pd.to_datetime(date_item.text(), format='%Y/%m/%d')
                 self.holidays_df.at[row, 'Holiday Name'] = name_item.text()
+        self.publish_holidays()
         self.update_holiday_statistics()
 
+    def publish_holidays(self, save=False):
+        self.published_df = self.holidays_df.copy()
+        self.store.set_holidays(self.published_df, save=save)
+
     def save_and_exit(self):
         self.apply_changes()
-        self.holidays_df.to_csv('holidays.csv', index=False)
+        try:
+            self.publish_holidays(save=True)
+        except ValueError as e:
+            self.holiday_statistics.setText(f"저장하지 못했습니다: {e}")
+            return
         self.close()
 
     def update_holiday_statistics(self):
-        year = pd.Timestamp.now().year
-        kr_holidays = pd.read_csv('holidays.csv', parse_dates=['Date'])
-        total_holidays = len(kr_holidays)
-        total_weekends = sum(1 for d in kr_holidays['Date'] if d.weekday() >= 5)
-        self.holiday_statistics.setText(f"{year}년의 공휴일: {total_holidays}일, 주말: {total_weekends}일")
+        dates = pd.to_datetime(self.holidays_df['Date']).dropna()
+        if dates.empty:
+            self.title_label.setText("휴일 목록")
+            self.holiday_statistics.setText("휴일이 없습니다.")
+            return
+        first_year, last_year = dates.dt.year.min(), dates.dt.year.max()
+        years = f"{first_year}년" if first_year == last_year else f"{first_year}~{last_year}년"
+        self.title_label.setText(f"{years} 휴일 목록")
+        this_year = dates[dates.dt.year == pd.Timestamp.now().year]
+        self.holiday_statistics.setText(
+            f"{years}의 공휴일: {len(dates)}일, 주말: {(dates.dt.weekday >= 5).sum()}일 "
+            f"(올해 {len(this_year)}일, 주말 {(this_year.dt.weekday >= 5).sum()}일)")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
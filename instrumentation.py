@@ -0,0 +1,121 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+# 주요 경로의 실행 시간 측정. DUTY_TRACE=1 일 때만 켜지고, 꺼져 있으면 span()은 아무 일도 하지 않는
+# 공용 객체를 돌려주고 @traced는 함수를 그대로 돌려주므로 비용이 거의 없다.
+# 켜져 있으면 종료할 때 DUTY_TRACE_FILE(기본 duty_trace.json)에 Chrome trace 형식으로 저장한다
+# (chrome://tracing 또는 https://ui.perfetto.dev 에서 열기).
+ENABLED = os.environ.get('DUTY_TRACE', '').lower() not in ('', '0', 'false', 'no')
+TRACE_FILE = os.environ.get('DUTY_TRACE_FILE', 'duty_trace.json')
+
+_events = []
+_lock = threading.Lock()
+_origin = time.perf_counter_ns()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('name', 'category', 'args', 'started')
+
+    def __init__(self, name, category, args):
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.started = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        finished = time.perf_counter_ns()
+        event = (self.name, self.category, self.started, finished - self.started, threading.get_ident(), self.args)
+        with _lock:
+            _events.append(event)
+        return False
+
+
+def span(name, category='app', **args):
+    # with span('generate month', year=2024, month=1): ...
+    if not ENABLED:
+        return NULL_SPAN
+    return _Span(name, category, args)
+
+
+def traced(name=None, category='app'):
+    # 함수 전체를 span으로 감싼다. 꺼져 있으면 감싸지 않는다
+    def decorator(function):
+        if not ENABLED:
+            return function
+        label = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with _Span(label, category, {}):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def events():
+    with _lock:
+        return list(_events)
+
+
+def clear():
+    with _lock:
+        _events.clear()
+
+
+def summary():
+    # 이름별 (호출 수, 합계/평균/최대 ms), 합계가 큰 순
+    totals = {}
+    for name, category, _, duration, _, _ in events():
+        entry = totals.setdefault(name, {'name': name, 'category': category, 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        ms = duration / 1e6
+        entry['count'] += 1
+        entry['total_ms'] += ms
+        entry['max_ms'] = max(entry['max_ms'], ms)
+    rows = sorted(totals.values(), key=lambda entry: entry['total_ms'], reverse=True)
+    for entry in rows:
+        entry['mean_ms'] = entry['total_ms'] / entry['count']
+    return rows
+
+
+def chrome_trace():
+    pid = os.getpid()
+    trace_events = [{'name': name, 'cat': category, 'ph': 'X', 'ts': (started - _origin) / 1000, 'dur': duration / 1000,
+                     'pid': pid, 'tid': tid, 'args': args}
+                    for name, category, started, duration, tid, args in events()]
+    return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+
+def export_chrome_trace(path=None):
+    path = path or TRACE_FILE
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(chrome_trace(), f, ensure_ascii=False, default=str)
+    return path
+
+
+def _export_at_exit():
+    if _events:
+        export_chrome_trace()
+
+
+if ENABLED:
+    atexit.register(_export_at_exit)
@@ -0,0 +1,191 @@
+import datetime
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+from schedule_engine import ordinals_to_datetimes
+
+# 인터넷 없이 한국 공휴일을 만든다. 음력 공휴일(설날, 부처님오신날, 추석)은 아래 내장 표에서 읽고,
+# 표 밖의 연도만 lunar_calendar로 계산한다. 대체공휴일은 시행 시점별 규칙을 따른다.
+# 임시공휴일과 선거일은 미리 알 수 없으므로 휴일 관리 창에서 직접 추가한다.
+FIRST_YEAR = 1950
+LAST_YEAR = 2050
+
+# 연도별 음력 공휴일의 1월 1일 기준 일수(0부터): 설날 3자리, 부처님오신날 3자리, 추석 3자리.
+# python lunar_calendar.py 1950 2050 으로 다시 만들 수 있다
+LUNAR_TABLE = """
+047143268 036132257 026121276 044139264 034129253 023148272 042137262 030126250 049145269 038134259
+027123278 045141266 035130255 024120274 043139263 032127252 021146271 039135260 029125279 047142268
+036131257 026121275 045140265 033129253 022118272 041137262 030126251 048144269 037133259 027122277
+046141266 035130254 024120273 043139263 032128253 050146271 039135260 028124279 048143268 036131256
+026121275 045140264 034130254 022147272 040137262 030126251 049144270 038133258 027122277 046141266
+035131255 023120273 042138263 031127253 021146271 039134260 028124278 048143267 037132257 025121275
+044140264 033129254 022148273 040136261 030125250 049144269 038134258 027122276 046141266 035131255
+024120274 042138263 031127252 021146271 040135260 028124278 047143267 037132257 026122276 043139264
+033128254 022147273 041136262 030125250 049144269 038134258 027123277 045141266 034130255 023119274
+042138264 031126252 021145270 040135259 029125278 047143267 036132257 025121276 044140265 032128253
+022147272
+"""
+
+# (월, 일, 이름, 시작 연도, 마지막 연도)
+FIXED_HOLIDAYS = [
+    (1, 1, '신정', 1950, None),
+    (3, 1, '삼일절', 1950, None),
+    (4, 5, '식목일', 1950, 2005),
+    (5, 5, '어린이날', 1975, None),
+    (6, 6, '현충일', 1956, None),
+    (7, 17, '제헌절', 1950, 2007),
+    (8, 15, '광복절', 1950, None),
+    (10, 3, '개천절', 1950, None),
+    (10, 9, '한글날', 1950, 1990),
+    (10, 9, '한글날', 2013, None),
+    (12, 25, '성탄절', 1950, None),
+]
+
+# 대체공휴일 시행일. 설날/추석은 일요일이나 다른 공휴일과 겹칠 때,
+# 나머지는 토요일/일요일이나 다른 공휴일과 겹칠 때 다음 첫 평일을 쉰다
+SUBSTITUTE_SINCE = {
+    '설날': datetime.date(2014, 1, 1),
+    '추석': datetime.date(2014, 1, 1),
+    '어린이날': datetime.date(2014, 1, 1),
+    '삼일절': datetime.date(2021, 7, 7),
+    '광복절': datetime.date(2021, 7, 7),
+    '개천절': datetime.date(2021, 7, 7),
+    '한글날': datetime.date(2021, 7, 7),
+    '부처님오신날': datetime.date(2023, 5, 4),
+    '성탄절': datetime.date(2023, 5, 4),
+}
+SUNDAY_ONLY = ('설날', '추석')
+SUBSTITUTE_NAME = '대체공휴일'
+
+
+def encode_lunar_table(first_year, last_year):
+    # lunar_calendar로 계산해서 LUNAR_TABLE 형식(한 줄에 10년)으로 만든다
+    from lunar_calendar import lunar_to_solar
+    entries = []
+    for year in range(first_year, last_year + 1):
+        new_year = datetime.date(year, 1, 1).toordinal()
+        entries.append(''.join(f'{lunar_to_solar(year, month, day) - new_year:03d}' for month, day in ((1, 1), (4, 8), (8, 15))))
+    return '\n'.join(' '.join(entries[i:i + 10]) for i in range(0, len(entries), 10))
+
+
+def _decode_lunar_table(text):
+    digits = np.frombuffer(''.join(text.split()).encode(), dtype=np.uint8) - ord('0')
+    triples = digits.reshape(-1, 3).astype(np.int16) @ np.array([100, 10, 1], dtype=np.int16)
+    return triples.reshape(-1, 3)
+
+
+_lunar_days = _decode_lunar_table(LUNAR_TABLE)
+
+
+def lunar_holidays(year):
+    # (설날, 부처님오신날, 추석) 날짜 서수
+    index = year - FIRST_YEAR
+    if 0 <= index < len(_lunar_days):
+        return tuple(datetime.date(year, 1, 1).toordinal() + int(day) for day in _lunar_days[index])
+    from lunar_calendar import lunar_to_solar
+    return tuple(lunar_to_solar(year, month, day) for month, day in ((1, 1), (4, 8), (8, 15)))
+
+
+def _holiday_groups(year):
+    # [(이름, [날짜 서수])] 연휴는 한 묶음
+    groups = [(name, [datetime.date(year, month, day).toordinal()])
+              for month, day, name, since, until in FIXED_HOLIDAYS
+              if since <= year and (until is None or year <= until)]
+    seollal, buddha, chuseok = lunar_holidays(year)
+    if year >= 1989:
+        groups.append(('설날', [seollal - 1, seollal, seollal + 1]))
+    elif year >= 1985:
+        groups.append(('설날', [seollal]))
+    if year >= 1975:
+        groups.append(('부처님오신날', [buddha]))
+    if year >= 1989:
+        groups.append(('추석', [chuseok - 1, chuseok, chuseok + 1]))
+    elif year >= 1986:
+        groups.append(('추석', [chuseok, chuseok + 1]))
+    else:
+        groups.append(('추석', [chuseok]))
+    return groups
+
+
+def _is_weekend(ordinal):
+    return (ordinal - 1) % 7 >= 5
+
+
+@lru_cache(maxsize=256)
+def year_holidays(year):
+    # year년 공휴일 [(날짜 서수, 이름)]. 같은 날 겹치면 이름을 이어 붙인다
+    groups = _holiday_groups(year)
+    names = {}
+    for name, days in groups:
+        for ordinal in days:
+            names.setdefault(ordinal, []).append(name)
+    # 두 공휴일이 같은 날 겹치면 대체공휴일은 하루만 (2025년 어린이날·부처님오신날)
+    compensated = set()
+    for name, days in sorted(groups, key=lambda group: group[1][0]):
+        since = SUBSTITUTE_SINCE.get(name)
+        if since is None or days[-1] < since.toordinal():
+            continue
+        sunday_only = name in SUNDAY_ONLY
+        overlapped = [ordinal for ordinal in days if ordinal not in compensated and
+                      (len(names[ordinal]) > 1 or ((ordinal - 1) % 7 == 6 if sunday_only else _is_weekend(ordinal)))]
+        compensated.update(overlapped)
+        overlaps = len(overlapped)
+        substitute = days[-1]
+        for _ in range(overlaps):
+            substitute += 1
+            while _is_weekend(substitute) or substitute in names:
+                substitute += 1
+            names[substitute] = [f'{SUBSTITUTE_NAME}({name})']
+    return tuple((ordinal, ', '.join(names[ordinal])) for ordinal in sorted(names))
+
+
+# FIRST_YEAR~LAST_YEAR 전체 공휴일 표 (날짜 서수마다 이름 번호 2바이트, 처음 쓸 때 만든다). holidays_between이 연도 범위만큼 잘라 쓴다
+FIRST_ORDINAL = datetime.date(FIRST_YEAR, 1, 1).toordinal()
+LAST_ORDINAL = datetime.date(LAST_YEAR, 12, 31).toordinal()
+_codes = None
+_names = [None]
+
+
+def _holiday_codes():
+    global _codes
+    if _codes is None:
+        codes = np.zeros(LAST_ORDINAL - FIRST_ORDINAL + 1, dtype=np.uint16)
+        index = {}
+        for year in range(FIRST_YEAR, LAST_YEAR + 1):
+            for ordinal, name in year_holidays(year):
+                if name not in index:
+                    index[name] = len(_names)
+                    _names.append(name)
+                codes[ordinal - FIRST_ORDINAL] = index[name]
+        _codes = codes
+    return _codes
+
+
+def holidays_between(first_year, last_year):
+    # first_year~last_year 공휴일을 holidays.csv와 같은 열(Date, Holiday Name)의 DataFrame 하나로
+    first = datetime.date(first_year, 1, 1).toordinal()
+    last = datetime.date(last_year, 12, 31).toordinal()
+    lo, hi = max(first, FIRST_ORDINAL), min(last, LAST_ORDINAL)
+    ordinals, names = [], []
+    if lo <= hi:
+        codes = _holiday_codes()[lo - FIRST_ORDINAL:hi - FIRST_ORDINAL + 1]
+        days = np.flatnonzero(codes)
+        ordinals.extend((days + lo).tolist())
+        names.extend(_names[code] for code in codes[days])
+    # 표 밖의 연도
+    for year in list(range(first_year, min(last_year, FIRST_YEAR - 1) + 1)) + list(range(max(first_year, LAST_YEAR + 1), last_year + 1)):
+        for ordinal, name in year_holidays(year):
+            ordinals.append(ordinal)
+            names.append(name)
+    order = np.argsort(ordinals, kind='stable')
+    return pd.DataFrame({'Date': ordinals_to_datetimes(np.asarray(ordinals, dtype=np.int64)[order]),
+                         'Holiday Name': np.asarray(names, dtype=object)[order]})
+
+
+def merge_holidays(holidays_df, generated_df):
+    # 이미 있는 날짜는 기존 이름(직접 고친 이름, 임시공휴일 등)을 그대로 두고 새 날짜만 더한다
+    existing = pd.to_datetime(holidays_df['Date']).dt.normalize()
+    added = generated_df[~generated_df['Date'].isin(existing)]
+    merged = pd.concat([holidays_df, added], ignore_index=True)
+    merged['Date'] = pd.to_datetime(merged['Date'])
+    return merged.sort_values('Date', kind='stable').reset_index(drop=True), len(added)
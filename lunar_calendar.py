@@ -0,0 +1,151 @@
+import math
+
+# 한국 음력(태음태양력) 계산. 삭(new moon)은 Meeus 49장, 태양 황경은 Meeus 25장(저정밀) 공식으로 구하고
+# 날짜 경계는 한국 표준시(UTC+9)로 자른다. korean_holidays의 내장 표를 만들 때와 표 밖의 연도에만 쓴다.
+#   python lunar_calendar.py 1950 2050   → korean_holidays.LUNAR_TABLE 문자열 출력
+
+KST_HOURS = 9
+SYNODIC_MONTH = 29.530588861
+TROPICAL_YEAR = 365.242189
+# 율리우스일 ↔ 날짜 서수: 서수 = floor(JD + 0.5) - JD_ORDINAL_OFFSET
+JD_ORDINAL_OFFSET = 1721425
+
+_NEW_MOON_TERMS = [
+    # (계수, E 차수, M, M', F, Ω)
+    (-0.40720, 0, 0, 1, 0, 0), (0.17241, 1, 1, 0, 0, 0), (0.01608, 0, 0, 2, 0, 0), (0.01039, 0, 0, 0, 2, 0),
+    (0.00739, 1, -1, 1, 0, 0), (-0.00514, 1, 1, 1, 0, 0), (0.00208, 2, 2, 0, 0, 0), (-0.00111, 0, 0, 1, -2, 0),
+    (-0.00057, 0, 0, 1, 2, 0), (0.00056, 1, 1, 2, 0, 0), (-0.00042, 0, 0, 3, 0, 0), (0.00042, 1, 1, 0, 2, 0),
+    (0.00038, 1, 1, 0, -2, 0), (-0.00024, 1, -1, 2, 0, 0), (-0.00017, 0, 0, 0, 0, 1), (-0.00007, 0, 2, 1, 0, 0),
+    (0.00004, 0, 0, 2, -2, 0), (0.00004, 0, 3, 0, 0, 0), (0.00003, 0, 1, 1, -2, 0), (0.00003, 0, 0, 2, 2, 0),
+    (-0.00003, 0, 1, 1, 2, 0), (0.00003, 0, -1, 1, 2, 0), (-0.00002, 0, -1, 1, -2, 0), (-0.00002, 0, 1, 3, 0, 0),
+    (0.00002, 0, 0, 4, 0, 0),
+]
+
+_PLANETARY_TERMS = [
+    # (계수, 상수항, k 계수)
+    (0.000325, 299.77, 0.107408), (0.000165, 251.88, 0.016321), (0.000164, 251.83, 26.651886),
+    (0.000126, 349.42, 36.412478), (0.000110, 84.66, 18.206239), (0.000062, 141.74, 53.303771),
+    (0.000060, 207.14, 2.453732), (0.000056, 154.84, 7.306860), (0.000047, 34.52, 27.261239),
+    (0.000042, 207.19, 0.121824), (0.000040, 291.34, 1.844379), (0.000037, 161.72, 24.198154),
+    (0.000035, 239.56, 25.513099), (0.000023, 331.55, 3.592518),
+]
+
+
+def delta_t(year):
+    # 지구시(TT) - 세계시(UT), 초. Espenak & Meeus 다항식
+    if 1941 <= year < 1961:
+        t = year - 1950
+        return 29.07 + 0.407 * t - t * t / 233 + t ** 3 / 2547
+    if 1961 <= year < 1986:
+        t = year - 1975
+        return 45.45 + 1.067 * t - t * t / 260 - t ** 3 / 718
+    if 1986 <= year < 2005:
+        t = year - 2000
+        return 63.86 + 0.3345 * t - 0.060374 * t ** 2 + 0.0017275 * t ** 3 + 0.000651814 * t ** 4 + 0.00002373599 * t ** 5
+    if 2005 <= year < 2050:
+        t = year - 2000
+        return 62.92 + 0.32217 * t + 0.005589 * t * t
+    u = (year - 1820) / 100
+    if 2050 <= year < 2150:
+        return -20 + 32 * u * u - 0.5628 * (2150 - year)
+    return -20 + 32 * u * u
+
+
+def new_moon_jde(k):
+    # k번째 삭의 율리우스 역표일 (k = 0 은 2000년 1월 6일 삭)
+    t = k / 1236.85
+    jde = 2451550.09766 + SYNODIC_MONTH * k + 0.00015437 * t ** 2 - 0.000000150 * t ** 3 + 0.00000000073 * t ** 4
+    e = 1 - 0.002516 * t - 0.0000074 * t * t
+    m = math.radians(2.5534 + 29.10535670 * k - 0.0000014 * t ** 2 - 0.00000011 * t ** 3)
+    mp = math.radians(201.5643 + 385.81693528 * k + 0.0107582 * t ** 2 + 0.00001238 * t ** 3 - 0.000000058 * t ** 4)
+    f = math.radians(160.7108 + 390.67050284 * k - 0.0016118 * t ** 2 - 0.00000227 * t ** 3 + 0.000000011 * t ** 4)
+    omega = math.radians(124.7746 - 1.56375588 * k + 0.0020672 * t ** 2 + 0.00000215 * t ** 3)
+    for coefficient, e_power, cm, cmp, cf, comega in _NEW_MOON_TERMS:
+        jde += coefficient * e ** e_power * math.sin(cm * m + cmp * mp + cf * f + comega * omega)
+    for coefficient, base, rate in _PLANETARY_TERMS:
+        angle = base + rate * k - (0.009173 * t * t if base == 299.77 else 0)
+        jde += coefficient * math.sin(math.radians(angle))
+    return jde
+
+
+def sun_longitude(jde):
+    # 겉보기 태양 황경(도)
+    t = (jde - 2451545.0) / 36525
+    l0 = 280.46646 + 36000.76983 * t + 0.0003032 * t * t
+    m = math.radians(357.52911 + 35999.05029 * t - 0.0001537 * t * t)
+    center = ((1.914602 - 0.004817 * t - 0.000014 * t * t) * math.sin(m)
+              + (0.019993 - 0.000101 * t) * math.sin(2 * m) + 0.000289 * math.sin(3 * m))
+    omega = math.radians(125.04 - 1934.136 * t)
+    return (l0 + center - 0.00569 - 0.00478 * math.sin(omega)) % 360
+
+
+def solar_term_jde(year, longitude):
+    # year년에 태양 황경이 longitude가 되는 순간 (춘분 0°, 하지 90°, 추분 180°, 동지 270°)
+    jde = 2451623.80984 + TROPICAL_YEAR * (year - 2000) + TROPICAL_YEAR * longitude / 360
+    for _ in range(50):
+        step = 58.13 * math.sin(math.radians(longitude - sun_longitude(jde)))
+        jde += step
+        if abs(step) < 1e-7:
+            break
+    return jde
+
+
+def kst_ordinal(jde):
+    # 역표일 → 한국 표준시 날짜 서수
+    year = 2000 + (jde - 2451545.0) / 365.25
+    jd_ut = jde - delta_t(year) / 86400
+    return math.floor(jd_ut + KST_HOURS / 24 + 0.5) - JD_ORDINAL_OFFSET
+
+
+def _new_moon_on_or_before(ordinal):
+    # ordinal(포함) 이전의 마지막 삭: (k, 날짜 서수)
+    jd = ordinal + JD_ORDINAL_OFFSET
+    k = math.floor((jd - 2451550.09766) / SYNODIC_MONTH) + 2
+    while kst_ordinal(new_moon_jde(k)) > ordinal:
+        k -= 1
+    return k, kst_ordinal(new_moon_jde(k))
+
+
+def lunar_months(year):
+    # year-1년 동짓달(11월)부터 year년 동짓달 전까지의 음력 달: [(달 번호, 윤달 여부, 첫날 서수)]
+    first_k, _ = _new_moon_on_or_before(kst_ordinal(solar_term_jde(year - 1, 270)))
+    last_k, _ = _new_moon_on_or_before(kst_ordinal(solar_term_jde(year, 270)))
+    starts = [kst_ordinal(new_moon_jde(k)) for k in range(first_k, last_k + 2)]
+    leap_index = None
+    if last_k - first_k == 13:
+        # 중기(황경 30°의 배수)가 없는 첫 달이 윤달
+        terms = [kst_ordinal(solar_term_jde(year - 1 + (longitude + 270) // 360, (longitude + 270) % 360))
+                 for longitude in range(0, 390, 30)]
+        for i in range(1, 13):
+            if not any(starts[i] <= term < starts[i + 1] for term in terms):
+                leap_index = i
+                break
+    months = []
+    number = 11
+    for i, start in enumerate(starts[:-1]):
+        if i == leap_index:
+            months.append((number, True, start))
+            continue
+        if i:
+            number = number % 12 + 1
+        months.append((number, False, start))
+    return months
+
+
+def lunar_to_solar(year, month, day, leap=False):
+    # 음력 year년 month월 day일 → 양력 날짜 서수
+    months = lunar_months(year if month < 11 else year + 1)
+    seen_new_year = month >= 11
+    for number, is_leap, start in months:
+        if number == 1 and not is_leap:
+            seen_new_year = True
+        if seen_new_year and number == month and is_leap == leap:
+            return start + day - 1
+    raise ValueError(f"음력 {year}년 {'윤' if leap else ''}{month}월이 없습니다.")
+
+
+if __name__ == "__main__":
+    import sys
+    from korean_holidays import encode_lunar_table
+    first, last = (int(value) for value in sys.argv[1:3]) if len(sys.argv) >= 3 else (1950, 2050)
+    print(encode_lunar_table(first, last))
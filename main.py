@@ -1,42 +1,140 @@
+import time
+
+STARTED = time.perf_counter()
+
 import os
 import sys
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout, QLabel, QFrame, QPushButton, QHBoxLayout, QGridLayout, QCalendarWidget
-from PyQt5.QtCore import Qt, QDate
-from PyQt5.QtGui import QTextCharFormat
+from PyQt5.QtCore import Qt, QDate, QTimer
+from PyQt5.QtGui import QTextCharFormat, QFont, QColor
 import datetime
-from holiday_manager import HolidayManager
-from duty_scheduler import DutyScheduler
-import pandas as pd
+from collections import OrderedDict
+from instrumentation import ENABLED as TRACE_ENABLED, span
+
+# pandas/plotly를 쓰는 모듈(data_store, holiday_manager, duty_scheduler 등)은 처음 필요할 때 가져온다
+IMPORTED = time.perf_counter()
+
+
+def elapsed_ms(since):
+    return (time.perf_counter() - since) * 1000
 
 # Qt platform plugin 설정
 os.environ["QT_QPA_PLATFORM_PLUGIN_PATH"] = "/Users/river-181/Documents/RandomProgram/202406/project_directory/.venv/lib/python3.11/site-packages/PyQt5/Qt/plugins"
 
+# 캐시에 보관할 달 수
+MAX_CACHED_MONTHS = 24
+
+
 class CustomCalendarWidget(QCalendarWidget):
     def __init__(self):
         super().__init__()
         self.setGridVisible(True)
         self.setVerticalHeaderFormat(QCalendarWidget.NoVerticalHeader)
-        self.update_calendar_format()
         self.set_custom_style()
 
-    def update_calendar_format(self):
-        # Set format for weekends
+        # 주말 색은 요일 서식으로 한 번만 지정한다 (날짜 서식이 그 위에 겹쳐진다)
         format_saturday = QTextCharFormat()
         format_saturday.setForeground(Qt.blue)
-        
         format_sunday = QTextCharFormat()
         format_sunday.setForeground(Qt.red)
-        
-        current_date = QDate.currentDate()
-        first_day_of_month = QDate(current_date.year(), current_date.month(), 1)
-        days_in_month = first_day_of_month.daysInMonth()
-        
-        for day in range(1, days_in_month + 1):
-            date = QDate(current_date.year(), current_date.month(), day)
-            if date.dayOfWeek() == Qt.Saturday:
-                self.setDateTextFormat(date, format_saturday)
-            elif date.dayOfWeek() == Qt.Sunday:
-                self.setDateTextFormat(date, format_sunday)
+        self.setWeekdayTextFormat(Qt.Saturday, format_saturday)
+        self.setWeekdayTextFormat(Qt.Sunday, format_sunday)
+
+        # (연, 월) → [(QDate, QTextCharFormat)] LRU. 데이터가 바뀔 때만 비운다
+        self.store = None
+        self.month_cache = OrderedDict()
+        self.duty_index = None
+        self.holiday_names = None
+        self.currentPageChanged.connect(self.apply_month)
+
+    def set_store(self, store):
+        self.store = store
+        store.duties_changed.connect(self.on_duties_changed)
+        store.vacations_changed.connect(self.invalidate)
+        store.holidays_changed.connect(self.on_holidays_changed)
+        self.update_calendar_format()
+
+    def on_duties_changed(self, *args):
+        self.duty_index = None
+        self.invalidate()
+
+    def on_holidays_changed(self, *args):
+        self.holiday_names = None
+        self.invalidate()
+
+    def invalidate(self, *args):
+        self.month_cache.clear()
+        self.update_calendar_format()
+
+    def update_calendar_format(self):
+        self.apply_month(self.yearShown(), self.monthShown())
+
+    def apply_month(self, year, month):
+        if self.store is None:
+            return
+        entries = self.month_cache.get((year, month))
+        if entries is None:
+            with span('calendar month formats', 'ui', year=year, month=month):
+                entries = self.build_month(year, month)
+            self.month_cache[(year, month)] = entries
+            if len(self.month_cache) > MAX_CACHED_MONTHS:
+                self.month_cache.popitem(last=False)
+        else:
+            self.month_cache.move_to_end((year, month))
+        # 이전 달의 날짜 서식을 지우고 이번 달 것만 건다
+        self.setDateTextFormat(QDate(), QTextCharFormat())
+        for date, text_format in entries:
+            self.setDateTextFormat(date, text_format)
+
+    def get_duty_index(self):
+        # (연, 월) → {일: (당번 1, 당번 2)}
+        if self.duty_index is None:
+            import pandas as pd
+            duty_df = self.store.duties()
+            self.duty_index = {}
+            if len(duty_df) and 'Employee 1' in duty_df.columns:
+                dates = pd.to_datetime(duty_df['Date'].astype(str).str.slice(0, 10), errors='coerce')
+                for date, first, second in zip(dates, duty_df['Employee 1'], duty_df['Employee 2']):
+                    if not pd.isna(date):
+                        self.duty_index.setdefault((date.year, date.month), {})[date.day] = (first, second)
+        return self.duty_index
+
+    def get_holiday_names(self):
+        if self.holiday_names is None:
+            holidays_df = self.store.holidays().dropna(subset=['Date'])
+            self.holiday_names = {date.date(): name for date, name in zip(holidays_df['Date'], holidays_df['Holiday Name'])}
+        return self.holiday_names
+
+    def build_month(self, year, month):
+        first = datetime.date(year, month, 1)
+        last = first.replace(day=QDate(year, month, 1).daysInMonth())
+        holiday_names = self.get_holiday_names()
+        duties = self.get_duty_index().get((year, month), {})
+        off = {}
+        vacation_df = self.store.vacations_between(first, last).dropna(subset=['Start Date', 'End Date'])
+        for name, start, end in zip(vacation_df['Name'], vacation_df['Start Date'], vacation_df['End Date']):
+            for day in range(max(start.date(), first).day, min(end.date(), last).day + 1):
+                off.setdefault(day, []).append(str(name))
+
+        entries = []
+        for day in range(1, last.day + 1):
+            date = first.replace(day=day)
+            text_format = QTextCharFormat()
+            tooltip = []
+            if date in holiday_names:
+                text_format.setForeground(Qt.red)
+                text_format.setFontWeight(QFont.Bold)
+                tooltip.append(f"공휴일: {holiday_names[date]}")
+            if day in duties:
+                text_format.setBackground(QColor(200, 230, 201))
+                tooltip.append(f"당직: {', '.join(map(str, duties[day]))}")
+            if day in off:
+                text_format.setFontUnderline(True)
+                tooltip.append(f"휴가: {', '.join(off[day])}")
+            if tooltip:
+                text_format.setToolTip("\n".join(tooltip))
+                entries.append((QDate(year, month, day), text_format))
+        return entries
 
     def set_custom_style(self):
         self.setStyleSheet("""
@@ -91,17 +189,14 @@ class CustomCalendarWidget(QCalendarWidget):
         current_date = self.selectedDate()
         new_date = current_date.addMonths(-1)
         self.setSelectedDate(new_date)
-        self.update_calendar_format()
 
     def show_next_month(self):
         current_date = self.selectedDate()
         new_date = current_date.addMonths(1)
         self.setSelectedDate(new_date)
-        self.update_calendar_format()
 
     def show_today(self):
         self.setSelectedDate(QDate.currentDate())
-        self.update_calendar_format()
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -124,9 +219,45 @@ class MainWindow(QMainWindow):
 
         self.central_widget.setLayout(main_layout)
 
-        # Initialize managers
-        self.holiday_manager = HolidayManager(self)
-        self.duty_scheduler = DutyScheduler(self)
+        # 관리 창은 처음 열 때 만든다
+        self.holiday_manager = None
+        self.staff_manager = None
+        self.duty_scheduler = None
+
+        # 창이 뜬 다음 이벤트 루프에서 데이터를 읽어 달력/직원 현황을 채운다
+        self.timings = {'imports': (IMPORTED - STARTED) * 1000}
+        QTimer.singleShot(0, self.finish_startup)
+
+    def finish_startup(self):
+        self.timings['window'] = elapsed_ms(STARTED)
+        loading = time.perf_counter()
+        with span('startup data', 'startup'):
+            from data_store import get_data_store
+            store = get_data_store()
+            store.staff_changed.connect(self.update_duty_staff_label)
+            self.update_duty_staff_label(store.staff())
+            self.calendar.set_store(store)
+            # 저장된 일정의 통계. 당직 일정 창이 열려 있으면 그 창의 통계 시그널로 갱신된다
+            from duty_statistics import DutyStatistics
+            self.duty_statistics = DutyStatistics()
+            store.duties_changed.connect(self.on_duties_changed)
+            self.on_duties_changed(store.duties())
+        self.timings['data'] = elapsed_ms(loading)
+        self.show_timings()
+
+    def show_timings(self):
+        labels = {'imports': '모듈 로드', 'window': '창 표시', 'data': '데이터 준비',
+                  'holiday_manager': '휴일 관리 창', 'duty_scheduler': '당직 일정 창', 'staff_manager': '직원 관리 창'}
+        self.statusBar().showMessage(" · ".join(f"{labels[key]} {ms:.0f} ms" for key, ms in self.timings.items()))
+
+    def build_dialog(self, name, factory):
+        # 관리 창을 처음 열 때 걸린 시간(모듈 import 포함)을 상태 표시줄에 남긴다
+        started = time.perf_counter()
+        with span(f'build {name}', 'startup'):
+            dialog = factory()
+        self.timings[name] = elapsed_ms(started)
+        self.show_timings()
+        return dialog
 
     def create_navigation_frame(self, layout):
         navigation_frame = QFrame()
@@ -149,6 +280,10 @@ class MainWindow(QMainWindow):
         nav_layout.addWidget(staff_manager_button)
         nav_layout.addWidget(holiday_manager_button)
         nav_layout.addWidget(duty_scheduler_button)
+        if TRACE_ENABLED:
+            debug_button = QPushButton("성능 측정")
+            debug_button.clicked.connect(self.show_debug_panel)
+            nav_layout.addWidget(debug_button)
         nav_layout.addStretch(1)
 
         reset_button = QPushButton("초기화")
@@ -207,6 +342,9 @@ class MainWindow(QMainWindow):
         stat_layout = QVBoxLayout()
 
         stat_layout.addWidget(QLabel("당직 실시간"))
+        self.duty_statistics_label = QLabel()
+        self.duty_statistics_label.setWordWrap(True)
+        stat_layout.addWidget(self.duty_statistics_label)
         stat_layout.addWidget(QLabel("공휴일 실시간"))
         stat_layout.addWidget(QLabel("총 휴일 실시간"))
 
@@ -220,34 +358,66 @@ class MainWindow(QMainWindow):
 
         emp_layout.addWidget(QLabel("당직 직원 현황"))
 
-        # Load the staff data
-        try:
-            staff_df = pd.read_csv('staff.csv', parse_dates=['Last Duty Day'])
-            on_duty_staff = staff_df[staff_df['On Duty'] == True]['Name'].tolist()
-            on_duty_staff_str = "\n".join(on_duty_staff)
-        except FileNotFoundError:
-            on_duty_staff_str = "No data available"
-
-        self.duty_staff_label = QLabel(on_duty_staff_str)
+        # 직원 데이터는 공용 저장소에서 받고, 바뀌면 시그널로 갱신 (finish_startup에서 연결)
+        self.duty_staff_label = QLabel()
         emp_layout.addWidget(self.duty_staff_label)
 
         employee_frame.setLayout(emp_layout)
         layout.addWidget(employee_frame, 2, 2)
 
+    def on_duties_changed(self, duty_df):
+        from workday_calendar import get_workday_calendar
+        self.duty_statistics.set_holidays(get_workday_calendar().holidays, duty_df)
+        self.update_duty_statistics_label(self.duty_statistics.summary())
+
+    def update_duty_statistics_label(self, summary):
+        from duty_statistics import format_summary
+        self.duty_statistics_label.setText(format_summary(summary))
+
+    def update_duty_staff_label(self, staff_df):
+        if staff_df.empty:
+            on_duty_staff_str = "No data available"
+        else:
+            on_duty_staff = staff_df[staff_df['On Duty'] == True]['Name'].tolist()
+            on_duty_staff_str = "\n".join(on_duty_staff)
+        self.duty_staff_label.setText(on_duty_staff_str)
+
     def show_main_page(self):
         self.central_widget.show()
 
     def show_holiday_manager(self):
+        if self.holiday_manager is None:
+            def factory():
+                from holiday_manager import HolidayManager
+                return HolidayManager(self)
+            self.holiday_manager = self.build_dialog('holiday_manager', factory)
         self.holiday_manager.show()
 
     def show_staff_manager(self):
-        from staff_manager import StaffManager
-        staff_manager = StaffManager(self)
-        staff_manager.exec_()
+        # 창은 하나만 만들어 다시 쓴다 (열 때마다 만들면 닫힌 창들도 staff_changed를 계속 받는다)
+        if self.staff_manager is None:
+            def factory():
+                from staff_manager import StaffManager
+                return StaffManager(self)
+            self.staff_manager = self.build_dialog('staff_manager', factory)
+        self.staff_manager.exec_()
 
     def show_duty_scheduler(self):
+        if self.duty_scheduler is None:
+            def factory():
+                from duty_scheduler import DutyScheduler
+                return DutyScheduler(self)
+            self.duty_scheduler = self.build_dialog('duty_scheduler', factory)
+            self.duty_scheduler.statistics_changed.connect(self.update_duty_statistics_label)
         self.duty_scheduler.show()
 
+    def show_debug_panel(self):
+        from debug_panel import DebugPanel
+        if getattr(self, 'debug_panel', None) is None:
+            self.debug_panel = DebugPanel(self)
+        self.debug_panel.update_summary()
+        self.debug_panel.show()
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     main_window = MainWindow()
@@ -0,0 +1,277 @@
+import copy
+import datetime
+import json
+import os
+from bisect import bisect_left, bisect_right
+import numpy as np
+import pandas as pd
+from schedule_engine import to_ordinals, format_duty_date, NO_DUTY_DAY
+
+# 당번 규칙 파일. 없으면 기본 규칙(최소 간격, 하루 2명, 휴가 제외)만 쓴다
+#   {"rules": [{"rule": "mixed_gender"},
+#              {"rule": "monthly_cap", "max": 4},
+#              {"rule": "no_consecutive_weekday", "weekday": "금"},
+#              {"rule": "never_pair", "names": ["김철수", "이영희"]}]}
+RULES_FILE = 'rules.json'
+WEEKDAY_NAMES = ['월', '화', '수', '목', '금', '토', '일']
+
+RULE_LABELS = {
+    'mixed_gender': '남녀 짝',
+    'monthly_cap': '월 당번 상한',
+    'no_consecutive_weekday': '같은 요일 연속 금지',
+    'never_pair': '함께 배정 금지',
+}
+
+
+def _weekday(value):
+    if isinstance(value, int) and 0 <= value < 7:
+        return value
+    if value in WEEKDAY_NAMES:
+        return WEEKDAY_NAMES.index(value)
+    raise ValueError(f"요일은 0~6 또는 {', '.join(WEEKDAY_NAMES)} 중 하나여야 합니다: {value}")
+
+
+def _check_rule(rule):
+    if not isinstance(rule, dict) or rule.get('rule') not in RULE_LABELS:
+        raise ValueError(f"알 수 없는 규칙입니다: {rule}")
+    kind = rule['rule']
+    if kind == 'monthly_cap':
+        if not isinstance(rule.get('max'), int) or rule['max'] < 1:
+            raise ValueError("monthly_cap 규칙에는 1 이상의 정수 max가 필요합니다.")
+    elif kind == 'no_consecutive_weekday':
+        rule = dict(rule, weekday=_weekday(rule.get('weekday', 4)))
+    elif kind == 'never_pair':
+        names = rule.get('names')
+        if not isinstance(names, list) or len(names) < 2:
+            raise ValueError("never_pair 규칙에는 이름이 두 개 이상인 names 목록이 필요합니다.")
+    return rule
+
+
+def _month_range(ordinal):
+    # ordinal이 속한 달의 첫날, 마지막 날 서수
+    date = datetime.date.fromordinal(int(ordinal))
+    first = date.replace(day=1)
+    return first.toordinal(), (first + datetime.timedelta(days=32)).replace(day=1).toordinal() - 1
+
+
+# 파일에서 읽은 선언적 규칙 목록. 직원 표가 정해지면 compile()로 배열 검사기를 만든다
+class RuleSet:
+    def __init__(self, rules=()):
+        self.rules = [_check_rule(rule) for rule in rules]
+        # 생성 전 당번 기록 (이름 배열, 서수 배열). 월 상한과 같은 요일 연속을 앞 기간에서 잇는다
+        self.history = None
+
+    def with_history(self, names, ordinals):
+        history = copy.copy(self)
+        history.history = (np.asarray(names, dtype=object), np.asarray(ordinals, dtype=np.int64))
+        return history
+
+    def __len__(self):
+        return len(self.rules)
+
+    def describe(self):
+        return [RULE_LABELS[rule['rule']] for rule in self.rules]
+
+    def compile(self, staff_df):
+        # 직원 표의 Last Duty Day와 with_history로 받은 기록을 생성 전 당번으로 넘긴다
+        names = staff_df['Name'].to_numpy(dtype=object)
+        staff = np.arange(len(names), dtype=np.int64)
+        if 'Last Duty Day' in staff_df.columns:
+            ordinals = to_ordinals(staff_df['Last Duty Day'])
+        else:
+            ordinals = np.full(len(names), NO_DUTY_DAY.toordinal(), dtype=np.int64)
+        if self.history is not None:
+            index = {name: i for i, name in enumerate(names)}
+            codes = pd.Series(self.history[0], dtype=object).map(index).fillna(-1).to_numpy(dtype=np.int64)
+            staff = np.concatenate([staff, codes[codes >= 0]])
+            ordinals = np.concatenate([ordinals, self.history[1][codes >= 0]])
+        genders = staff_df['Gender'].to_numpy(dtype=object) if 'Gender' in staff_df.columns else None
+        return CompiledRules(self, names, genders, history=(staff, ordinals))
+
+
+def load_rules(path=RULES_FILE):
+    # 파일이 없으면 빈 규칙. 형식이 틀리면 ValueError
+    if not os.path.exists(path):
+        return RuleSet()
+    with open(path, encoding='utf-8') as f:
+        try:
+            data = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: {e}")
+    return RuleSet(data.get('rules', []) if isinstance(data, dict) else data)
+
+
+# 직원 배열 위에서 도는 규칙 검사기.
+# 개인 규칙(월 상한, 같은 요일 연속)은 날짜마다 마스크 하나, 짝 규칙(남녀, 금지 짝)은 첫 당번마다 마스크 하나로 끝난다.
+class CompiledRules:
+    def __init__(self, rule_set, names, genders=None, history=None):
+        # history: 생성 전 당번 (직원 번호 배열, 서수 배열). seed(start)가 start 전의 것만 상태에 넣는다
+        self.names = np.asarray(names, dtype=object)
+        self.size = len(names)
+        index = {name: i for i, name in enumerate(names)}
+        self.mixed_gender = False
+        self.monthly_cap = None
+        self.weekdays = []
+        self.forbidden = {}
+        for rule in rule_set.rules:
+            kind = rule['rule']
+            if kind == 'mixed_gender':
+                self.mixed_gender = True
+            elif kind == 'monthly_cap':
+                self.monthly_cap = rule['max'] if self.monthly_cap is None else min(self.monthly_cap, rule['max'])
+            elif kind == 'no_consecutive_weekday':
+                if rule['weekday'] not in self.weekdays:
+                    self.weekdays.append(rule['weekday'])
+            elif kind == 'never_pair':
+                members = [index[name] for name in rule['names'] if name in index]
+                for staff in members:
+                    self.forbidden.setdefault(staff, set()).update(other for other in members if other != staff)
+        # 성별 코드. 비어 있으면 -1 (누구와도 짝 가능)
+        genders = pd.Series(genders if genders is not None else [None] * self.size, dtype=object)
+        self.gender_codes = pd.factorize(genders.where(genders.notna() & (genders != ''), None))[0].astype(np.int64)
+        self.forbidden = {staff: np.fromiter(others, dtype=np.int64) for staff, others in self.forbidden.items()}
+        empty = np.empty(0, dtype=np.int64)
+        self.history = history if history is not None else (empty, empty)
+        self.start = None
+        self.prior_staff = self.prior_ordinals = empty
+        self.prior = {}
+        self.reset()
+
+    @property
+    def has_pair_rules(self):
+        return self.mixed_gender or bool(self.forbidden)
+
+    def seed(self, start):
+        # start 전 당번을 이어받는다. 기간이 달 중간에서 시작하거나 앞 달 바로 뒤에 이어져도
+        # 그 달의 당번 수와 직전 규칙 요일 당번이 상태와 violation 검사에 들어간다
+        staff, ordinals = self.history
+        keep = (ordinals < start) & (ordinals > NO_DUTY_DAY.toordinal())
+        pairs = np.unique(np.stack([staff[keep], ordinals[keep]], axis=1), axis=0)
+        self.start = int(start)
+        self.prior_staff, self.prior_ordinals = pairs[:, 0], pairs[:, 1]
+        members, offsets = np.unique(self.prior_staff, return_index=True)
+        self.prior = {int(member): dates.tolist() for member, dates in zip(members, np.split(self.prior_ordinals, offsets[1:]))}
+        self.reset()
+
+    def reset(self):
+        # 생성하는 동안 이어지는 상태: 이번 달 당번 수, 규칙 요일의 마지막 당번일 (seed로 받은 앞 기간 당번부터 시작)
+        self.month = None
+        self.month_count = np.zeros(self.size, dtype=np.int64)
+        self.last_on_weekday = {}
+        for weekday in self.weekdays:
+            last = np.full(self.size, NO_DUTY_DAY.toordinal(), dtype=np.int64)
+            hit = (self.prior_ordinals - 1) % 7 == weekday
+            np.maximum.at(last, self.prior_staff[hit], self.prior_ordinals[hit])
+            self.last_on_weekday[weekday] = last
+
+    def copy(self):
+        return copy.deepcopy(self)
+
+    def _enter_month(self, ordinal):
+        date = datetime.date.fromordinal(int(ordinal))
+        if self.month != (date.year, date.month):
+            self.month = (date.year, date.month)
+            self.month_count[:] = 0
+            first, last = _month_range(ordinal)
+            in_month = (self.prior_ordinals >= first) & (self.prior_ordinals <= last)
+            np.add.at(self.month_count, self.prior_staff[in_month], 1)
+
+    def day_mask(self, ordinal):
+        # 이 날짜에 개인 규칙으로 배정할 수 없는 직원을 뺀 마스크
+        mask = np.ones(self.size, dtype=bool)
+        if self.monthly_cap is not None:
+            self._enter_month(ordinal)
+            mask &= self.month_count < self.monthly_cap
+        weekday = (int(ordinal) - 1) % 7
+        if weekday in self.last_on_weekday:
+            mask &= self.last_on_weekday[weekday] != ordinal - 7
+        return mask
+
+    def pair_mask(self, first):
+        # first와 같은 날 배정할 수 있는 직원
+        mask = np.ones(self.size, dtype=bool)
+        mask[first] = False
+        if self.mixed_gender and self.gender_codes[first] >= 0:
+            mask &= self.gender_codes != self.gender_codes[first]
+        forbidden = self.forbidden.get(first)
+        if forbidden is not None:
+            mask[forbidden] = False
+        return mask
+
+    def first_pair(self, ordered):
+        # 선호 순서로 놓인 후보에서 짝 규칙을 만족하는 첫 두 명. 없으면 None
+        ordered = np.asarray(ordered, dtype=np.int64)
+        if len(ordered) < 2:
+            return None
+        if not self.has_pair_rules:
+            return ordered[:2]
+        codes = self.gender_codes[ordered]
+        if self.mixed_gender and not (codes < 0).any() and len(np.unique(codes)) < 2:
+            return None
+        for i, first in enumerate(ordered[:-1]):
+            partners = np.flatnonzero(self.pair_mask(first)[ordered[i + 1:]])
+            if len(partners):
+                return np.array([first, ordered[i + 1 + partners[0]]])
+        return None
+
+    def assign(self, ordinal, picked):
+        if self.monthly_cap is not None:
+            self._enter_month(ordinal)
+            self.month_count[picked] += 1
+        weekday = (int(ordinal) - 1) % 7
+        if weekday in self.last_on_weekday:
+            self.last_on_weekday[weekday][picked] = ordinal
+
+    def replay(self, ordinals, slots):
+        # 배정이 바뀐 뒤(지역 탐색 등) 상태를 다시 계산
+        for ordinal, picked in zip(ordinals, slots):
+            self.assign(ordinal, picked)
+
+    def violation(self, staff, ordinal, partner=None, dates=(), assigned=False):
+        # staff를 ordinal에 partner와 함께 넣을 때 어기는 규칙 이름 (없으면 None).
+        # dates: staff의 다른 당번일(정렬된 서수 목록). 상태 배열 대신 이것으로 검사하므로 수정/지역 탐색에서도 쓸 수 있다.
+        # seed로 받은 앞 기간 당번도 함께 본다.
+        # assigned: ordinal이 이미 staff의 당번인 자리를 검사할 때. 월 상한은 그 달 앞쪽 당번이 상한을 채운 뒤의 자리만 위반이다
+        if partner is not None and partner >= 0 and not self.pair_mask(partner)[staff]:
+            return 'never_pair' if partner in self.forbidden and staff in self.forbidden[partner] else 'mixed_gender'
+        prior = self.prior.get(staff, ())
+        if self.monthly_cap is not None:
+            first, last = _month_range(ordinal)
+            count = (bisect_left(dates, ordinal) if assigned else bisect_right(dates, last)) - bisect_left(dates, first)
+            count += bisect_right(prior, last) - bisect_left(prior, first)
+            if count >= self.monthly_cap:
+                return 'monthly_cap'
+        if (int(ordinal) - 1) % 7 in self.last_on_weekday:
+            for other in (ordinal - 7, ordinal + 7):
+                for known in (dates, prior):
+                    i = bisect_left(known, other)
+                    if i < len(known) and known[i] == other:
+                        return 'no_consecutive_weekday'
+        return None
+
+    def violations(self, duty_df):
+        # 저장된 일정 검사: [(날짜 문자열, 이름, 규칙 이름)]
+        index = {name: i for i, name in enumerate(self.names)}
+        ordinals = to_ordinals(duty_df['Date'])
+        if self.start is None and len(ordinals):
+            self.seed(int(ordinals.min()))
+        slots = [duty_df[column].map(index).fillna(-1).to_numpy(dtype=np.int64) for column in ('Employee 1', 'Employee 2')]
+        dates = {}
+        for column in slots:
+            for staff, ordinal in zip(column, ordinals):
+                if staff >= 0:
+                    dates.setdefault(staff, []).append(int(ordinal))
+        for items in dates.values():
+            items.sort()
+        found = []
+        for side, column in enumerate(slots):
+            partners = slots[1 - side]
+            for staff, partner, ordinal in zip(column, partners, ordinals):
+                if staff < 0:
+                    continue
+                others = dates[staff][:]
+                others.remove(int(ordinal))
+                rule = self.violation(staff, int(ordinal), partner if side == 1 else None, others, assigned=True)
+                if rule is not None:
+                    found.append((format_duty_date(ordinal), self.names[staff], RULE_LABELS[rule]))
+        return sorted(found)
@@ -0,0 +1,53 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from schedule_engine import ScheduleEngine
+from vacation_matrix import VacationMatrix
+from workday_calendar import WorkdayCalendar
+from fairness import fairness_metrics
+
+# 점수가 낮을수록 좋은 일정. 횟수 편차 > 표준편차 > 요일 쏠림 > 최소 간격 순으로 중요
+SCORE_WEIGHTS = {'count_spread': 100.0, 'count_std': 10.0, 'weekday_imbalance': 1.0, 'min_gap': -1.0}
+
+# 작업 프로세스마다 한 번만 만들어 두는 입력 데이터
+_worker_inputs = None
+
+
+def score_metrics(metrics):
+    return sum(weight * (metrics[key] or 0) for key, weight in SCORE_WEIGHTS.items())
+
+
+def _init_worker(staff_df, vacation_df, holiday_dates, start, end, rules=None):
+    global _worker_inputs
+    workday_calendar = WorkdayCalendar()
+    workday_calendar.set_holidays(holiday_dates)
+    ordinals = workday_calendar.workday_ordinals(start, end)
+    names = staff_df['Name'].to_numpy(dtype=object)
+    vacations = VacationMatrix.from_dataframe(vacation_df, names, ordinals[0], ordinals[-1]) if len(ordinals) else None
+    _worker_inputs = (staff_df, ordinals, vacations, rules)
+
+
+def _run_candidate(seed):
+    staff_df, ordinals, vacations, rules = _worker_inputs
+    engine = ScheduleEngine.from_staff_df(staff_df, seed=seed, rules=rules)
+    duty_df = pd.DataFrame(engine.generate(ordinals, vacations), columns=['Date', 'Employee 1', 'Employee 2'])
+    metrics = fairness_metrics(duty_df, staff_df.loc[engine.on_duty, 'Name'])
+    return seed, duty_df, engine.duty_count, engine.last_duty, metrics
+
+
+def run_scenarios(staff_df, vacation_df, holiday_dates, start, end, seeds, max_workers=None, rules=None):
+    # 같은 seed 목록이면 항상 같은 결과: 후보는 seed로만 결정되고 동점은 작은 seed가 이긴다
+    seeds = list(seeds)
+    init_args = (staff_df, vacation_df, list(holiday_dates), start, end, rules)
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(), initializer=_init_worker, initargs=init_args) as pool:
+        results = list(pool.map(_run_candidate, seeds))
+
+    summary = pd.DataFrame([dict(seed=seed, score=score_metrics(metrics), **metrics) for seed, _, _, _, metrics in results])
+    summary = summary.sort_values(['score', 'seed'], kind='stable').reset_index(drop=True)
+    best_seed = int(summary.loc[0, 'seed'])
+    _, duty_df, duty_count, last_duty, _ = results[seeds.index(best_seed)]
+
+    best_engine = ScheduleEngine.from_staff_df(staff_df)
+    best_engine.duty_count[:] = duty_count
+    best_engine.last_duty[:] = last_duty
+    return {'seed': best_seed, 'duty_df': duty_df, 'staff_df': best_engine.apply_to(staff_df.copy()), 'summary': summary}
@@ -0,0 +1,158 @@
+import datetime
+import numpy as np
+import pandas as pd
+from instrumentation import span
+
+# 당번 규칙 기본값
+MIN_GAP_DAYS = 3
+STAFF_PER_DAY = 2
+NO_DUTY_DAY = datetime.date(1900, 1, 1)
+
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+DATE_FORMAT = "%Y-%m-%d (%a)"
+
+
+class GenerationCancelled(Exception):
+    # 생성 중 취소 요청을 받았을 때 (배정기가 단계 사이에서 확인한다)
+    pass
+
+
+def to_ordinals(values, default=NO_DUTY_DAY):
+    # Timestamp, datetime.date, "YYYY-MM-DD (Mon)" 문자열을 모두 날짜 서수(ordinal)로 변환
+    text = pd.Series(values, dtype=object).astype(str).str.slice(0, 10)
+    dates = pd.to_datetime(text, format="%Y-%m-%d", errors='coerce').fillna(pd.Timestamp(default))
+    return dates.to_numpy(dtype='datetime64[D]').astype(np.int64) + EPOCH_ORDINAL
+
+
+def to_ordinal(date):
+    if isinstance(date, (int, np.integer)):
+        return int(date)
+    if isinstance(date, datetime.datetime):
+        return date.date().toordinal()
+    if isinstance(date, datetime.date):
+        return date.toordinal()
+    return int(to_ordinals([date])[0])
+
+
+def ordinals_to_datetimes(ordinals):
+    days = np.asarray(ordinals, dtype=np.int64) - EPOCH_ORDINAL
+    return pd.to_datetime(days.astype('datetime64[D]'))
+
+
+def iter_months(start, end):
+    # start~end(서수) 범위를 월 단위로 잘라 (연, 월, 첫 서수, 마지막 서수)로 돌려준다
+    current = datetime.date.fromordinal(int(start)).replace(day=1)
+    while current.toordinal() <= end:
+        next_month = (current + datetime.timedelta(days=32)).replace(day=1)
+        yield current.year, current.month, max(current.toordinal(), int(start)), min(next_month.toordinal() - 1, int(end))
+        current = next_month
+
+
+def format_duty_date(ordinal):
+    return datetime.date.fromordinal(int(ordinal)).strftime(DATE_FORMAT)
+
+
+# Qt 없이 동작하는 당번 배정 엔진. 직원 상태를 NumPy 배열로 관리한다.
+class ScheduleEngine:
+    def __init__(self, names, on_duty, last_duty, duty_count, min_gap=MIN_GAP_DAYS, seed=None, rules=None):
+        # rules: rule_engine.CompiledRules (추가 규칙 검사기) 또는 None
+        self.names = np.array(names, dtype=object)
+        self.on_duty = np.array(on_duty, dtype=bool)
+        self.last_duty = np.array(last_duty, dtype=np.int64)
+        self.duty_count = np.array(duty_count, dtype=np.int64)
+        self.min_gap = min_gap
+        self.rng = np.random.default_rng(seed)
+        self.rules = rules
+
+    @classmethod
+    def from_staff_df(cls, staff_df, rules=None, **kwargs):
+        # rules: rule_engine.RuleSet. 이 직원 표에 맞춰 컴파일한다
+        if 'Duty Count' in staff_df.columns:
+            duty_count = pd.to_numeric(staff_df['Duty Count'], errors='coerce').fillna(0).to_numpy(dtype=np.int64)
+        else:
+            duty_count = np.zeros(len(staff_df), dtype=np.int64)
+        return cls(
+            staff_df['Name'].to_numpy(dtype=object),
+            staff_df['On Duty'].fillna(False).astype(bool).to_numpy(),
+            to_ordinals(staff_df['Last Duty Day']),
+            duty_count,
+            rules=rules.compile(staff_df) if rules else None,
+            **kwargs
+        )
+
+    @property
+    def size(self):
+        return len(self.names)
+
+    def apply_to(self, staff_df):
+        # 엔진 상태를 staff_df의 Duty Count / Last Duty Day 열에 반영
+        staff_df['Duty Count'] = self.duty_count
+        staff_df['Last Duty Day'] = ordinals_to_datetimes(self.last_duty)
+        return staff_df
+
+    def base_mask(self, ordinal, off_mask=None):
+        # 휴가 중인 직원과 개인 규칙(월 상한 등)에 걸리는 직원 제외
+        base = self.on_duty if off_mask is None else self.on_duty & ~off_mask
+        if self.rules is not None:
+            base = base & self.rules.day_mask(ordinal)
+        return base
+
+    def available_mask(self, ordinal, off_mask=None, last_duty=None):
+        if last_duty is None:
+            last_duty = self.last_duty
+        base = self.base_mask(ordinal, off_mask)
+        mask = base & ((ordinal - last_duty) > self.min_gap)
+        if np.count_nonzero(mask) < STAFF_PER_DAY:
+            return base.copy()
+        return mask
+
+    def pick(self, ordinal, off_mask=None):
+        candidates = np.flatnonzero(self.available_mask(ordinal, off_mask))
+        if len(candidates) < STAFF_PER_DAY:
+            raise ValueError(f"{format_duty_date(ordinal)}: 당번 가능한 직원이 {STAFF_PER_DAY}명보다 적습니다.")
+        if self.rules is None:
+            picked = self.rng.choice(candidates, size=STAFF_PER_DAY, replace=False)
+        else:
+            picked = self.rules.first_pair(self.rng.permutation(candidates))
+            if picked is None:
+                # 최소 간격을 풀어서 한 번 더 찾는다
+                picked = self.rules.first_pair(self.rng.permutation(np.flatnonzero(self.base_mask(ordinal, off_mask))))
+            if picked is None:
+                raise ValueError(f"{format_duty_date(ordinal)}: 규칙을 모두 만족하는 당번 짝이 없습니다.")
+        self.assign(ordinal, picked)
+        return picked
+
+    def assign(self, ordinal, picked):
+        self.duty_count[picked] += 1
+        self.last_duty[picked] = ordinal
+        if self.rules is not None:
+            self.rules.assign(ordinal, picked)
+
+    def generate(self, ordinals, vacations=None, solver=None, cancel=None, progress=None):
+        # vacations: VacationMatrix (휴가 비트맵) 또는 None
+        # solver: FairScheduleSolver 등 solve(engine, ordinals, vacations)를 가진 배정기. 없으면 무작위 추첨
+        # cancel/progress: 배정기에 넘기는 취소 플래그(threading.Event)와 진행 콜백 progress(done, total, 설명)
+        if self.rules is not None and self.rules.start is None and len(ordinals):
+            # 처음 생성하는 날 전의 당번(마지막 당번일, 기록)으로 규칙 상태를 잇는다
+            self.rules.seed(int(ordinals[0]))
+        if solver is not None:
+            return solver.solve(self, ordinals, vacations, cancel=cancel, progress=progress)
+        rows = []
+        for ordinal in ordinals:
+            off_mask = vacations.off_mask(ordinal) if vacations is not None else None
+            picked = self.pick(ordinal, off_mask)
+            rows.append({'Date': format_duty_date(ordinal), 'Employee 1': self.names[picked[0]], 'Employee 2': self.names[picked[1]]})
+        return rows
+
+    def generate_months(self, workday_calendar, start, end, vacations=None, solver=None, cancel=None, progress=None):
+        # 여러 달/여러 해를 한 번에 생성. 당번 횟수와 마지막 당번일은 엔진 안에서 이어진다
+        if solver is not None:
+            # 최적화는 전체 기간을 한 번에 풀고 결과만 월별로 나눠 보낸다. 푸는 동안의 진행/취소는 cancel, progress로
+            rows = iter(self.generate(workday_calendar.workday_ordinals(start, end), vacations, solver, cancel, progress))
+            for year, month, first, last in iter_months(start, end):
+                yield year, month, [next(rows) for _ in range(workday_calendar.count_workdays(first, last))]
+            return
+        for year, month, first, last in iter_months(start, end):
+            with span('generate month', 'engine', year=year, month=month):
+                rows = self.generate(workday_calendar.workday_ordinals(first, last), vacations)
+            yield year, month, rows
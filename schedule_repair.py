@@ -0,0 +1,227 @@
+from bisect import bisect_left, bisect_right, insort
+import numpy as np
+import pandas as pd
+from schedule_engine import ScheduleEngine, to_ordinal, to_ordinals, ordinals_to_datetimes, format_duty_date, STAFF_PER_DAY, NO_DUTY_DAY
+from vacation_matrix import VacationDays, vacation_intervals
+
+SLOT_COLUMNS = ['Employee 1', 'Employee 2']
+
+
+# 기존 duty_df에서 무효가 된 날짜/자리만 찾아 다시 배정한다.
+# 날짜 → 행, 이름 → 당번일 색인을 한 번 만들어 두므로 수정 비용은 영향받는 날짜 수에 비례한다.
+class ScheduleRepairer:
+    def __init__(self, duty_df, staff_df, vacation_df, workday_calendar, seed=None, rules=None, generation_staff=None):
+        # rules: rule_engine.RuleSet. 다시 배정하는 자리도 추가 규칙을 지키게 한다
+        # generation_staff: 일정을 만들 때 넣은 직원 표. 그 Last Duty Day를 일정 이전의 마지막 당번일로 쓴다
+        self.duty_df = duty_df.reset_index(drop=True)
+        self.workday_calendar = workday_calendar
+        self.engine = ScheduleEngine.from_staff_df(staff_df, seed=seed, rules=rules)
+        self.staff_index = {name: i for i, name in enumerate(self.engine.names)}
+        self.set_vacations(vacation_df)
+
+        ordinals = to_ordinals(self.duty_df['Date'])
+        self.first_ordinal = int(ordinals.min()) if len(ordinals) else NO_DUTY_DAY.toordinal()
+        self.last_ordinal = int(ordinals.max()) if len(ordinals) else NO_DUTY_DAY.toordinal()
+        self.rows = {int(ordinal): row for row, ordinal in enumerate(ordinals)}
+        self.duties = {}
+        for column in SLOT_COLUMNS:
+            for name, ordinal in zip(self.duty_df[column], ordinals):
+                self.duties.setdefault(name, []).append(int(ordinal))
+        for dates in self.duties.values():
+            dates.sort()
+
+        # 일정 이전의 마지막 당번일 (일정 안의 당번은 색인에서 다시 계산).
+        # 생성 입력이 없으면 staff_df 값 중 일정 시작 전 것만 믿는다 (생성 뒤 값이면 그 전 당번일은 알 수 없다)
+        no_duty = NO_DUTY_DAY.toordinal()
+        if generation_staff is not None:
+            before = pd.Series(to_ordinals(generation_staff['Last Duty Day']), index=generation_staff['Name'].to_numpy(dtype=object))
+            before = before[~before.index.duplicated(keep='last')]
+            self.base_last_duty = before.reindex(self.engine.names).fillna(no_duty).to_numpy(dtype=np.int64)
+        else:
+            self.base_last_duty = np.where(self.engine.last_duty < self.first_ordinal, self.engine.last_duty, no_duty)
+        if self.engine.rules is not None:
+            self.engine.rules.seed(self.first_ordinal)
+
+    def set_vacations(self, vacation_df):
+        self.vacation_df = vacation_df
+        self.vacations = vacation_intervals(vacation_df, self.engine.names)
+
+    def update_staff(self, staff_df):
+        # 당번 여부/직원 목록이 바뀐 경우. 새로 추가된 직원은 엔진 배열 끝에 붙인다
+        on_duty = dict(zip(staff_df['Name'], staff_df['On Duty'].fillna(False).astype(bool)))
+        new_names = [name for name in on_duty if name not in self.staff_index]
+        if new_names:
+            for name in new_names:
+                self.staff_index[name] = len(self.staff_index)
+            grow = len(new_names)
+            self.engine.names = np.concatenate([self.engine.names, np.array(new_names, dtype=object)])
+            self.engine.on_duty = np.concatenate([self.engine.on_duty, np.zeros(grow, dtype=bool)])
+            self.engine.last_duty = np.concatenate([self.engine.last_duty, np.full(grow, NO_DUTY_DAY.toordinal())])
+            self.engine.duty_count = np.concatenate([self.engine.duty_count, np.zeros(grow, dtype=np.int64)])
+            self.base_last_duty = np.concatenate([self.base_last_duty, np.full(grow, NO_DUTY_DAY.toordinal())])
+            self.vacations = vacation_intervals(self.vacation_df, self.engine.names)
+        self.engine.on_duty[:] = [on_duty.get(name, False) for name in self.engine.names]
+
+    def days_of(self, names, start=None, end=None):
+        # 이름별 당번일 중 [start, end]에 드는 날짜
+        days = set()
+        for name in names:
+            dates = self.duties.get(name, [])
+            lo = 0 if start is None else bisect_left(dates, start)
+            hi = len(dates) if end is None else bisect_right(dates, end)
+            days.update(dates[lo:hi])
+        return days
+
+    def days_for_vacations(self, changed_vacation_df):
+        days = set()
+        for name, start, end in zip(changed_vacation_df['Name'],
+                                    to_ordinals(changed_vacation_df['Start Date']),
+                                    to_ordinals(changed_vacation_df['End Date'])):
+            days |= self.days_of([name], int(start), int(end))
+        return days
+
+    def _vacation_days(self, days):
+        # 고칠 날짜만의 휴가 마스크 (일정 처음~끝 비트맵을 만들지 않는다)
+        staff, start, end = self.vacations
+        return VacationDays(self.engine.names, staff, start, end, days)
+
+    def invalid_slots(self, days):
+        # (날짜, 열 이름) 목록. 근무일이 아닌 날짜는 열 이름 None
+        days = sorted(day for day in days if day in self.rows)
+        if not days:
+            return []
+        vacations = self._vacation_days(days)
+        invalid = []
+        for ordinal in days:
+            if not self.workday_calendar.is_workday(ordinal):
+                invalid.append((ordinal, None))
+                continue
+            row = self.rows[ordinal]
+            for side, column in enumerate(SLOT_COLUMNS):
+                staff = self.staff_index.get(self.duty_df.at[row, column])
+                if staff is None or not self.engine.on_duty[staff] or vacations.is_off(staff, ordinal):
+                    invalid.append((ordinal, column))
+                elif self.engine.rules is not None:
+                    # 짝 규칙은 두 번째 자리에서만 본다 (한 자리만 바꾸면 된다)
+                    partner = self.staff_index.get(self.duty_df.at[row, SLOT_COLUMNS[0]]) if side == 1 else None
+                    dates = [day for day in self.duties.get(self.engine.names[staff], []) if day != ordinal]
+                    if self.engine.rules.violation(staff, ordinal, partner, dates, assigned=True) is not None:
+                        invalid.append((ordinal, column))
+        return invalid
+
+    def validate(self):
+        return self.invalid_slots(self.rows.keys())
+
+    def _fits_gap(self, name, ordinal):
+        dates = self.duties.get(name, [])
+        i = bisect_left(dates, ordinal)
+        if i > 0 and ordinal - dates[i - 1] <= self.engine.min_gap:
+            return False
+        return not (i < len(dates) and dates[i] - ordinal <= self.engine.min_gap)
+
+    def _fits_rules(self, staff, ordinal, partner):
+        rules = self.engine.rules
+        return rules is None or rules.violation(staff, ordinal, partner, self.duties.get(self.engine.names[staff], [])) is None
+
+    def _pick(self, ordinal, vacations, exclude, partner=None):
+        # partner: 같은 날 남아 있는 당번 (짝 규칙 검사용)
+        mask = self.engine.on_duty & ~vacations.off_mask(ordinal)
+        mask[exclude] = False
+        if self.engine.rules is not None and partner is not None:
+            mask &= self.engine.rules.pair_mask(partner)
+        candidates = np.flatnonzero(mask)
+        if len(candidates) == 0:
+            raise ValueError(f"{format_duty_date(ordinal)}: 대신 배정할 직원이 없습니다.")
+        # 당번 횟수가 적은 순(동률은 무작위)으로 최소 간격과 규칙을 만족하는 첫 직원. 없으면 규칙만이라도 지키는 직원
+        order = candidates[np.lexsort((self.engine.rng.random(len(candidates)), self.engine.duty_count[candidates]))]
+        fallback = None
+        for staff in order:
+            if self._fits_rules(staff, ordinal, partner):
+                if self._fits_gap(self.engine.names[staff], ordinal):
+                    return staff
+                if fallback is None:
+                    fallback = staff
+        return order[0] if fallback is None else fallback
+
+    def _unassign(self, name, ordinal):
+        dates = self.duties.get(name)
+        if dates:
+            dates.pop(bisect_left(dates, ordinal))
+        staff = self.staff_index.get(name)
+        if staff is not None:
+            self.engine.duty_count[staff] = max(self.engine.duty_count[staff] - 1, 0)
+            self._refresh_last_duty(staff)
+
+    def _assign(self, staff, ordinal):
+        name = self.engine.names[staff]
+        insort(self.duties.setdefault(name, []), ordinal)
+        self.engine.duty_count[staff] += 1
+        self._refresh_last_duty(staff)
+        return name
+
+    def _refresh_last_duty(self, staff):
+        dates = self.duties.get(self.engine.names[staff])
+        self.engine.last_duty[staff] = max(dates[-1], self.base_last_duty[staff]) if dates else self.base_last_duty[staff]
+
+    def repair(self, changed_vacations=None, changed_names=(), changed_holidays=()):
+        # changed_vacations: 새로 추가/변경된 휴가 행, changed_names: 당번 여부가 바뀌거나 삭제된 직원,
+        # changed_holidays: 추가/삭제된 공휴일 날짜
+        # 바뀐 전체 휴가/직원 목록은 set_vacations / update_staff로 먼저 넘겨 둔다
+        days = self.days_of(changed_names)
+        if changed_vacations is not None and len(changed_vacations):
+            days |= self.days_for_vacations(changed_vacations)
+        holiday_days = set(to_ordinal(date) for date in changed_holidays)
+        days |= holiday_days & self.rows.keys()
+
+        report = {'reassigned': [], 'removed': [], 'added': []}
+        invalid = self.invalid_slots(days)
+        # 공휴일이 풀려 새로 근무일이 된 날짜 (일정 범위 안)
+        added_days = sorted(day for day in holiday_days - self.rows.keys()
+                            if self.first_ordinal <= day <= self.last_ordinal and self.workday_calendar.is_workday(day))
+        if not invalid and not added_days:
+            return report
+        vacations = self._vacation_days([day for day, _ in invalid] + added_days)
+
+        dropped_rows = []
+        for ordinal, column in invalid:
+            row = self.rows[ordinal]
+            if column is None:
+                for slot in SLOT_COLUMNS:
+                    self._unassign(self.duty_df.at[row, slot], ordinal)
+                del self.rows[ordinal]
+                dropped_rows.append(row)
+                report['removed'].append(format_duty_date(ordinal))
+                continue
+            old_name = self.duty_df.at[row, column]
+            self._unassign(old_name, ordinal)
+            exclude = [self.staff_index[self.duty_df.at[row, slot]] for slot in SLOT_COLUMNS
+                       if self.duty_df.at[row, slot] in self.staff_index]
+            partner = self.staff_index.get(self.duty_df.at[row, SLOT_COLUMNS[1 - SLOT_COLUMNS.index(column)]])
+            new_name = self._assign(self._pick(ordinal, vacations, exclude, partner), ordinal)
+            self.duty_df.at[row, column] = new_name
+            report['reassigned'].append((format_duty_date(ordinal), column, old_name, new_name))
+
+        new_rows = []
+        for ordinal in added_days:
+            picked = []
+            for _ in range(STAFF_PER_DAY):
+                picked.append(self._pick(ordinal, vacations, picked, picked[0] if picked else None))
+                self._assign(picked[-1], ordinal)
+            new_rows.append({'Date': format_duty_date(ordinal), 'Employee 1': self.engine.names[picked[0]], 'Employee 2': self.engine.names[picked[1]]})
+            report['added'].append(format_duty_date(ordinal))
+
+        if dropped_rows or new_rows:
+            # 행 구성이 바뀌었을 때만 날짜 색인을 다시 만든다
+            self.duty_df = pd.concat([self.duty_df.drop(index=dropped_rows), pd.DataFrame(new_rows)], ignore_index=True)
+            ordinals = to_ordinals(self.duty_df['Date'])
+            order = np.argsort(ordinals, kind='stable')
+            self.duty_df = self.duty_df.iloc[order].reset_index(drop=True)
+            self.rows = {int(ordinal): row for row, ordinal in enumerate(ordinals[order])}
+        return report
+
+    def apply_to(self, staff_df):
+        # 엔진 상태(당번 횟수/마지막 당번일)를 직원 표에 반영
+        positions = staff_df['Name'].map(self.staff_index).to_numpy(dtype=np.int64)
+        staff_df['Duty Count'] = self.engine.duty_count[positions]
+        staff_df['Last Duty Day'] = ordinals_to_datetimes(self.engine.last_duty[positions])
+        return staff_df
@@ -0,0 +1,212 @@
+import time
+from bisect import bisect_left, insort
+import numpy as np
+from schedule_engine import STAFF_PER_DAY, EPOCH_ORDINAL, format_duty_date, GenerationCancelled
+from instrumentation import traced
+
+DEFAULT_TIME_BUDGET = 2.0
+MAX_STALE_BATCHES = 200
+# 탐욕 배정에서 취소 확인/진행 보고 간격(일)과 지역 탐색의 진행 보고 간격(초)
+CHECK_EVERY_DAYS = 64
+PROGRESS_INTERVAL = 0.1
+
+
+# 무작위 추첨 대신 당번 횟수 분산을 줄이고 당번 간격을 넓히는 배정기.
+# 1단계: 날짜마다 (횟수가 적고, 쉰 기간이 긴) 직원 순으로 탐욕 배정
+# 2단계: 제한 시간 동안 옮기기/맞바꾸기 지역 탐색으로 목적 함수를 낮춘다
+class FairScheduleSolver:
+    def __init__(self, time_budget=DEFAULT_TIME_BUDGET, count_weight=1.0, spacing_weight=1.0, seed=None):
+        self.time_budget = time_budget
+        self.count_weight = count_weight
+        self.spacing_weight = spacing_weight
+        self.rng = np.random.default_rng(seed)
+
+    @traced('solver.solve', 'engine')
+    def solve(self, engine, ordinals, vacations=None, cancel=None, progress=None):
+        # cancel: is_set()이 참이 되면 다음 확인 지점에서 GenerationCancelled (엔진 상태는 바꾸지 않은 채)
+        # progress(done, total, 설명): 탐욕 배정은 날짜 수, 지역 탐색은 제한 시간(ms) 중 지난 시간 기준
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        if len(ordinals) == 0:
+            return []
+        # 규칙 상태는 탐욕 배정이 바꿔 놓으므로, 생성 전 상태에 최종 배정을 다시 반영한다
+        deadline = time.perf_counter() + self.time_budget
+        rules = engine.rules.copy() if engine.rules is not None else None
+        try:
+            slots = self._greedy(engine, ordinals, vacations, cancel, progress)
+            self._local_search(engine, ordinals, slots, vacations, deadline, cancel, progress)
+        except GenerationCancelled:
+            if rules is not None:
+                engine.rules = rules
+            raise
+        if rules is not None:
+            rules.replay(ordinals, slots)
+            engine.rules = rules
+
+        # 엔진 상태 반영
+        added = np.bincount(slots.ravel(), minlength=engine.size)
+        engine.duty_count += added
+        last = np.full(engine.size, np.iinfo(np.int64).min)
+        np.maximum.at(last, slots.ravel(), np.repeat(ordinals, STAFF_PER_DAY))
+        engine.last_duty = np.maximum(engine.last_duty, last)
+
+        return [{'Date': format_duty_date(ordinal), 'Employee 1': engine.names[pair[0]], 'Employee 2': engine.names[pair[1]]}
+                for ordinal, pair in zip(ordinals, slots)]
+
+    def _greedy(self, engine, ordinals, vacations, cancel=None, progress=None):
+        rules = engine.rules
+        count = engine.duty_count.copy()
+        last = engine.last_duty.copy()
+        slots = np.empty((len(ordinals), STAFF_PER_DAY), dtype=np.int64)
+        for day, ordinal in enumerate(ordinals):
+            if day % CHECK_EVERY_DAYS == 0:
+                if cancel is not None and cancel.is_set():
+                    raise GenerationCancelled()
+                if progress is not None:
+                    progress(day, len(ordinals), "탐욕 배정")
+            off_mask = vacations.off_mask(ordinal) if vacations is not None else None
+            candidates = np.flatnonzero(engine.available_mask(ordinal, off_mask, last))
+            if len(candidates) < STAFF_PER_DAY:
+                raise ValueError(f"{format_duty_date(ordinal)}: 당번 가능한 직원이 {STAFF_PER_DAY}명보다 적습니다.")
+            # 횟수 오름차순 → 쉰 기간 내림차순 → 무작위
+            order = np.lexsort((self.rng.random(len(candidates)), last[candidates], count[candidates]))
+            if rules is None:
+                picked = candidates[order[:STAFF_PER_DAY]]
+            else:
+                picked = rules.first_pair(candidates[order])
+                if picked is None:
+                    # 최소 간격을 풀어서 한 번 더 찾는다
+                    candidates = np.flatnonzero(engine.base_mask(ordinal, off_mask))
+                    order = np.lexsort((self.rng.random(len(candidates)), last[candidates], count[candidates]))
+                    picked = rules.first_pair(candidates[order])
+                if picked is None:
+                    raise ValueError(f"{format_duty_date(ordinal)}: 규칙을 모두 만족하는 당번 짝이 없습니다.")
+                rules.assign(ordinal, picked)
+            slots[day] = picked
+            count[picked] += 1
+            last[picked] = ordinal
+        return slots
+
+    def _local_search(self, engine, ordinals, slots, vacations, deadline, cancel=None, progress=None):
+        num_days = len(ordinals)
+        pool = np.flatnonzero(engine.on_duty)
+        if len(pool) <= STAFF_PER_DAY:
+            return
+        count = engine.duty_count + np.bincount(slots.ravel(), minlength=engine.size)
+        # 직원별 당번일(정렬된 목록). 이전 기간의 마지막 당번일은 고정점으로 포함
+        duties = [[] for _ in range(engine.size)]
+        for staff in np.flatnonzero(engine.last_duty > EPOCH_ORDINAL):
+            duties[staff].append(int(engine.last_duty[staff]))
+        for day, pair in enumerate(slots):
+            for staff in pair:
+                duties[staff].append(int(ordinals[day]))
+        for staff_duties in duties:
+            staff_duties.sort()
+        # 모두가 고르게 돌아갈 때의 평균 간격을 기준으로 짧은 간격에 벌점을 준다
+        target_gap = max((ordinals[-1] - ordinals[0] + 1) * len(pool) / slots.size, 1.0)
+        spacing = lambda gap: self.spacing_weight * target_gap / gap
+        min_gap = engine.min_gap
+
+        def removal_delta(staff, ordinal):
+            items = duties[staff]
+            i = bisect_left(items, ordinal)
+            prev = items[i - 1] if i > 0 else None
+            nxt = items[i + 1] if i + 1 < len(items) else None
+            delta = 0.0
+            if prev is not None:
+                delta -= spacing(ordinal - prev)
+            if nxt is not None:
+                delta -= spacing(nxt - ordinal)
+            if prev is not None and nxt is not None:
+                delta += spacing(nxt - prev)
+            return delta
+
+        def insertion_delta(staff, ordinal):
+            # 최소 간격 규칙을 어기면 None
+            items = duties[staff]
+            i = bisect_left(items, ordinal)
+            prev = items[i - 1] if i > 0 else None
+            nxt = items[i] if i < len(items) else None
+            if (prev is not None and ordinal - prev <= min_gap) or (nxt is not None and nxt - ordinal <= min_gap):
+                return None
+            delta = 0.0
+            if prev is not None:
+                delta += spacing(ordinal - prev)
+            if nxt is not None:
+                delta += spacing(nxt - ordinal)
+            if prev is not None and nxt is not None:
+                delta -= spacing(nxt - prev)
+            return delta
+
+        def is_free(staff, day):
+            return staff not in slots[day] and (vacations is None or not vacations.is_off(staff, ordinals[day]))
+
+        rules = engine.rules
+
+        def breaks_rules(staff, day, side):
+            # staff를 day의 side 자리에 넣으면 추가 규칙을 어기는지 (duties[staff]에는 그 날이 없어야 한다)
+            return rules is not None and rules.violation(staff, int(ordinals[day]), slots[day, 1 - side], duties[staff]) is not None
+
+        batch = 256
+        stale_batches = 0
+        budget_ms = max(int(self.time_budget * 1000), 1)
+        reported = 0.0
+        # 개선이 한동안 없으면 제한 시간 전에 끝낸다
+        while time.perf_counter() < deadline and stale_batches < MAX_STALE_BATCHES:
+            # 취소와 진행 보고는 묶음(batch) 사이에서만 확인한다
+            if cancel is not None and cancel.is_set():
+                raise GenerationCancelled()
+            now = time.perf_counter()
+            if progress is not None and now - reported >= PROGRESS_INTERVAL:
+                reported = now
+                progress(min(budget_ms - int((deadline - now) * 1000), budget_ms), budget_ms, "지역 탐색")
+            improved = False
+            days = self.rng.integers(num_days, size=batch)
+            sides = self.rng.integers(STAFF_PER_DAY, size=batch)
+            others = pool[self.rng.integers(len(pool), size=batch)]
+            other_days = self.rng.integers(num_days, size=batch)
+            moves = self.rng.random(batch) < 0.5
+            for day, side, other, other_day, move in zip(days, sides, others, other_days, moves):
+                staff = slots[day, side]
+                ordinal = int(ordinals[day])
+                if move:
+                    # staff의 당번 하나를 other에게 넘긴다
+                    if not is_free(other, day) or breaks_rules(other, day, side):
+                        continue
+                    added = insertion_delta(other, ordinal)
+                    if added is None:
+                        continue
+                    delta = added + removal_delta(staff, ordinal) + self.count_weight * 2 * (count[other] - count[staff] + 1)
+                    if delta < -1e-9:
+                        duties[staff].remove(ordinal)
+                        insort(duties[other], ordinal)
+                        slots[day, side] = other
+                        count[staff] -= 1
+                        count[other] += 1
+                        improved = True
+                else:
+                    # 서로 다른 날의 두 배정을 맞바꾼다 (횟수는 그대로, 간격만 변화)
+                    other_side = side
+                    other = slots[other_day, other_side]
+                    other_ordinal = int(ordinals[other_day])
+                    if other == staff or other_day == day or not is_free(other, day) or not is_free(staff, other_day):
+                        continue
+                    delta = removal_delta(staff, ordinal) + removal_delta(other, other_ordinal)
+                    duties[staff].remove(ordinal)
+                    duties[other].remove(other_ordinal)
+                    added_staff = insertion_delta(staff, other_ordinal)
+                    added_other = insertion_delta(other, ordinal)
+                    if breaks_rules(staff, other_day, other_side) or breaks_rules(other, day, side):
+                        added_staff = None
+                    if added_staff is not None and added_other is not None and delta + added_staff + added_other < -1e-9:
+                        insort(duties[staff], other_ordinal)
+                        insort(duties[other], ordinal)
+                        slots[day, side] = other
+                        slots[other_day, other_side] = staff
+                        improved = True
+                    else:
+                        insort(duties[staff], ordinal)
+                        insort(duties[other], other_ordinal)
+                if time.perf_counter() >= deadline:
+                    break
+            stale_batches = 0 if improved else stale_batches + 1
+
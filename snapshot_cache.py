@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+
+SNAPSHOT_SUFFIX = '.npz'
+SNAPSHOT_VERSION = 1
+
+
+def snapshot_path(csv_path):
+    # staff.csv → staff.csv.npz (CSV 옆에 둔다)
+    return csv_path + SNAPSHOT_SUFFIX
+
+
+def _file_key(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _encode(df):
+    arrays = {}
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        key = f'c{i}'
+        if pd.api.types.is_datetime64_dtype(series):
+            kind = 'datetime'
+            arrays[key] = series.to_numpy().view(np.int64)
+        elif pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+            kind = 'numeric'
+            arrays[key] = series.to_numpy()
+        else:
+            kind = 'text'
+            missing = series.isna().to_numpy()
+            arrays[key] = np.where(missing, '', series.astype(object).to_numpy()).astype(str)
+            arrays[key + '_na'] = missing
+        columns.append({'name': name, 'kind': kind, 'dtype': str(series.dtype)})
+    return arrays, columns
+
+
+def _decode(snapshot, columns):
+    data = {}
+    for i, column in enumerate(columns):
+        key = f'c{i}'
+        values = snapshot[key]
+        if column['kind'] == 'datetime':
+            data[column['name']] = pd.to_datetime(values.view(column['dtype']))
+        elif column['kind'] == 'numeric':
+            data[column['name']] = values
+        else:
+            series = pd.Series(values.astype(object))
+            series[snapshot[key + '_na']] = np.nan
+            data[column['name']] = series.astype(column['dtype']) if column['dtype'] != 'object' else series
+    return pd.DataFrame(data, columns=[column['name'] for column in columns])
+
+
+def load_snapshot(csv_path):
+    # CSV의 mtime/크기가 스냅샷에 기록된 값과 같을 때만 사용
+    path = snapshot_path(csv_path)
+    try:
+        with np.load(path, allow_pickle=False) as snapshot:
+            meta = json.loads(str(snapshot['__meta__']))
+            if meta['version'] != SNAPSHOT_VERSION or tuple(meta['source']) != _file_key(csv_path):
+                return None
+            return _decode(snapshot, meta['columns'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def save_snapshot(df, csv_path, source_key):
+    arrays, columns = _encode(df)
+    meta = {'version': SNAPSHOT_VERSION, 'source': list(source_key), 'columns': columns}
+    path = snapshot_path(csv_path)
+    fd, temp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path), suffix='.tmp', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, __meta__=np.array(json.dumps(meta, ensure_ascii=False)), **arrays)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def read_csv_cached(csv_path, parse_dates=None):
+    # 바뀌지 않은 CSV는 날짜 파싱 없이 스냅샷에서 바로 읽고, 바뀌었으면 다시 읽어 스냅샷을 갱신한다
+    source_key = _file_key(csv_path)
+    df = load_snapshot(csv_path)
+    if df is not None:
+        return df
+    df = pd.read_csv(csv_path, parse_dates=parse_dates)
+    try:
+        save_snapshot(df, csv_path, source_key)
+    except OSError:
+        pass
+    return df
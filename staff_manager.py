@@ -1,7 +1,143 @@
 import sys
-from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton, QHeaderView, QLabel, QLineEdit, QComboBox, QCheckBox, QFileDialog
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication, QDialog, QVBoxLayout, QHBoxLayout, QTableView, QPushButton, QHeaderView, QLabel, QComboBox, QStyledItemDelegate, QAbstractItemView
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex
 import pandas as pd
+from data_store import get_data_store
+from instrumentation import traced
+
+GENDERS = ['남자', '여자', '그 외']
+NEW_STAFF_NAME = '신규 직원'
+# 상태 표시줄에 보여 줄 당직 직원 이름 수 (나머지는 '외 N명')
+ON_DUTY_NAMES_SHOWN = 20
+STAFF_HEADERS = ['번호', '이름', '성별', '당직 여부', '마지막 당직일']
+# 표의 열 번호 → staff_df 열 이름 (0번은 행 번호)
+STAFF_COLUMNS = [None, 'Name', 'Gender', 'On Duty', 'Last Duty Day']
+
+
+def format_last_duty_day(value):
+    return value.strftime('%Y/%m/%d') if pd.notnull(value) else ''
+
+
+# staff_df의 열을 파이썬 리스트로 들고 있는 표 모델. 화면에 보이는 셀만 data()로 그린다
+class StaffTableModel(QAbstractTableModel):
+    def __init__(self, staff_df=None):
+        super().__init__()
+        self._columns = {}
+        self._last_duty_text = []
+        # 당직 직원 수는 편집마다 더하고 빼서 유지한다 (편집할 때마다 전체 행을 세지 않는다)
+        self.on_duty_count = 0
+        self.set_dataframe(staff_df if staff_df is not None else pd.DataFrame(columns=STAFF_COLUMNS[1:]))
+
+    def set_dataframe(self, staff_df):
+        self.beginResetModel()
+        self._columns = {column: staff_df[column].tolist() for column in staff_df.columns}
+        for column in STAFF_COLUMNS[1:]:
+            self._columns.setdefault(column, [None] * len(staff_df))
+        self._columns['On Duty'] = [bool(value) if pd.notnull(value) else False for value in self._columns['On Duty']]
+        self.on_duty_count = sum(self._columns['On Duty'])
+        self._last_duty_text = [format_last_duty_day(value) for value in self._columns['Last Duty Day']]
+        self.endResetModel()
+
+    def to_dataframe(self):
+        staff_df = pd.DataFrame(self._columns)
+        staff_df['Last Duty Day'] = pd.to_datetime(staff_df['Last Duty Day'])
+        return staff_df
+
+    def rowCount(self, index=QModelIndex()):
+        return 0 if index.isValid() else len(self._last_duty_text)
+
+    def columnCount(self, index=QModelIndex()):
+        return 0 if index.isValid() else len(STAFF_HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        row, column = index.row(), index.column()
+        if column == 3:
+            if role == Qt.CheckStateRole:
+                return Qt.Checked if self._columns['On Duty'][row] else Qt.Unchecked
+            return None
+        if role == Qt.DisplayRole or role == Qt.EditRole:
+            if column == 0:
+                return str(row + 1)
+            if column == 4:
+                return self._last_duty_text[row]
+            value = self._columns[STAFF_COLUMNS[column]][row]
+            return '' if value is None or (isinstance(value, float) and pd.isna(value)) else str(value)
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        row, column = index.row(), index.column()
+        if column == 3 and role == Qt.CheckStateRole:
+            on_duty = value == Qt.Checked
+            self.on_duty_count += on_duty - self._columns['On Duty'][row]
+            self._columns['On Duty'][row] = on_duty
+        elif column in (1, 2) and role == Qt.EditRole:
+            self._columns[STAFF_COLUMNS[column]][row] = value
+        elif column == 4 and role == Qt.EditRole:
+            last_duty_day = pd.to_datetime(value, format='%Y/%m/%d', errors='coerce')
+            self._columns['Last Duty Day'][row] = last_duty_day
+            self._last_duty_text[row] = format_last_duty_day(last_duty_day)
+        else:
+            return False
+        self.dataChanged.emit(index, index, [role])
+        return True
+
+    def flags(self, index):
+        if index.column() == 0:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == 3:
+            return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsEditable
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return STAFF_HEADERS[section]
+        return None
+
+    def insert_staff(self, values):
+        row = self.rowCount()
+        self.beginInsertRows(QModelIndex(), row, row)
+        for column, items in self._columns.items():
+            items.append(values.get(column))
+        self._columns['On Duty'][row] = bool(values.get('On Duty'))
+        self.on_duty_count += self._columns['On Duty'][row]
+        self._last_duty_text.append(format_last_duty_day(values.get('Last Duty Day')))
+        self.endInsertRows()
+        return row
+
+    def remove_staff(self, row):
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self.on_duty_count -= self._columns['On Duty'][row]
+        for items in self._columns.values():
+            del items[row]
+        del self._last_duty_text[row]
+        self.endRemoveRows()
+
+    def names(self):
+        return self._columns['Name']
+
+    def on_duty_rows(self, limit=None):
+        # 당직 직원의 행 번호. 앞에서부터 limit명까지만 모은다
+        rows = []
+        for row, on_duty in enumerate(self._columns['On Duty']):
+            if on_duty:
+                rows.append(row)
+                if len(rows) == limit:
+                    break
+        return rows
+
+
+# 성별 열: 편집하는 동안에만 QComboBox를 만든다
+class GenderDelegate(QStyledItemDelegate):
+    def createEditor(self, parent, option, index):
+        editor = QComboBox(parent)
+        editor.addItems(GENDERS)
+        return editor
+
+    def setEditorData(self, editor, index):
+        editor.setCurrentText(index.data(Qt.EditRole))
+
+    def setModelData(self, editor, model, index):
+        model.setData(index, editor.currentText(), Qt.EditRole)
 
 class StaffManager(QDialog):
     def __init__(self, parent=None):
@@ -11,9 +147,13 @@ class StaffManager(QDialog):
 
         layout = QVBoxLayout()
 
-        self.staff_table = QTableWidget()
-        self.staff_table.setColumnCount(5)
-        self.staff_table.setHorizontalHeaderLabels(['번호', '이름', '성별', '당직 여부', '마지막 당직일'])
+        self.staff_model = StaffTableModel()
+        self.staff_model.dataChanged.connect(self.update_staff_statistics)
+        self.staff_table = QTableView()
+        self.staff_table.setModel(self.staff_model)
+        self.staff_table.setItemDelegateForColumn(2, GenderDelegate(self.staff_table))
+        self.staff_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.staff_table.setSelectionMode(QAbstractItemView.SingleSelection)
         self.staff_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.staff_table.verticalHeader().setVisible(False)
 
@@ -36,6 +176,8 @@ class StaffManager(QDialog):
         layout.addLayout(button_layout)
 
         self.staff_statistics = QLabel()
+        self.on_duty_names_text = ''
+        self.on_duty_rows_shown = []
         layout.addWidget(self.staff_statistics)
 
         self.setLayout(layout)
@@ -46,65 +188,82 @@ class StaffManager(QDialog):
         self.save_button.clicked.connect(self.save_and_exit)
         self.load_button.clicked.connect(self.load_staff_data)
 
-        self.staff_df = pd.DataFrame(columns=['Name', 'Gender', 'On Duty', 'Last Duty Day'])
-        self.load_staff_data()
+        self.store = get_data_store()
+        self.published_df = None
+        self.store.staff_changed.connect(self.on_staff_changed)
+        self.on_staff_changed(self.store.staff())
 
     def load_staff_data(self):
-        try:
-            self.staff_df = pd.read_csv('staff.csv', parse_dates=['Last Duty Day'])
-        except FileNotFoundError:
-            self.staff_df = pd.DataFrame(columns=['Name', 'Gender', 'On Duty', 'Last Duty Day'])
+        self.store.reload_staff()
+
+    def on_staff_changed(self, staff_df):
+        # 이 창에서 보낸 변경은 이미 표에 반영되어 있다
+        if staff_df is self.published_df:
+            return
+        self.staff_df = staff_df.copy()
         self.update_staff_table()
 
+    @traced('staff table refresh', 'ui')
     def update_staff_table(self):
-        self.staff_table.setRowCount(len(self.staff_df))
-        for i, row in self.staff_df.iterrows():
-            self.staff_table.setItem(i, 0, QTableWidgetItem(str(i + 1)))
-            self.staff_table.setItem(i, 1, QTableWidgetItem(row['Name']))
-            gender_combo = QComboBox()
-            gender_combo.addItems(['남자', '여자', '그 외'])
-            gender_combo.setCurrentText(row['Gender'])
-            self.staff_table.setCellWidget(i, 2, gender_combo)
-            on_duty_checkbox = QCheckBox()
-            on_duty_checkbox.setChecked(row['On Duty'])
-            self.staff_table.setCellWidget(i, 3, on_duty_checkbox)
-            last_duty_day = row['Last Duty Day'].strftime('%Y/%m/%d') if pd.notnull(row['Last Duty Day']) else ''
-            self.staff_table.setItem(i, 4, QTableWidgetItem(last_duty_day))
+        self.staff_model.set_dataframe(self.staff_df)
         self.update_staff_statistics()
 
     def add_staff(self):
-        self.staff_df = self.staff_df.append({'Name': '신규 직원', 'Gender': '남자', 'On Duty': False, 'Last Duty Day': pd.NaT}, ignore_index=True)
-        self.update_staff_table()
+        # 이름은 저장소의 키이므로 이미 있는 이름과 겹치지 않게 번호를 붙인다
+        names = set(self.staff_model.names())
+        name, number = NEW_STAFF_NAME, 1
+        while name in names:
+            number += 1
+            name = f'{NEW_STAFF_NAME} {number}'
+        row = self.staff_model.insert_staff({'Name': name, 'Gender': '남자', 'On Duty': False, 'Last Duty Day': pd.NaT})
+        self.staff_table.scrollToBottom()
+        self.staff_table.selectRow(row)
+        self.update_staff_statistics()
 
     def remove_staff(self):
-        current_row = self.staff_table.currentRow()
+        current_row = self.staff_table.currentIndex().row()
         if current_row >= 0:
-            self.staff_df = self.staff_df.drop(self.staff_df.index[current_row])
-            self.update_staff_table()
+            self.staff_model.remove_staff(current_row)
+            self.update_staff_statistics()
 
     def apply_changes(self):
-        for row in range(self.staff_table.rowCount()):
-            name_item = self.staff_table.item(row, 1)
-            gender_combo = self.staff_table.cellWidget(row, 2)
-            on_duty_checkbox = self.staff_table.cellWidget(row, 3)
-            last_duty_day_item = self.staff_table.item(row, 4)
-            if name_item and gender_combo and on_duty_checkbox and last_duty_day_item:
-                self.staff_df.at[row, 'Name'] = name_item.text()
-                self.staff_df.at[row, 'Gender'] = gender_combo.currentText()
-                self.staff_df.at[row, 'On Duty'] = on_duty_checkbox.isChecked()
-                self.staff_df.at[row, 'Last Duty Day'] = pd.to_datetime(last_duty_day_item.text(), format='%Y/%m/%d', errors='coerce')
+        self.staff_df = self.staff_model.to_dataframe()
+        self.publish_staff()
         self.update_staff_statistics()
 
+    def publish_staff(self, save=False):
+        self.published_df = self.staff_df.copy()
+        self.store.set_staff(self.published_df, save=save)
+
     def save_and_exit(self):
         self.apply_changes()
-        self.staff_df.to_csv('staff.csv', index=False)
+        try:
+            self.publish_staff(save=True)
+        except ValueError as e:
+            self.staff_statistics.setText(f"저장하지 못했습니다: {e}")
+            return
         self.close()
 
-    def update_staff_statistics(self):
-        total_staff = len(self.staff_df)
-        on_duty_staff = len(self.staff_df[self.staff_df['On Duty']])
-        on_duty_staff_names = ', '.join(self.staff_df[self.staff_df['On Duty']]['Name'])
-        self.staff_statistics.setText(f"총 직원 수: {total_staff}, 당직 직원 수: {on_duty_staff}, 당직 직원 목록: {on_duty_staff_names}")
+    def update_staff_statistics(self, top_left=None, *args):
+        # 셀 편집(dataChanged)은 당직 여부나 당직 직원의 이름이 바뀔 때만 이름 목록을 다시 만든다
+        # (목록이 이미 꽉 찼고 바뀐 행이 보이는 이름들보다 뒤에 있으면 목록은 그대로다)
+        model = self.staff_model
+        shown = self.on_duty_rows_shown
+        if top_left is None:
+            refresh = True
+        elif top_left.column() == 3:
+            refresh = len(shown) < ON_DUTY_NAMES_SHOWN or top_left.row() <= shown[-1]
+        else:
+            refresh = top_left.column() == 1 and top_left.row() in shown
+        if refresh:
+            self.on_duty_rows_shown = model.on_duty_rows(ON_DUTY_NAMES_SHOWN)
+            names = model.names()
+            self.on_duty_names_text = ', '.join(str(names[row]) for row in self.on_duty_rows_shown)
+        on_duty_staff = model.on_duty_count
+        names_text = self.on_duty_names_text
+        if on_duty_staff > ON_DUTY_NAMES_SHOWN:
+            names_text += f" 외 {on_duty_staff - ON_DUTY_NAMES_SHOWN}명"
+        self.staff_statistics.setText(f"총 직원 수: {model.rowCount()}, 당직 직원 수: {on_duty_staff}, 당직 직원 목록: {names_text}")
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
@@ -0,0 +1,282 @@
+import os
+import sqlite3
+import tempfile
+import pandas as pd
+from snapshot_cache import read_csv_cached
+
+STAFF_COLUMNS = ['Name', 'Gender', 'On Duty', 'Last Duty Day']
+VACATION_COLUMNS = ['Name', 'Start Date', 'End Date']
+HOLIDAY_COLUMNS = ['Date', 'Holiday Name']
+DUTY_COLUMNS = ['Date', 'Employee 1', 'Employee 2']
+# 여러 팀/지점을 함께 관리할 때 직원/휴가/당직 행에 붙이는 선택 열. 비어 있으면 기본 팀(휴가는 모든 팀)
+TEAM_COLUMN = 'Team'
+DEFAULT_TEAM = ''
+
+STAFF_FILE = 'staff.csv'
+VACATIONS_FILE = 'vacations.csv'
+HOLIDAYS_FILE = 'holidays.csv'
+DUTIES_FILE = 'duties.csv'
+DATABASE_FILE = 'duty.db'
+
+
+def _read_csv(path, columns, parse_dates):
+    try:
+        return read_csv_cached(path, parse_dates=parse_dates)
+    except FileNotFoundError:
+        return pd.DataFrame(columns=columns)
+
+
+def _write_csv(df, path):
+    # 임시 파일에 다 쓴 뒤 교체하므로 중간에 죽어도 반쯤 쓰인 파일이 남지 않는다
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path), suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding='utf-8') as f:
+            df.to_csv(f, index=False)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def overlapping_vacations(vacation_df, start, end):
+    start, end = pd.Timestamp(start), pd.Timestamp(end)
+    return vacation_df[(vacation_df['Start Date'] <= end) & (vacation_df['End Date'] >= start)]
+
+
+# 기존 CSV 네 개를 그대로 쓰는 저장소
+class CsvRepository:
+    def __init__(self, data_dir='.'):
+        self.data_dir = data_dir
+
+    def path(self, filename):
+        return os.path.join(self.data_dir, filename)
+
+    def load_staff(self):
+        return _read_csv(self.path(STAFF_FILE), STAFF_COLUMNS, ['Last Duty Day'])
+
+    def save_staff(self, staff_df):
+        _write_csv(staff_df, self.path(STAFF_FILE))
+
+    def load_vacations(self):
+        return _read_csv(self.path(VACATIONS_FILE), VACATION_COLUMNS, ['Start Date', 'End Date'])
+
+    def save_vacations(self, vacation_df):
+        _write_csv(vacation_df, self.path(VACATIONS_FILE))
+
+    def vacations_between(self, start, end):
+        return overlapping_vacations(self.load_vacations(), start, end).reset_index(drop=True)
+
+    def load_holidays(self):
+        return _read_csv(self.path(HOLIDAYS_FILE), HOLIDAY_COLUMNS, ['Date'])
+
+    def save_holidays(self, holidays_df):
+        _write_csv(holidays_df, self.path(HOLIDAYS_FILE))
+
+    def load_duties(self):
+        return _read_csv(self.path(DUTIES_FILE), DUTY_COLUMNS, ['Date'])
+
+    def save_duties(self, duty_df):
+        _write_csv(duty_df, self.path(DUTIES_FILE))
+
+
+# 테이블 정의: (테이블, DataFrame 열 → DB 열, 기본 키 열, 날짜 열, 불리언 열)
+_TABLES = {
+    'staff': ({'Name': 'name', 'Gender': 'gender', 'On Duty': 'on_duty', 'Last Duty Day': 'last_duty_day', 'Duty Count': 'duty_count', 'Team': 'team'},
+              ['team', 'name'], ['last_duty_day'], ['on_duty']),
+    'vacations': ({'Name': 'name', 'Start Date': 'start_date', 'End Date': 'end_date', 'Team': 'team'},
+                  ['team', 'name', 'start_date', 'end_date'], ['start_date', 'end_date'], []),
+    'holidays': ({'Date': 'date', 'Holiday Name': 'holiday_name'}, ['date'], ['date'], []),
+    'duties': ({'Date': 'date', 'Employee 1': 'employee_1', 'Employee 2': 'employee_2', 'Team': 'team'}, ['team', 'date'], ['date'], []),
+}
+
+_TABLE_SCHEMAS = {
+    'staff': """CREATE TABLE IF NOT EXISTS staff (
+    team TEXT NOT NULL DEFAULT '', name TEXT NOT NULL, gender TEXT, on_duty INTEGER NOT NULL DEFAULT 0,
+    last_duty_day TEXT, duty_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (team, name)
+)""",
+    'vacations': """CREATE TABLE IF NOT EXISTS vacations (
+    team TEXT NOT NULL DEFAULT '', name TEXT NOT NULL, start_date TEXT NOT NULL, end_date TEXT NOT NULL,
+    PRIMARY KEY (team, name, start_date, end_date)
+)""",
+    'holidays': "CREATE TABLE IF NOT EXISTS holidays (date TEXT PRIMARY KEY, holiday_name TEXT)",
+    'duties': """CREATE TABLE IF NOT EXISTS duties (
+    team TEXT NOT NULL DEFAULT '', date TEXT NOT NULL, employee_1 TEXT, employee_2 TEXT,
+    PRIMARY KEY (team, date)
+)""",
+}
+
+# NOT NULL 열에 빈 값이 오면 넣을 값 (새로 추가한 직원은 Duty Count가 비어 있다)
+_NOT_NULL_DEFAULTS = {
+    'staff': {'duty_count': 0},
+}
+
+_INDEXES = """
+CREATE INDEX IF NOT EXISTS vacations_by_range ON vacations (start_date, end_date);
+CREATE INDEX IF NOT EXISTS duties_by_date ON duties (date);
+CREATE INDEX IF NOT EXISTS duties_by_employee_1 ON duties (employee_1);
+CREATE INDEX IF NOT EXISTS duties_by_employee_2 ON duties (employee_2);
+"""
+
+
+def _create_schema(connection):
+    # team 열이 생기기 전에 만든 DB는 기본 키가 바뀌므로 테이블을 새 정의로 옮겨 담는다
+    with connection:
+        for table, schema in _TABLE_SCHEMAS.items():
+            existing = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+            if existing and 'team' in _TABLES[table][1] and 'team' not in existing:
+                connection.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+                connection.execute(schema)
+                columns = ', '.join(existing)
+                connection.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_old")
+                connection.execute(f"DROP TABLE {table}_old")
+            else:
+                connection.execute(schema)
+    connection.executescript(_INDEXES)
+
+
+def _to_db_frame(table, df):
+    columns, _, date_columns, bool_columns = _TABLES[table]
+    db = pd.DataFrame({columns[c]: df[c] for c in columns if c in df.columns})
+    for column in date_columns:
+        if column in db.columns:
+            db[column] = pd.to_datetime(db[column].astype(str).str.slice(0, 10), errors='coerce').dt.strftime('%Y-%m-%d')
+    for column in bool_columns:
+        if column in db.columns:
+            db[column] = db[column].fillna(False).astype(bool).astype(int)
+    for column, default in _NOT_NULL_DEFAULTS.get(table, {}).items():
+        if column in db.columns:
+            db[column] = db[column].fillna(default)
+    if 'team' in columns.values():
+        db['team'] = db['team'].fillna(DEFAULT_TEAM).astype(str) if 'team' in db.columns else DEFAULT_TEAM
+    return db.astype(object).where(db.notna(), None)
+
+
+def _from_db_frame(table, db):
+    columns, _, date_columns, bool_columns = _TABLES[table]
+    reverse = {v: k for k, v in columns.items()}
+    for column in date_columns:
+        db[column] = pd.to_datetime(db[column], format='%Y-%m-%d', errors='coerce')
+    for column in bool_columns:
+        db[column] = db[column].astype(bool)
+    if 'team' in db.columns and (db['team'] == DEFAULT_TEAM).all():
+        # 팀을 나누지 않은 DB는 예전과 같은 열만 돌려준다
+        db = db.drop(columns='team')
+    return db.rename(columns=reverse)
+
+
+# SQLite 저장소. 날짜/이름에 색인을 두고 바뀐 행만 트랜잭션으로 기록한다
+class SQLiteRepository:
+    def __init__(self, database=DATABASE_FILE):
+        self.database = database
+        self.connection = sqlite3.connect(database)
+        _create_schema(self.connection)
+        # 표 → (열 목록, 이 연결로 마지막에 저장한 행 집합). 다음 저장은 표를 다시 읽지 않고 이것과 비교한다
+        self._synced = {}
+
+    def close(self):
+        self.connection.close()
+
+    def _query(self, table, where='', params=()):
+        columns = list(_TABLES[table][0].values())
+        db = pd.read_sql_query(f"SELECT {', '.join(columns)} FROM {table} {where}", self.connection, params=params)
+        return _from_db_frame(table, db)
+
+    def _sync(self, table, df):
+        # 저장된 행과 비교해서 추가/변경된 행은 UPSERT(있는 열만 갱신), 사라진 행은 DELETE
+        _, keys, _, _ = _TABLES[table]
+        new = _to_db_frame(table, df)
+        if set(keys) == set(new.columns):
+            # 모든 열이 키인 표(휴가)는 똑같은 행이 여럿이어도 잃는 정보가 없다
+            new = new.drop_duplicates()
+        duplicated = new[new.duplicated(subset=keys, keep=False)]
+        if not duplicated.empty:
+            # 조용히 한 행만 남기지 않는다 (같은 이름의 직원 두 명 등)
+            shown = sorted(set(', '.join(str(value) for value in row if value not in (None, '')) for row in duplicated[keys].itertuples(index=False)))
+            raise ValueError(f"{table}: 같은 키의 행이 여러 개 있어 저장할 수 없습니다: {'; '.join(shown[:5])}" + (" ..." if len(shown) > 5 else ""))
+        columns = list(new.columns)
+        synced = self._synced.get(table)
+        if synced is not None and synced[0] == columns:
+            old_rows = synced[1]
+        else:
+            # 처음 저장하거나 열이 달라졌을 때만 표를 읽는다
+            old = pd.read_sql_query(f"SELECT {', '.join(columns)} FROM {table}", self.connection)
+            old = old.astype(object).where(old.notna(), None)
+            old_rows = set(map(tuple, old[columns].itertuples(index=False)))
+        new_rows = list(map(tuple, new.itertuples(index=False)))
+        changed = [row for row in new_rows if row not in old_rows]
+        positions = [columns.index(key) for key in keys]
+        new_keys = set(tuple(row[i] for i in positions) for row in new_rows)
+        removed = [key for key in (tuple(row[i] for i in positions) for row in old_rows) if key not in new_keys]
+        with self.connection:
+            if changed:
+                # INSERT OR REPLACE는 행을 지우고 다시 넣으므로 DataFrame에 없는 열(duty_count 등)이 기본값으로 돌아간다
+                updates = [column for column in columns if column not in keys]
+                action = f"DO UPDATE SET {', '.join(f'{column} = excluded.{column}' for column in updates)}" if updates else "DO NOTHING"
+                self.connection.executemany(
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                    f"ON CONFLICT ({', '.join(keys)}) {action}", changed)
+            if removed:
+                self.connection.executemany(
+                    f"DELETE FROM {table} WHERE {' AND '.join(f'{k} = ?' for k in keys)}", removed)
+        self._synced[table] = (columns, set(new_rows))
+        return len(changed), len(removed)
+
+    def load_staff(self):
+        return self._query('staff', 'ORDER BY rowid')
+
+    def save_staff(self, staff_df):
+        return self._sync('staff', staff_df)
+
+    def load_vacations(self):
+        return self._query('vacations', 'ORDER BY start_date')
+
+    def save_vacations(self, vacation_df):
+        return self._sync('vacations', vacation_df)
+
+    def vacations_between(self, start, end):
+        start, end = pd.Timestamp(start).strftime('%Y-%m-%d'), pd.Timestamp(end).strftime('%Y-%m-%d')
+        return self._query('vacations', 'WHERE start_date <= ? AND end_date >= ? ORDER BY start_date', (end, start))
+
+    def load_holidays(self):
+        return self._query('holidays', 'ORDER BY date')
+
+    def save_holidays(self, holidays_df):
+        return self._sync('holidays', holidays_df)
+
+    def load_duties(self):
+        return self._query('duties', 'ORDER BY date, team')
+
+    def duties_between(self, start, end):
+        start, end = pd.Timestamp(start).strftime('%Y-%m-%d'), pd.Timestamp(end).strftime('%Y-%m-%d')
+        return self._query('duties', 'WHERE date BETWEEN ? AND ? ORDER BY date, team', (start, end))
+
+    def save_duties(self, duty_df):
+        return self._sync('duties', duty_df)
+
+    def import_csv(self, data_dir='.'):
+        # CSV 네 개를 한 번 옮겨 담는다
+        csv = CsvRepository(data_dir)
+        self.save_staff(csv.load_staff())
+        self.save_vacations(csv.load_vacations())
+        self.save_holidays(csv.load_holidays())
+        self.save_duties(csv.load_duties())
+
+
+_repository = None
+
+
+def get_repository():
+    # DUTY_STORAGE=sqlite 이면 duty.db(DUTY_DATABASE로 변경 가능)를 쓰고, 처음 만들 때 CSV를 가져온다
+    global _repository
+    if _repository is None:
+        if os.environ.get('DUTY_STORAGE', 'csv').lower() == 'sqlite':
+            database = os.environ.get('DUTY_DATABASE', DATABASE_FILE)
+            is_new = not os.path.exists(database)
+            _repository = SQLiteRepository(database)
+            if is_new:
+                _repository.import_csv(os.path.dirname(os.path.abspath(database)))
+        else:
+            _repository = CsvRepository()
+    return _repository
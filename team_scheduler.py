@@ -0,0 +1,181 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import numpy as np
+import pandas as pd
+from schedule_engine import ScheduleEngine, GenerationCancelled, to_ordinals, format_duty_date
+from schedule_repair import ScheduleRepairer, SLOT_COLUMNS
+from vacation_matrix import VacationMatrix
+from workday_calendar import WorkdayCalendar
+from storage import DUTY_COLUMNS, TEAM_COLUMN, DEFAULT_TEAM
+from instrumentation import span
+
+# 팀(지점)마다 독립된 일정을 따로 만들고 합친다. 팀끼리는 입력을 나눠 갖지 않으므로
+# 팀 하나가 프로세스 하나에서 돌고, 팀 사이 규칙은 합치는 단계에서만 검사한다.
+
+# 작업 프로세스를 기다리는 동안 이 간격(초)마다 취소 여부를 본다
+CANCEL_POLL_SECONDS = 0.1
+
+
+def team_keys(df):
+    # Team 열이 없거나 비어 있는 행은 기본 팀
+    if TEAM_COLUMN not in df.columns:
+        return pd.Series(DEFAULT_TEAM, index=df.index, dtype=object)
+    return df[TEAM_COLUMN].fillna(DEFAULT_TEAM).astype(str)
+
+
+def teams_of(staff_df):
+    return sorted(team_keys(staff_df).unique())
+
+
+def team_inputs(staff_df, vacation_df, team):
+    # 팀이 비어 있는 휴가는 그 직원이 속한 모든 팀에 적용된다
+    staff = staff_df[team_keys(staff_df) == team]
+    vacation_teams = team_keys(vacation_df)
+    vacations = vacation_df[((vacation_teams == team) | (vacation_teams == DEFAULT_TEAM)) & vacation_df['Name'].isin(staff['Name'])]
+    return staff, vacations.reset_index(drop=True)
+
+
+def split_by_team(duty_df):
+    # (팀, 그 팀의 당직 행) 목록. Team 열이 없으면 전체가 기본 팀 하나
+    keys = team_keys(duty_df)
+    return [(team, duty_df[keys == team].reset_index(drop=True)) for team in sorted(keys.unique())]
+
+
+def team_schedules(duty_df, staff_df, vacation_df):
+    # (팀, 당직 행, 직원, 휴가) 목록. 일정에 Team 열이 없으면 팀을 나누지 않고 만든 일정이므로
+    # 직원의 Team 값과 상관없이 전체 직원·휴가로 검사한다
+    if TEAM_COLUMN not in duty_df.columns:
+        return [(DEFAULT_TEAM, duty_df.reset_index(drop=True), staff_df, vacation_df.reset_index(drop=True))]
+    return [(team, team_duty_df) + team_inputs(staff_df, vacation_df, team) for team, team_duty_df in split_by_team(duty_df)]
+
+
+def _check_cancel(cancel):
+    if cancel is not None and cancel.is_set():
+        raise GenerationCancelled()
+
+
+def _generate_team(task, cancel=None):
+    # cancel은 같은 프로세스에서 돌 때(팀이 하나일 때)만 넘어온다
+    team, staff_df, vacation_df, holidays, start, end, solver, seed, rules = task
+    with span('generate team', 'teams', team=team):
+        workday_calendar = WorkdayCalendar()
+        workday_calendar.set_holidays(holidays)
+        engine = ScheduleEngine.from_staff_df(staff_df, seed=seed, rules=rules)
+        vacations = VacationMatrix.from_dataframe(vacation_df, engine.names, start, end)
+        rows = []
+        for _, _, month_rows in engine.generate_months(workday_calendar, start, end, vacations, solver, cancel=cancel):
+            _check_cancel(cancel)
+            rows.extend(month_rows)
+    duty_df = pd.DataFrame(rows, columns=DUTY_COLUMNS)
+    duty_df[TEAM_COLUMN] = team
+    return team, duty_df, engine.apply_to(staff_df.copy())
+
+
+def cross_team_conflicts(duty_df):
+    # 같은 날 두 팀 이상의 당번에 들어간 직원: Date(서수), Name, Teams
+    if TEAM_COLUMN not in duty_df.columns or duty_df.empty:
+        return pd.DataFrame(columns=['Date', 'Name', 'Teams'])
+    slots = pd.DataFrame({
+        'Date': np.tile(to_ordinals(duty_df['Date']), len(SLOT_COLUMNS)),
+        'Name': np.concatenate([duty_df[column].to_numpy(dtype=object) for column in SLOT_COLUMNS]),
+        'Team': np.tile(team_keys(duty_df).to_numpy(dtype=object), len(SLOT_COLUMNS)),
+    })
+    slots = slots[slots['Name'].notna() & (slots['Name'] != '')].drop_duplicates()
+    slots = slots[slots.duplicated(['Date', 'Name'], keep=False)]
+    conflicts = slots.groupby(['Date', 'Name'], sort=True)['Team'].agg(sorted).reset_index()
+    return conflicts.rename(columns={'Team': 'Teams'})
+
+
+def _other_team_days(duty_frames, team, names):
+    # team 직원들이 다른 팀에서 당번인 날을 하루짜리 휴가 행으로 (이 날은 team에서 배정하지 않는다)
+    rows = []
+    for other, duty_df in duty_frames.items():
+        if other == team:
+            continue
+        for column in SLOT_COLUMNS:
+            busy = duty_df[duty_df[column].isin(names)]
+            rows.append(pd.DataFrame({'Name': busy[column].to_numpy(dtype=object), 'Start Date': busy['Date'].to_numpy(dtype=object)}))
+    blocked = pd.concat(rows, ignore_index=True) if rows else pd.DataFrame(columns=['Name', 'Start Date'])
+    blocked['Start Date'] = pd.to_datetime(blocked['Start Date'].astype(str).str.slice(0, 10))
+    blocked['End Date'] = blocked['Start Date']
+    return blocked
+
+
+def merge_teams(results, vacation_df, holidays, exclusive_staff=True, seed=None, rules=None, cancel=None, generation_staff=None):
+    # results: [(팀, duty_df, staff_df)]. generation_staff: 생성에 넣은 직원 표 (생성 전 마지막 당번일)
+    # exclusive_staff이면 같은 날 두 팀에 들어간 직원을 뒤 팀(이름순)에서 빼고 그 자리만 다시 배정한다.
+    # 앞 팀부터 차례로 고치므로 한 번 훑으면 끝난다
+    # cancel이 켜지면 다음 팀을 고치기 전에 GenerationCancelled
+    duty_frames = {team: duty_df for team, duty_df, _ in results}
+    staff_frames = {team: staff_df for team, _, staff_df in results}
+    reassigned = []
+    if exclusive_staff and len(results) > 1:
+        combined = pd.concat(duty_frames.values(), ignore_index=True)
+        conflicted = set(team for teams in cross_team_conflicts(combined)['Teams'] for team in teams[1:])
+        workday_calendar = WorkdayCalendar()
+        workday_calendar.set_holidays(holidays)
+        for team in sorted(conflicted):
+            _check_cancel(cancel)
+            with span('merge team', 'teams', team=team):
+                staff_df = staff_frames[team]
+                _, vacations = team_inputs(staff_df, vacation_df, team)
+                blocked = _other_team_days(duty_frames, team, set(staff_df['Name']))
+                repairer = ScheduleRepairer(duty_frames[team], staff_df, pd.concat([vacations, blocked], ignore_index=True),
+                                            workday_calendar, seed=seed, rules=rules, generation_staff=generation_staff)
+                report = repairer.repair(changed_vacations=blocked)
+                duty_frames[team] = repairer.duty_df
+                staff_frames[team] = repairer.apply_to(staff_df.copy())
+                reassigned.extend((team,) + item for item in report['reassigned'])
+
+    frames = [duty_frames[team] for team, _, _ in results]
+    duty_df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=DUTY_COLUMNS + [TEAM_COLUMN])
+    order = np.lexsort((team_keys(duty_df).to_numpy(dtype=str), to_ordinals(duty_df['Date'])))
+    duty_df = duty_df.iloc[order].reset_index(drop=True)
+    staff_frames = [staff_frames[team] for team, _, _ in results]
+    staff_df = pd.concat(staff_frames).sort_index() if staff_frames else pd.DataFrame()
+    return {
+        'duty_df': duty_df,
+        'staff_df': staff_df,
+        'teams': {team: len(duty_frames[team]) for team, _, _ in results},
+        'reassigned': reassigned,
+        'conflicts': cross_team_conflicts(duty_df),
+    }
+
+
+def _run_team_tasks(tasks, max_workers, cancel=None, progress=None):
+    # 끝나는 팀마다 progress(끝난 팀 수, 전체 팀 수, 설명)를 알린다. 취소되면 돌고 있는 팀을 기다리지 않는다
+    # (이미 시작한 작업 프로세스는 그 팀을 마치고 스스로 정리된다)
+    if len(tasks) <= 1:
+        results = [_generate_team(task, cancel) for task in tasks]
+        if progress is not None and tasks:
+            progress(1, 1, f"{tasks[0][0] or '기본'} 팀 생성 완료")
+        return results
+    pool = ProcessPoolExecutor(max_workers=min(len(tasks), max_workers or os.cpu_count()))
+    futures = {pool.submit(_generate_team, task): task[0] for task in tasks}
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait(pending, timeout=CANCEL_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            _check_cancel(cancel)
+            if progress is not None and done:
+                progress(len(tasks) - len(pending), len(tasks), f"{futures[next(iter(done))] or '기본'} 팀 생성 완료")
+    finally:
+        pool.shutdown(wait=not pending, cancel_futures=True)
+    return [future.result() for future in futures]
+
+
+def generate_teams(staff_df, vacation_df, holidays, start, end, solver=None, seed=None, max_workers=None, exclusive_staff=True, rules=None,
+                   cancel=None, progress=None):
+    # 팀별로 나눈 입력을 작업 프로세스에 하나씩 맡긴다. 팀이 하나면 프로세스를 띄우지 않는다
+    # cancel(threading.Event)은 팀 사이와 합치는 단계 사이에서 확인한다
+    holidays = list(holidays)
+    tasks = []
+    for i, team in enumerate(teams_of(staff_df)):
+        team_staff, team_vacations = team_inputs(staff_df, vacation_df, team)
+        tasks.append((team, team_staff, team_vacations, holidays, start, end, solver, None if seed is None else seed + i, rules))
+    results = _run_team_tasks(tasks, max_workers, cancel, progress)
+    return merge_teams(results, vacation_df, holidays, exclusive_staff, seed, rules, cancel, generation_staff=staff_df)
+
+
+def format_conflicts(conflicts):
+    return [f"{format_duty_date(date)} {name}: {', '.join(teams)}" for date, name, teams in conflicts.itertuples(index=False)]
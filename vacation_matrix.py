@@ -0,0 +1,119 @@
+import numpy as np
+import pandas as pd
+from schedule_engine import to_ordinal, to_ordinals
+
+# 한 번에 펼치는 날짜 수 (chunk × 직원 수 크기의 임시 배열만 사용)
+CHUNK_DAYS = 64
+
+
+def vacation_intervals(vacation_df, names):
+    # 휴가 행을 (직원 번호, 시작 서수, 종료 서수) 배열로 변환. 이름이 같은 직원은 모두 포함
+    if vacation_df is None or vacation_df.empty:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+    staff_index = pd.DataFrame({'Name': np.asarray(names, dtype=object), 'staff': np.arange(len(names))})
+    intervals = pd.DataFrame({
+        'Name': vacation_df['Name'].to_numpy(dtype=object),
+        'start': to_ordinals(vacation_df['Start Date']),
+        'end': to_ordinals(vacation_df['End Date']),
+    }).merge(staff_index, on='Name')
+    return (intervals['staff'].to_numpy(dtype=np.int64),
+            intervals['start'].to_numpy(dtype=np.int64),
+            intervals['end'].to_numpy(dtype=np.int64))
+
+
+# 날짜 × 직원 휴가 비트맵. 하루치 제외 목록은 행 하나를 읽는 것으로 끝난다.
+class VacationMatrix:
+    def __init__(self, names, first_ordinal, bits):
+        self.names = np.asarray(names, dtype=object)
+        self.first_ordinal = int(first_ordinal)
+        self._bits = bits
+
+    @classmethod
+    def from_intervals(cls, names, staff, start, end, first_ordinal, last_ordinal):
+        num_staff = len(names)
+        num_days = max(int(last_ordinal) - int(first_ordinal) + 1, 0)
+        bits = np.zeros((num_days, (num_staff + 7) // 8), dtype=np.uint8)
+
+        # 범위 밖 휴가는 미리 제거하고 시작일 순으로 정렬
+        keep = (end >= first_ordinal) & (start <= last_ordinal)
+        staff = staff[keep]
+        start = np.maximum(start[keep], first_ordinal) - first_ordinal
+        end = np.minimum(end[keep], last_ordinal) - first_ordinal
+
+        # 구간마다 차분 배열(+1 / -1)을 쌓고 누적합으로 펼친다
+        for chunk_start in range(0, num_days, CHUNK_DAYS):
+            chunk_end = min(chunk_start + CHUNK_DAYS, num_days)
+            hit = (start < chunk_end) & (end >= chunk_start)
+            diff = np.zeros((chunk_end - chunk_start + 1, num_staff), dtype=np.int32)
+            np.add.at(diff, (np.maximum(start[hit], chunk_start) - chunk_start, staff[hit]), 1)
+            np.add.at(diff, (np.minimum(end[hit], chunk_end - 1) - chunk_start + 1, staff[hit]), -1)
+            active = np.cumsum(diff[:-1], axis=0) > 0
+            bits[chunk_start:chunk_end] = np.packbits(active, axis=1)
+        return cls(names, first_ordinal, bits)
+
+    @classmethod
+    def from_dataframe(cls, vacation_df, names, first_ordinal, last_ordinal):
+        staff, start, end = vacation_intervals(vacation_df, names)
+        return cls.from_intervals(names, staff, start, end, first_ordinal, last_ordinal)
+
+    @property
+    def size(self):
+        return len(self.names)
+
+    @property
+    def last_ordinal(self):
+        return self.first_ordinal + len(self._bits) - 1
+
+    def off_mask(self, ordinal):
+        row = int(ordinal) - self.first_ordinal
+        if row < 0 or row >= len(self._bits):
+            return np.zeros(self.size, dtype=bool)
+        return np.unpackbits(self._bits[row], count=self.size).astype(bool)
+
+    def is_off(self, staff, ordinal):
+        row = int(ordinal) - self.first_ordinal
+        if row < 0 or row >= len(self._bits):
+            return False
+        # packbits는 상위 비트부터 채운다
+        return bool((self._bits[row, staff >> 3] >> (7 - (staff & 7))) & 1)
+
+    def who_is_off(self, date):
+        return self.names[self.off_mask(to_ordinal(date))].tolist()
+
+    def off_counts(self):
+        # 날짜별 휴가자 수
+        return np.unpackbits(self._bits, axis=1, count=self.size).sum(axis=1)
+
+
+# 떨어져 있는 날짜 몇 개만의 휴가 마스크 (VacationMatrix와 같은 off_mask / is_off).
+# 일정 수정처럼 영향받는 날짜가 드문드문할 때, 처음~끝 날짜 전체 비트맵을 만들지 않는다
+class VacationDays:
+    def __init__(self, names, staff, start, end, days):
+        self.names = np.asarray(names, dtype=object)
+        days = np.unique(np.asarray(days, dtype=np.int64))
+        self.rows = {int(day): row for row, day in enumerate(days)}
+        self._masks = np.zeros((len(days), len(self.names)), dtype=bool)
+        # 휴가 구간마다 덮는 날짜 위치 [lo, hi)를 찾아 한 번에 펼친다
+        lo = np.searchsorted(days, start, 'left')
+        hi = np.searchsorted(days, end, 'right')
+        counts = np.maximum(hi - lo, 0)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        self._masks[np.repeat(lo, counts) + offsets, np.repeat(staff, counts)] = True
+
+    @classmethod
+    def from_dataframe(cls, vacation_df, names, days):
+        staff, start, end = vacation_intervals(vacation_df, names)
+        return cls(names, staff, start, end, days)
+
+    @property
+    def size(self):
+        return len(self.names)
+
+    def off_mask(self, ordinal):
+        row = self.rows.get(int(ordinal))
+        return np.zeros(self.size, dtype=bool) if row is None else self._masks[row].copy()
+
+    def is_off(self, staff, ordinal):
+        row = self.rows.get(int(ordinal))
+        return row is not None and bool(self._masks[row, staff])
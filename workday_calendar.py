@@ -0,0 +1,88 @@
+import calendar
+import datetime
+from collections import OrderedDict
+import numpy as np
+from storage import get_repository
+from schedule_engine import to_ordinal
+
+# 연도별 근무일 비트맵을 몇 년치까지 보관할지
+MAX_CACHED_YEARS = 16
+
+
+# 공휴일 목록을 한 번만 읽고 연도별 근무일 비트맵을 LRU로 보관하는 공용 달력
+class WorkdayCalendar:
+    def __init__(self, repository=None, max_years=MAX_CACHED_YEARS):
+        # repository가 없으면 공용 저장소(get_repository)에서 공휴일을 읽는다
+        self.repository = repository
+        self.max_years = max_years
+        self._holidays = None
+        self._years = OrderedDict()
+
+    def load(self):
+        repository = self.repository or get_repository()
+        self.set_holidays(repository.load_holidays()['Date'].dropna())
+
+    def set_holidays(self, dates):
+        self._holidays = frozenset(to_ordinal(date) for date in dates)
+        self._years.clear()
+
+    @property
+    def holidays(self):
+        if self._holidays is None:
+            self.load()
+        return self._holidays
+
+    def is_holiday(self, date):
+        return to_ordinal(date) in self.holidays
+
+    def _year(self, year):
+        # (1월 1일 서수, 근무일 비트맵, 근무일 서수 배열)
+        cached = self._years.get(year)
+        if cached is not None:
+            self._years.move_to_end(year)
+            return cached
+        first = datetime.date(year, 1, 1).toordinal()
+        ordinals = np.arange(first, datetime.date(year, 12, 31).toordinal() + 1)
+        # 서수 1(0001-01-01)은 월요일이므로 (ordinal - 1) % 7 이 weekday
+        mask = (ordinals - 1) % 7 < 5  # 주말 제외
+        holidays = [o - first for o in self.holidays if first <= o < first + len(ordinals)]
+        mask[holidays] = False  # 공휴일 제외
+        cached = (first, mask, ordinals[mask])
+        self._years[year] = cached
+        if len(self._years) > self.max_years:
+            self._years.popitem(last=False)
+        return cached
+
+    def is_workday(self, date):
+        ordinal = to_ordinal(date)
+        first, mask, _ = self._year(datetime.date.fromordinal(ordinal).year)
+        return bool(mask[ordinal - first])
+
+    def workday_ordinals(self, start, end):
+        start, end = to_ordinal(start), to_ordinal(end)
+        if end < start:
+            return np.empty(0, dtype=np.int64)
+        parts = []
+        for year in range(datetime.date.fromordinal(start).year, datetime.date.fromordinal(end).year + 1):
+            ordinals = self._year(year)[2]
+            parts.append(ordinals[(ordinals >= start) & (ordinals <= end)])
+        return np.concatenate(parts).astype(np.int64)
+
+    def workdays(self, year, month):
+        # 해당 월의 근무일(일자 번호) 목록
+        first = datetime.date(year, month, 1).toordinal()
+        last = first + calendar.monthrange(year, month)[1] - 1
+        return (self.workday_ordinals(first, last) - first + 1).tolist()
+
+    def count_workdays(self, start, end):
+        return len(self.workday_ordinals(start, end))
+
+
+_shared_calendar = None
+
+
+def get_workday_calendar():
+    global _shared_calendar
+    if _shared_calendar is None:
+        _shared_calendar = WorkdayCalendar()
+    return _shared_calendar